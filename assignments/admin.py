@@ -3,4 +3,5 @@ from . import models
 # Register your models here.
 
 admin.site.register(models.Assignment)
-admin.site.register(models.CustomDevice)
\ No newline at end of file
+admin.site.register(models.CustomDevice)
+admin.site.register(models.PushDelivery)
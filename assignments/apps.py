@@ -5,5 +5,5 @@ class AssignmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assignments'
 
-    # def ready(self):
-    #     import assignments.signals
\ No newline at end of file
+    def ready(self):
+        import assignments.signals
\ No newline at end of file
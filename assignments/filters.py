@@ -0,0 +1,30 @@
+import django_filters
+from utils.filters import IndexedFilterSet
+from .models import Assignment
+
+
+class AssignmentFilter(IndexedFilterSet):
+    """
+    Query filters for AssignmentListView.
+    Assignment.Meta has an index for each ordering led by each equality filter
+    (faculty, semester, subject_id, teacher) and by faculty + semester; other
+    combinations walk one of them and check the rest of the filters on its rows.
+    A deadline range has to be sorted by deadline, so it can't be used in the
+    keyset feed. Keep the indexes in sync when adding filters or orderings.
+    """
+    range_orderings = {'deadline': 'deadline'}
+    feed_ordering = 'created_at'  # AssignmentListView's keyset feed ignores ?ordering
+
+    subject_id = django_filters.CharFilter(field_name='subject')
+    teacher = django_filters.CharFilter(field_name='teacher')
+    deadline = django_filters.IsoDateTimeFromToRangeFilter()  # ?deadline_after=&deadline_before=
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('created_at', 'created_at'),
+            ('deadline', 'deadline'),
+        )
+    )
+
+    class Meta:
+        model = Assignment
+        fields = ['faculty', 'semester']
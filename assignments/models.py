@@ -10,6 +10,34 @@ class CustomDevice(AbstractFCMDevice):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # push fan-out: active devices of the users in a faculty
+            models.Index(fields=['user', 'active'], name='device_user_active_idx'),
+        ]
+
+
+class PushDelivery(models.Model):
+    """Stats of one push fan-out, written by assignments.push"""
+    kind = models.CharField(max_length=20)  # assignment / notice
+    object_id = models.CharField(max_length=50)
+    audience = models.JSONField(default=list)
+    devices = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    deactivated = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='push_delivery_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.sent}/{self.devices}"
+
 
 # class Subject(models.Model):
 #     FACULTY_CHOICES=[('bca','BCA'),('bim','BIM'),('csit','CSIT')]
@@ -48,5 +76,25 @@ class Assignment(models.Model):
     created_at=models.DateTimeField(auto_now_add=True)
     updated_at=models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # backs the keyset feed in AssignmentListView
+            models.Index(fields=['-created_at', '-assignment_id'], name='assignment_feed_idx'),
+            # backs AssignmentFilter: each filter followed by the orderings it allows
+            models.Index(fields=['faculty', 'semester', '-created_at'], name='assignment_fac_sem_created_idx'),
+            models.Index(fields=['faculty', 'semester', 'deadline'], name='assignment_fac_sem_dead_idx'),
+            models.Index(fields=['faculty', '-created_at'], name='assignment_fac_created_idx'),
+            models.Index(fields=['faculty', 'deadline'], name='assignment_fac_dead_idx'),
+            models.Index(fields=['semester', '-created_at'], name='assignment_sem_created_idx'),
+            models.Index(fields=['semester', 'deadline'], name='assignment_sem_dead_idx'),
+            models.Index(fields=['subject', '-created_at'], name='assignment_subject_created_idx'),
+            models.Index(fields=['subject', 'deadline'], name='assignment_subject_dead_idx'),
+            models.Index(fields=['teacher', '-created_at'], name='assignment_teacher_created_idx'),
+            models.Index(fields=['teacher', 'deadline'], name='assignment_teacher_dead_idx'),
+            models.Index(fields=['deadline'], name='assignment_deadline_idx'),
+            # the keyset /sync/changes walks
+            models.Index(fields=['updated_at', 'assignment_id'], name='assignment_sync_idx'),
+        ]
+
     def __str__(self):
         return self.title
\ No newline at end of file
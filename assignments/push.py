@@ -0,0 +1,177 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from firebase_admin import exceptions, messaging
+from utils.metrics import observe_outbound
+from .models import CustomDevice, PushDelivery
+
+logger = logging.getLogger(__name__)
+
+# Push fan-out: signals queue a push after the commit and return right away,
+# one background thread per process resolves the devices and sends FCM
+# multicasts of PUSH_BATCH_SIZE tokens. One thread keeps pushes in order and
+# stays well under FCM's rate limits.
+
+# FCM says the token is gone for good
+DEAD_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+# worth another try after a pause
+TRANSIENT_ERRORS = (
+    exceptions.UnavailableError,
+    exceptions.InternalError,
+    exceptions.DeadlineExceededError,
+    exceptions.ResourceExhaustedError,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='push')
+        return _executor
+
+
+def _data_value(value):
+    # lists and dicts as JSON the app can parse, not their Python repr
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+def queue_push(kind, object_id, faculties, title, body, data=None, image=None):
+    """
+    Send a push to the devices of `faculties` once the current transaction commits.
+    FCM data values must be strings, see _data_value.
+    """
+    if not settings.PUSH_NOTIFICATIONS_ENABLED:
+        return
+    push = {
+        'kind': kind,
+        'object_id': str(object_id),
+        'faculties': list(faculties),
+        'title': title,
+        'body': body,
+        'data': {str(key): _data_value(value) for key, value in (data or {}).items()},
+        'image': image,
+    }
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, push))
+
+
+def queue_assignment_push(assignment):
+    """The "new assignment" push, from post_save and the bulk create"""
+    queue_push(
+        'assignment', assignment.assignment_id, [assignment.faculty],
+        title="📘 New Assignment",
+        body=f"{assignment.title} ({assignment.subject}) has been added for {assignment.faculty}, "
+             f"{assignment.semester}. Due on {assignment.deadline.strftime('%Y-%m-%d')}",
+        data={
+            "assignment_id": assignment.assignment_id,
+            "faculty": assignment.faculty,
+            "semester": assignment.semester,
+            "subject": assignment.subject,
+            "route": "/getAssignment",
+        },
+    )
+
+
+def _run_in_worker(push):
+    try:
+        send_push(**push)
+    except Exception:
+        logger.exception("Push fan-out for %s %s failed", push['kind'], push['object_id'])
+    finally:
+        # pool threads live outside the request cycle, don't leak their connection
+        connection.close()
+
+
+def target_devices(faculties):
+    """Active devices of everyone who sees content for `faculties`"""
+    devices = CustomDevice.objects.filter(active=True)
+    if 'ALL' in faculties:
+        return devices
+    # users without a specific faculty (teachers, admins) see every faculty's content,
+    # same as the notices `audience=mine` filter
+    return devices.filter(Q(user__faculty__in=[*faculties, 'ALL']) | Q(user__faculty__isnull=True))
+
+
+def send_push(kind, object_id, faculties, title, body, data=None, image=None):
+    """Fan one notification out to every target device and record a PushDelivery"""
+    delivery = PushDelivery.objects.create(kind=kind, object_id=object_id, audience=faculties)
+    message = {
+        'notification': messaging.Notification(title=title, body=body, image=image),
+        'data': data or {},
+    }
+    stats = Counter()
+    dead = []
+
+    # keyset pages on pk, each one a short query, so no cursor (or transaction on
+    # a pooled connection) stays open across the FCM calls and backoff sleeps
+    devices = target_devices(faculties).order_by('pk')
+    last_pk = None
+    while True:
+        page = devices if last_pk is None else devices.filter(pk__gt=last_pk)
+        rows = list(page.values_list('pk', 'registration_id')[:settings.PUSH_BATCH_SIZE])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        _send_batch([token for _, token in rows], message, stats, dead)
+        if len(rows) < settings.PUSH_BATCH_SIZE:
+            break
+
+    if dead:
+        CustomDevice.objects.filter(registration_id__in=dead).update(active=False)
+    PushDelivery.objects.filter(pk=delivery.pk).update(
+        devices=stats['sent'] + stats['failed'] + len(dead),
+        sent=stats['sent'],
+        failed=stats['failed'],
+        deactivated=len(dead),
+        retries=stats['retries'],
+        finished_at=timezone.now(),
+    )
+    return delivery.pk
+
+
+def _send_batch(tokens, message, stats, dead):
+    """Send one multicast, retrying transient failures with exponential backoff"""
+    pending = tokens
+    for attempt in range(settings.PUSH_MAX_RETRIES + 1):
+        if attempt:
+            stats['retries'] += 1
+            time.sleep(settings.PUSH_RETRY_BACKOFF * 2 ** (attempt - 1))
+        try:
+            with observe_outbound('fcm', 'send_multicast'):
+                response = messaging.send_each_for_multicast(
+                    messaging.MulticastMessage(tokens=pending, **message),
+                    app=settings.FIREBASE_MESSAGING_APP,
+                )
+        except TRANSIENT_ERRORS as e:
+            logger.warning("Push batch of %d failed (%s), retrying", len(pending), e)
+            continue
+        except Exception:
+            logger.exception("Push batch of %d failed", len(pending))
+            break
+
+        retry = []
+        for token, result in zip(pending, response.responses):
+            if result.success:
+                stats['sent'] += 1
+            elif isinstance(result.exception, DEAD_TOKEN_ERRORS):
+                dead.append(token)
+            elif isinstance(result.exception, TRANSIENT_ERRORS):
+                retry.append(token)
+            else:
+                stats['failed'] += 1
+        pending = retry
+        if not pending:
+            return
+    stats['failed'] += len(pending)
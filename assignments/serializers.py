@@ -2,6 +2,12 @@
 from .models import CustomUser, Assignment, Subject
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, NotFound
+from fcm_django.models import DeviceType
+from django.db import transaction
+from django.utils import timezone
+from .signals import assignments_saved
+
+BULK_MAX_ITEMS = 100
 
 class MinimalSubjectSerializer(serializers.ModelSerializer):
     """Minimal subject serializer that only returns id and name"""
@@ -56,3 +62,89 @@ class AssignmentSerializer(serializers.ModelSerializer):
         model = Assignment
         fields = ['assignment_id', 'title', 'description', 'subject', 'teacher', 'deadline','faculty','semester']
         # read_only_fields = ['created_at', 'updated_at']  # These fields are read-only as they are auto-set
+
+
+
+# ---------- BULK SERIALIZERS ----------
+# bulk_create / bulk_update skip the model signals, so these do the cache bump, search index,
+# live events and pushes themselves.
+# Every item is validated first, nothing is written unless all of them are valid.
+
+class AssignmentBulkCreateSerializer(serializers.Serializer):
+    assignments = AssignmentCreateSerializer(many=True, allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+    def validate_assignments(self, items):
+        # every subject in one IN query
+        subjects = Subject.objects.in_bulk({item['subject_id'] for item in items})
+        errors = [
+            {} if item['subject_id'] in subjects
+            else {'subject_id': [f"Subject with id '{item['subject_id']}' does not exist."]}
+            for item in items
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        for item in items:
+            item['subject'] = subjects[item.pop('subject_id')]
+        return items
+
+    def create(self, validated_data):
+        teacher = validated_data['teacher']
+        assignments = [Assignment(teacher=teacher, **item) for item in validated_data['assignments']]
+        with transaction.atomic():
+            assignments = Assignment.objects.bulk_create(assignments)
+            # bulk_create doesn't send post_save
+            assignments_saved(assignments, created=True)
+        return assignments
+
+
+class AssignmentBulkUpdateItemSerializer(AssignmentUpdateSerializer):
+    assignment_id = serializers.CharField()
+
+
+class AssignmentBulkUpdateSerializer(serializers.Serializer):
+    """Partial updates by assignment_id, use with the queryset the ids are looked up in"""
+    assignments = AssignmentBulkUpdateItemSerializer(many=True, allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+    def validate_assignments(self, items):
+        ids = [item['assignment_id'] for item in items]
+        if len(set(ids)) != len(ids):
+            raise ValidationError("Each assignment_id can only appear once.")
+        found = self.instance.select_related('subject').in_bulk(ids)
+        errors = [
+            {} if assignment_id in found else {'assignment_id': [f"Assignment with id '{assignment_id}' does not exist."]}
+            for assignment_id in ids
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        for item in items:
+            item['instance'] = found[item.pop('assignment_id')]
+        return items
+
+    def update(self, queryset, validated_data):
+        now = timezone.now()
+        assignments, fields = [], {'updated_at'}
+        for item in validated_data['assignments']:
+            assignment = item.pop('instance')
+            for attr, value in item.items():
+                setattr(assignment, attr, value)
+            # bulk_update doesn't run auto_now
+            assignment.updated_at = now
+            fields.update(item)
+            assignments.append(assignment)
+        with transaction.atomic():
+            Assignment.objects.bulk_update(assignments, sorted(fields))
+            assignments_saved(assignments, created=False)
+        return assignments
+
+
+class AssignmentBulkDeleteSerializer(serializers.Serializer):
+    assignment_ids = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=BULK_MAX_ITEMS
+    )
+
+
+class DeviceRegisterSerializer(serializers.Serializer):
+    registration_ids = serializers.ListField(
+        child=serializers.CharField(max_length=4096), min_length=1, max_length=20
+    )
+    type = serializers.ChoiceField(choices=DeviceType.choices, required=False)
@@ -1,3 +1,450 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from firebase_admin import exceptions, messaging
+from notices.models import Notices
+from search.models import SearchDocument
+from subjects.models import Subject
+from .models import Assignment, CustomDevice, PushDelivery
+from .push import send_push, target_devices
+from .views import upsert_device_tokens
+from utils.middleware import ReplicaRoutingMiddleware
 
-# Create your tests here.
+User = get_user_model()
+
+
+class AssignmentListAPITest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        self.subject = Subject.objects.create(
+            name='Computer Network',
+            code='CN101',
+            credits=3,
+            created_by=self.teacher
+        )
+        for i in range(5):
+            Assignment.objects.create(
+                title=f'Assignment {i}',
+                description='Lab work',
+                subject=self.subject,
+                teacher=self.teacher,
+                faculty='BCA',
+                semester='First Semester'
+            )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_list_without_limit_returns_everything(self):
+        response = self.client.get('/assignments/list')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertEqual(response.data['data'][0]['subject']['name'], 'Computer Network')
+
+    def test_keyset_pages_cover_all_rows_once(self):
+        """Walking the cursor returns every assignment exactly once, newest first"""
+        seen = []
+        url = '/assignments/list?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['assignment_id'] for item in response.data['data'])
+            cursor = response.data['pagination']['next_cursor']
+            url = f'/assignments/list?limit=2&cursor={cursor}' if cursor else None
+
+        expected = list(
+            Assignment.objects.order_by('-created_at', '-assignment_id').values_list('assignment_id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """Subjects are joined, not fetched per row"""
+        self.client.get('/assignments/list?limit=1')  # warm up the auth user cache
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/assignments/list?limit=1')
+        with CaptureQueriesContext(connection) as large:
+            self.client.get('/assignments/list?limit=5')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_filters_and_ordering(self):
+        Assignment.objects.filter(title='Assignment 0').update(faculty='CSIT')
+        response = self.client.get('/assignments/list?faculty=CSIT')
+        self.assertEqual([a['title'] for a in response.data['data']], ['Assignment 0'])
+
+        response = self.client.get('/assignments/list?ordering=created_at&subject_id=' + self.subject.subject_id)
+        self.assertEqual(response.data['data'][0]['title'], 'Assignment 0')
+
+    def test_deadline_range_sorts_by_deadline(self):
+        now = timezone.now()
+        for i, assignment in enumerate(Assignment.objects.order_by('title')):
+            Assignment.objects.filter(pk=assignment.pk).update(deadline=now + timedelta(days=5 - i))
+        params = {'deadline_after': now.isoformat(), 'deadline_before': (now + timedelta(days=3, hours=1)).isoformat()}
+
+        response = self.client.get('/assignments/list', params)
+        self.assertEqual([a['title'] for a in response.data['data']], ['Assignment 4', 'Assignment 3', 'Assignment 2'])
+        response = self.client.get('/assignments/list', {**params, 'ordering': '-deadline'})
+        self.assertEqual(response.data['data'][0]['title'], 'Assignment 2')
+
+        # no index walks a deadline range in created_at order
+        for extra in ({'ordering': 'created_at'}, {'limit': 2}):
+            response = self.client.get('/assignments/list', {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_filter_value_is_rejected(self):
+        response = self.client.get('/assignments/list?faculty=MBA')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/assignments/list?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_csv_uses_list_filters(self):
+        Assignment.objects.filter(title='Assignment 0').update(faculty='CSIT')
+        response = self.client.get('/assignments/export?faculty=BCA')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response).decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['subject_name'], 'Computer Network')
+        self.assertNotIn('Assignment 0', [row['title'] for row in rows])
+
+    def test_export_ndjson(self):
+        response = self.client.get('/assignments/export?fmt=ndjson&ordering=created_at')
+        lines = b''.join(response).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], [f'Assignment {i}' for i in range(5)])
+
+    def test_export_rejects_bad_format_and_filters(self):
+        self.assertEqual(self.client.get('/assignments/export?fmt=xml').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/assignments/export?faculty=MBA').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncReadParityTest(APITestCase):
+    """The async GET path answers exactly like the sync one"""
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        subject = Subject.objects.create(name='Computer Network', code='CN101', credits=3, created_by=self.teacher)
+        self.assignments = [
+            Assignment.objects.create(
+                title=f'Assignment {i}', description='Lab work', subject=subject, teacher=self.teacher,
+                faculty='BCA', semester='First Semester'
+            )
+            for i in range(3)
+        ]
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def both(self, url, **headers):
+        responses = []
+        for enabled in (True, False):
+            with override_settings(ASYNC_READ_VIEWS=enabled):
+                responses.append(self.client.get(url, headers=headers))
+        return responses
+
+    def test_same_status_body_and_validators(self):
+        detail = f'/assignments/{self.assignments[0].assignment_id}'
+        for url in ('/assignments/list', '/assignments/list?limit=2', detail, '/assignments/missing'):
+            async_response, sync_response = self.both(url)
+            self.assertEqual(async_response.status_code, sync_response.status_code, url)
+            self.assertEqual(async_response.json(), sync_response.json(), url)
+            self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'), url)
+
+    def test_not_modified(self):
+        etag = self.client.get('/assignments/list')['ETag']
+        for response in self.both('/assignments/list', if_none_match=etag):
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unauthenticated(self):
+        self.client.credentials()
+        async_response, sync_response = self.both('/assignments/list')
+        self.assertEqual(async_response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response['WWW-Authenticate'], sync_response['WWW-Authenticate'])
+
+
+class ReplicaRoutingTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.subject = Subject.objects.create(name='Computer Network', code='CN101', credits=3,
+                                              created_by=self.teacher)
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def read_database(self, request):
+        """The database Assignment reads go to while the middleware handles `request`"""
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Assignment))
+            return HttpResponse()
+
+        ReplicaRoutingMiddleware(view)(request)
+        return seen[0]
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_safe_reads_of_listed_prefixes_use_a_replica(self):
+        factory = RequestFactory()
+        self.assertIn(self.read_database(factory.get('/assignments/list')), ['replica1', 'replica2'])
+        self.assertEqual(self.read_database(factory.get('/sync/changes')), 'default')
+        self.assertEqual(self.read_database(factory.post('/assignments/create')), 'default')
+        self.assertEqual(router.db_for_read(Assignment), 'default')  # reset after the request
+
+        pinned = factory.get('/assignments/list', headers={'X-Primary-Pin': str(time.time() + 5)})
+        self.assertEqual(self.read_database(pinned), 'default')
+        expired = factory.get('/assignments/list', headers={'X-Primary-Pin': str(time.time() - 1)})
+        self.assertIn(self.read_database(expired), ['replica1', 'replica2'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_write_pins_the_client_to_the_primary(self):
+        with mock.patch('assignments.push.get_executor'):
+            response = self.client.post('/assignments/create', {
+                'title': 'Lab 1', 'description': 'Lab work', 'subject_id': self.subject.subject_id,
+                'faculty': 'BCA', 'semester': 'First Semester'
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('primary_pin', response.cookies)
+        self.assertEqual(response['X-Primary-Pin'], response.cookies['primary_pin'].value)
+
+        # replica1 doesn't exist here, the list only works because it reads from the primary
+        response = self.client.get('/assignments/list')
+        self.assertEqual([a['title'] for a in response.data['data']], ['Lab 1'])
+
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.read_database(RequestFactory().get('/assignments/list')), 'default')
+
+
+@override_settings(PUSH_BATCH_SIZE=2, PUSH_RETRY_BACKOFF=0)
+class PushFanOutTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        bca = User.objects.create_user(
+            username='bca', email='bca@test.com', password='testpass123', role='student', faculty='BCA'
+        )
+        csit = User.objects.create_user(
+            username='csit', email='csit@test.com', password='testpass123', role='student', faculty='CSIT'
+        )
+        for user, token, active in [(bca, 'bca-phone', True), (bca, 'flaky', True), (bca, 'dead', True),
+                                    (bca, 'old-phone', False), (csit, 'csit-phone', True), (self.teacher, 'teacher-phone', True)]:
+            CustomDevice.objects.create(user=user, registration_id=token, active=active, type='android')
+        self.subject = Subject.objects.create(name='Computer Network', code='CN101', credits=3, created_by=self.teacher)
+
+    def test_targets_faculty_and_staff_devices(self):
+        tokens = set(target_devices(['BCA']).values_list('registration_id', flat=True))
+        self.assertEqual(tokens, {'bca-phone', 'flaky', 'dead', 'teacher-phone'})
+        self.assertEqual(target_devices(['ALL']).count(), 5)
+
+    @mock.patch('assignments.push.messaging.send_each_for_multicast')
+    def test_batches_retries_and_deactivates(self, send):
+        calls, busy_once = [], {'flaky'}
+
+        def fake_send(message, app=None):
+            calls.append(list(message.tokens))
+            results = []
+            for token in message.tokens:
+                if token == 'dead':
+                    results.append(messaging.SendResponse(None, messaging.UnregisteredError('gone')))
+                elif token in busy_once:
+                    busy_once.discard(token)
+                    results.append(messaging.SendResponse(None, exceptions.UnavailableError('busy')))
+                else:
+                    results.append(messaging.SendResponse({'name': f'sent/{token}'}, None))
+            return messaging.BatchResponse(results)
+
+        send.side_effect = fake_send
+        delivery = PushDelivery.objects.get(pk=send_push('assignment', 'a1', ['BCA'], 'New', 'Lab'))
+
+        self.assertTrue(all(len(tokens) <= 2 for tokens in calls))
+        self.assertIn(['flaky'], calls)
+        # pages follow each other on pk, every device once plus the retry
+        self.assertEqual(
+            sorted(token for tokens in calls for token in tokens),
+            sorted(['bca-phone', 'flaky', 'flaky', 'dead', 'teacher-phone'])
+        )
+        self.assertEqual((delivery.devices, delivery.sent, delivery.failed), (4, 3, 0))
+        self.assertEqual((delivery.deactivated, delivery.retries), (1, 1))
+        self.assertFalse(CustomDevice.objects.get(registration_id='dead').active)
+
+    def test_create_queues_push_after_commit(self):
+        with mock.patch('assignments.push.get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                Assignment.objects.create(title='Lab 1', description='Lab work', subject=self.subject,
+                                          teacher=self.teacher, faculty='BCA', semester='First Semester')
+        fanout, push = get_executor.return_value.submit.call_args.args
+        self.assertEqual(push['faculties'], ['BCA'])
+        self.assertIn('Lab 1', push['body'])
+
+    def test_list_data_is_sent_as_json(self):
+        with mock.patch('assignments.push.get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                notice = Notices.objects.create(title='Exam', issued_by=self.teacher, target_audience=['BCA', 'CSIT'])
+        fanout, push = get_executor.return_value.submit.call_args.args
+        self.assertEqual(push['data'], {
+            'notice_id': notice.notice_id, 'target_audience': '["BCA", "CSIT"]', 'route': '/getNotice',
+        })
+
+    @override_settings(PUSH_NOTIFICATIONS_ENABLED=False)
+    def test_disabled(self):
+        with mock.patch('assignments.push.get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                Assignment.objects.create(title='Lab 1', description='Lab work', subject=self.subject,
+                                          teacher=self.teacher, faculty='BCA', semester='First Semester')
+        get_executor.return_value.submit.assert_not_called()
+
+
+class DeviceRegistrationTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()  # login throttle buckets
+        self.student = User.objects.create_user(
+            username='student', email='student@test.com', password='testpass123', role='student', faculty='BCA'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@test.com', password='testpass123', role='student', faculty='BIM'
+        )
+
+    def test_upsert_is_one_statement(self):
+        CustomDevice.objects.create(user=self.other, registration_id='shared-phone', active=False, type='android')
+        with self.assertNumQueries(1):
+            upsert_device_tokens(self.student, ['shared-phone', 'new-phone', 'new-phone'])
+
+        devices = {d.registration_id: d for d in CustomDevice.objects.all()}
+        self.assertEqual(len(devices), 2)
+        self.assertEqual(devices['shared-phone'].user_id, self.student.pk)
+        self.assertTrue(devices['shared-phone'].active)
+
+    @override_settings(LAST_LOGIN_FLUSH_INTERVAL=0)  # no flusher thread in tests
+    def test_login_registers_device(self):
+        for _ in range(2):
+            response = self.client.post('/login', {
+                'email': 'student@test.com', 'password': 'testpass123', 'deviceToken': 'phone'
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CustomDevice.objects.get().user_id, self.student.pk)
+
+    def test_bulk_endpoint(self):
+        token = RefreshToken.for_user(self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        response = self.client.post('/assignments/devices/register',
+                                    {'registration_ids': ['phone', 'tablet'], 'type': 'android'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['registered'], 2)
+        self.assertEqual(CustomDevice.objects.filter(user=self.student, active=True).count(), 2)
+
+        response = self.client.post('/assignments/devices/register', {'registration_ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AssignmentBulkTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.network = Subject.objects.create(name='Computer Network', code='CN101', credits=3, created_by=self.teacher)
+        self.dbms = Subject.objects.create(name='DBMS', code='DB101', credits=3, created_by=self.teacher)
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def item(self, faculty, subject=None, **fields):
+        return {'title': 'Lab 1', 'description': 'Lab work', 'semester': 'First Semester',
+                'faculty': faculty, 'subject_id': (subject or self.network).subject_id, **fields}
+
+    def test_bulk_create_uses_one_insert(self):
+        with mock.patch('assignments.push.get_executor') as get_executor:
+            items = [self.item(faculty) for faculty in ('BCA', 'BIM', 'CSIT')] + [self.item('BCA', self.dbms)]
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/assignments/bulk/create', {'assignments': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([a['faculty'] for a in response.data['data']], ['BCA', 'BIM', 'CSIT', 'BCA'])
+        self.assertEqual(response.data['data'][3]['subject']['name'], 'DBMS')
+        self.assertEqual(len({a['assignment_id'] for a in response.data['data']}), 4)
+        self.assertEqual(Assignment.objects.count(), 4)
+        self.assertEqual(get_executor.return_value.submit.call_count, 4)  # one push per assignment
+        table = Assignment._meta.db_table
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        items = [self.item('BCA'), self.item('BIM', subject_id='missing'), self.item('MBA')]
+        response = self.client.post('/assignments/bulk/create', {'assignments': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['errors']['assignments']
+        self.assertEqual(errors[0], {})
+        self.assertIn('faculty', errors[2])
+        self.assertFalse(Assignment.objects.exists())
+
+        response = self.client.post('/assignments/bulk/create', {'assignments': items[:2]}, format='json')
+        self.assertEqual(response.data['errors']['assignments'][0], {})
+        self.assertIn('subject_id', response.data['errors']['assignments'][1])
+
+    def test_bulk_and_single_saves_have_the_same_effects(self):
+        with mock.patch('assignments.push.get_executor'), mock.patch('assignments.signals.queue_event') as queue_event:
+            with self.captureOnCommitCallbacks(execute=True):
+                single = Assignment.objects.create(title='Lab 1', description='Lab work', subject=self.network,
+                                                   teacher=self.teacher, faculty='BCA', semester='First Semester')
+                response = self.client.post('/assignments/bulk/create', {'assignments': [self.item('BIM')]}, format='json')
+                bulk_id = response.data['data'][0]['assignment_id']
+                self.client.patch('/assignments/bulk/update', {'assignments': [
+                    {'assignment_id': bulk_id, 'title': 'Lab 2'}]}, format='json')
+
+        self.assertEqual([call.args[:3] for call in queue_event.call_args_list], [
+            ('assignment', 'created', single.assignment_id),
+            ('assignment', 'created', bulk_id),
+            ('assignment', 'updated', bulk_id),
+        ])
+        documents = SearchDocument.objects.filter(kind='assignment')
+        self.assertEqual(dict(documents.values_list('object_id', 'title')), {single.assignment_id: 'Lab 1', bulk_id: 'Lab 2'})
+
+    def test_bulk_update_and_delete(self):
+        first, second = [
+            Assignment.objects.create(title=f'Lab {i}', description='Lab work', subject=self.network,
+                                      teacher=self.teacher, faculty='BCA', semester='First Semester')
+            for i in range(2)
+        ]
+        before = first.updated_at
+        response = self.client.patch('/assignments/bulk/update', {'assignments': [
+            {'assignment_id': first.assignment_id, 'title': 'Lab 1 (revised)'},
+            {'assignment_id': second.assignment_id, 'faculty': 'CSIT'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.title, first.faculty), ('Lab 1 (revised)', 'BCA'))
+        self.assertEqual((second.title, second.faculty), ('Lab 1', 'CSIT'))
+        self.assertGreater(first.updated_at, before)
+
+        response = self.client.patch('/assignments/bulk/update', {'assignments': [
+            {'assignment_id': 'missing', 'title': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/assignments/bulk/delete',
+                                    {'assignment_ids': [first.assignment_id, 'missing']}, format='json')
+        self.assertEqual(response.data['data'], [
+            {'assignment_id': first.assignment_id, 'deleted': True},
+            {'assignment_id': 'missing', 'deleted': False},
+        ])
+        self.assertEqual(list(Assignment.objects.values_list('pk', flat=True)), [second.assignment_id])
@@ -2,14 +2,24 @@ from django.urls import path
 from .views import (
     AssignmentCreateView,
     AssignmentListView,
+    AssignmentExportView,
     AssignmentDetailView,
     AssignmentUpdateView,
-    AssignmentDeleteView
+    AssignmentDeleteView,
+    DeviceRegisterView,
+    AssignmentBulkCreateView,
+    AssignmentBulkUpdateView,
+    AssignmentBulkDeleteView
 )
 
 urlpatterns = [
     path('create', AssignmentCreateView.as_view(), name='assignment-create'),
+    path('bulk/create', AssignmentBulkCreateView.as_view(), name='assignment-bulk-create'),
+    path('bulk/update', AssignmentBulkUpdateView.as_view(), name='assignment-bulk-update'),
+    path('bulk/delete', AssignmentBulkDeleteView.as_view(), name='assignment-bulk-delete'),
+    path('devices/register', DeviceRegisterView.as_view(), name='device-register'),
     path('list', AssignmentListView.as_view(), name='assignment-list'),
+    path('export', AssignmentExportView.as_view(), name='assignment-export'),
     path('<str:pk>', AssignmentDetailView.as_view(), name='assignment-detail'),
     path('update/<str:pk>', AssignmentUpdateView.as_view(), name='assignment-update'),
     path('delete/<str:pk>', AssignmentDeleteView.as_view(), name='assignment-delete'),
@@ -3,12 +3,22 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError, NotFound, PermissionDenied
-from django.db import transaction
+from django.db import OperationalError, transaction
+from django.http import Http404
 from .models import Assignment, Subject, CustomDevice
 from core.models import CustomUser
-from .serializers import AssignmentCreateSerializer, AssignmentSerializer,AssignmentUpdateSerializer
+from .serializers import (
+    AssignmentCreateSerializer, AssignmentSerializer, AssignmentUpdateSerializer, DeviceRegisterSerializer,
+    AssignmentBulkCreateSerializer, AssignmentBulkUpdateSerializer, AssignmentBulkDeleteSerializer
+)
+from .filters import AssignmentFilter
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 from utils.custompermissions import TeacherPermission
+from utils.pagination_class import KeysetPagination
+from utils.cache import cached_response_data, acached_response_data
+from utils.conditional import ConditionalGetMixin
+from utils.asyncviews import AsyncReadMixin
+from utils.export import ExportView, EXPORT_PARAMETERS
 
 @extend_schema(
     summary="Create new assignment",
@@ -43,6 +53,8 @@ class AssignmentCreateView(generics.CreateAPIView):
                     }, status=status.HTTP_400_BAD_REQUEST)
         except Subject.DoesNotExist:
             raise NotFound("Subject not found")
+        except OperationalError:
+            raise
         except Exception as e:
             print(e)
             return Response({
@@ -52,49 +64,118 @@ class AssignmentCreateView(generics.CreateAPIView):
 
 @extend_schema(
     summary="Get all assignments",
-    description="Retrieve all assignments with subject and teacher details",
+    description="Retrieve all assignments with subject and teacher details. "
+                "Send `limit` (and then `cursor` from the previous page) to get a keyset-paginated feed. "
+                "Filter with faculty, semester, subject_id, teacher, deadline_after/deadline_before and sort with "
+                "`ordering` (created_at, deadline); ordering is ignored in the keyset feed. A deadline range is sorted "
+                "by deadline and can't be combined with another ordering or the keyset feed.",
     tags=['Assignments']
 )
-class AssignmentListView(generics.ListAPIView):
+class AssignmentListView(ConditionalGetMixin, AsyncReadMixin, generics.ListAPIView):
     """API View to retrieve all assignments"""
     permission_classes = [permissions.IsAuthenticated]
+    conditional_namespaces = ('assignments',)
     serializer_class = AssignmentSerializer
-    queryset = Assignment.objects.all().order_by("created_at").reverse()
+    pagination_class = KeysetPagination
+    keyset_ordering = ('created_at', 'assignment_id')
+    filterset_class = AssignmentFilter
+
+    def get_queryset(self):
+        return Assignment.objects.select_related('subject').order_by('-created_at', '-assignment_id')
 
     def list(self, request, *args, **kwargs):
         try:
-            assignments = self.get_queryset()
-            data = []
-            for assignment in assignments:
-                serializer = self.get_serializer(assignment)
-                assignment_data = dict(serializer.data)
-                data.append(assignment_data)
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.paginator.get_paginated_response(serializer.data, 'Assignments retrieved successfully')
+
+            # Fallback if the client did not ask for a page
+            serializer = self.get_serializer(queryset, many=True)
             return Response({
-                'data': data,
+                'data': serializer.data,
                 'message': 'Assignments retrieved successfully'
             }, status=status.HTTP_200_OK)
+        except (NotFound, ValidationError):
+            raise
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to retrieve assignments'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    async def alist(self, request, *args, **kwargs):
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.apaginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.paginator.get_paginated_response(serializer.data, 'Assignments retrieved successfully')
+
+            serializer = self.get_serializer([assignment async for assignment in queryset.aiterator()], many=True)
+            return Response({
+                'data': serializer.data,
+                'message': 'Assignments retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except (NotFound, ValidationError):
+            raise
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': 'Failed to retrieve assignments'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(
+    summary="Export assignments",
+    description="Stream every assignment matching the list filters as CSV or NDJSON (`fmt`). "
+                "Not paginated, meant for reports and audits.",
+    parameters=EXPORT_PARAMETERS,
+    responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str},
+    tags=['Assignments']
+)
+class AssignmentExportView(ExportView):
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_class = AssignmentFilter
+    export_name = 'assignments'
+    export_fields = (
+        ('assignment_id', 'assignment_id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('subject_id', 'subject_id'),
+        ('subject_name', 'subject__name'),
+        ('teacher_id', 'teacher_id'),
+        ('deadline', 'deadline'),
+        ('semester', 'semester'),
+        ('faculty', 'faculty'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    def get_queryset(self):
+        return Assignment.objects.order_by('-created_at', '-assignment_id')
+
 
 @extend_schema(
     summary="Get assignment by ID",
     description="Retrieve a specific assignment by its ID",
     tags=['Assignments']
 )
-class AssignmentDetailView(generics.RetrieveAPIView):
+class AssignmentDetailView(ConditionalGetMixin, AsyncReadMixin, generics.RetrieveAPIView):
     """API View to retrieve assignment by ID"""
     permission_classes = [permissions.IsAuthenticated]
+    conditional_namespaces = ('assignments',)
     serializer_class = AssignmentSerializer
-    queryset = Assignment.objects.all()
+    queryset = Assignment.objects.select_related('subject')
     
     def retrieve(self, request, *args, **kwargs):
         try:
-            assignment = self.get_object()
-            serializer = self.get_serializer(assignment)
-            assignment_data = dict(serializer.data)
+            assignment_data = cached_response_data(
+                request, ('assignments',), lambda: self.get_serializer(self.get_object()).data
+            )
             # assignment_data['subjectName'] = assignment.subject.name
             # assignment_data['teacher'] = assignment.teacher.name
             # assignment_data['teacherId'] = assignment.teacher.id
@@ -102,8 +183,29 @@ class AssignmentDetailView(generics.RetrieveAPIView):
                 'data': assignment_data,
                 'message': 'Assignment retrieved successfully'
             }, status=status.HTTP_200_OK)
-        except Assignment.DoesNotExist:
+        except (Assignment.DoesNotExist, Http404):
             raise NotFound("Assignment not found")
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': 'Failed to retrieve assignment'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        async def build():
+            return self.get_serializer(await self.aget_object()).data
+
+        try:
+            assignment_data = await acached_response_data(request, ('assignments',), build)
+            return Response({
+                'data': assignment_data,
+                'message': 'Assignment retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except (Assignment.DoesNotExist, Http404):
+            raise NotFound("Assignment not found")
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to retrieve assignment'
@@ -170,6 +272,8 @@ class AssignmentUpdateView(generics.UpdateAPIView):
                     }, status=status.HTTP_400_BAD_REQUEST)
         except Assignment.DoesNotExist:
             raise NotFound("Assignment not found")
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to update assignment',
@@ -196,11 +300,113 @@ class AssignmentDeleteView(generics.DestroyAPIView):
                 }, status=status.HTTP_200_OK)
         except Assignment.DoesNotExist:
             raise NotFound("Assignment not found")
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to delete assignment'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@extend_schema(
+    summary="Create assignments in bulk",
+    description="Create up to 100 assignments in one transaction, e.g. the same assignment for several "
+                "faculties. All items are validated first, on any error nothing is created and `errors` "
+                "holds one entry per item (empty for valid ones).",
+    request=AssignmentBulkCreateSerializer,
+    tags=['Assignments']
+)
+class AssignmentBulkCreateView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, TeacherPermission]
+    serializer_class = AssignmentBulkCreateSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'message': 'Validation error',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        assignments = serializer.save(teacher=request.user)
+        return Response({
+            'data': AssignmentSerializer(assignments, many=True).data,
+            'message': f'{len(assignments)} assignments created successfully'
+        }, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    summary="Update assignments in bulk",
+    description="Partially update up to 100 assignments, each item needs its assignment_id. "
+                "All or nothing, like the bulk create.",
+    request=AssignmentBulkUpdateSerializer,
+    tags=['Assignments']
+)
+class AssignmentBulkUpdateView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, TeacherPermission]
+    serializer_class = AssignmentBulkUpdateSerializer
+    queryset = Assignment.objects.all()
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_queryset(), data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response({
+                'message': 'Validation error',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        assignments = serializer.save()
+        return Response({
+            'data': AssignmentSerializer(assignments, many=True).data,
+            'message': f'{len(assignments)} assignments updated successfully'
+        }, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Delete assignments in bulk",
+    description="Delete up to 100 assignments by id. `data` tells for each id whether it was deleted "
+                "or did not exist.",
+    request=AssignmentBulkDeleteSerializer,
+    tags=['Assignments']
+)
+class AssignmentBulkDeleteView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, TeacherPermission]
+    serializer_class = AssignmentBulkDeleteSerializer
+    queryset = Assignment.objects.all()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['assignment_ids']))
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(pk__in=ids)
+            found = set(queryset.values_list('pk', flat=True))
+            # queryset.delete still sends post_delete per row, that bumps the cache
+            queryset.delete()
+        return Response({
+            'data': [{'assignment_id': pk, 'deleted': pk in found} for pk in ids],
+            'message': f'{len(found)} assignments deleted successfully'
+        }, status=status.HTTP_200_OK)
+
+
+def upsert_device_tokens(user, device_tokens, device_type=''):
+    """
+    Register or refresh device tokens for a user in one INSERT ... ON CONFLICT.
+    A token already known (also from another account) is moved to `user` and reactivated.
+    Stale tokens of the user's old installs are deactivated by the push fan-out once FCM
+    reports them unregistered.
+    """
+    devices = [
+        CustomDevice(user=user, registration_id=token, type=device_type, active=True)
+        # duplicates in one statement make ON CONFLICT fail on Postgres
+        for token in dict.fromkeys(device_tokens) if token
+    ]
+    CustomDevice.objects.bulk_create(
+        devices,
+        update_conflicts=True,
+        unique_fields=['registration_id'],
+        update_fields=['user', 'active', 'updated_at'],
+    )
+    return len(devices)
+
+
 def register_device_token(user, device_token):
     """
     Register a device token for the authenticated user.
@@ -209,34 +415,32 @@ def register_device_token(user, device_token):
     try:  
         if not device_token:
             return False
-
-        # Check if user has existing devices
-        existing_devices = CustomDevice.objects.filter(user=user, active=True)
-        device_count = existing_devices.count()
-
-        # If user has exactly one device, update its registration_id
-        if device_count == 1:
-            existing_device = existing_devices.first()
-            existing_device.registration_id = device_token
-            existing_device.save()
-            return True
-
-        # Otherwise, use the original get_or_create logic
-        device, created = CustomDevice.objects.get_or_create(
-            registration_id=device_token,
-            defaults={
-                'user': user,
-                'active': True,
-            }
-        )
-        
-        if not created:
-            # If device already exists, update user and set active
-            device.user = user
-            device.active = True
-            device.save()
-
+        upsert_device_tokens(user, [device_token])
         return True
         
     except Exception as e:
-        return False
\ No newline at end of file
+        return False
+
+
+@extend_schema(
+    summary="Register device tokens",
+    description="Register or refresh up to 20 FCM device tokens of the authenticated user in one call.",
+    request=DeviceRegisterSerializer,
+    tags=['Devices']
+)
+class DeviceRegisterView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = DeviceRegisterSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        count = upsert_device_tokens(
+            request.user,
+            serializer.validated_data['registration_ids'],
+            serializer.validated_data.get('type', ''),
+        )
+        return Response({
+            'data': {'registered': count},
+            'message': 'Devices registered successfully'
+        }, status=status.HTTP_200_OK)
\ No newline at end of file
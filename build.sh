@@ -7,4 +7,12 @@ python manage.py makemigrations --noinput
 
 python manage.py migrate --noinput
 
+python manage.py sync_notice_audience
+
+python manage.py sync_file_variants
+
+python manage.py sync_search_index
+
+python manage.py prune_tombstones
+
 python manage.py collectstatic --noinput
\ No newline at end of file
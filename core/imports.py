@@ -0,0 +1,221 @@
+import csv
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from .models import CustomUser
+
+# Bulk user import (POST /users/import and `manage.py import_users`).
+# Rows are read from a text stream one chunk at a time, so the whole file is
+# never held in memory. Per chunk: validate every row, check username/email
+# against the file so far and the database with one IN query, hash the
+# passwords across a process pool and insert with one bulk_create.
+
+CHUNK_SIZE = 500
+FORMATS = ('csv', 'ndjson')
+
+_request_pool = None
+_request_pool_lock = threading.Lock()
+
+
+class UserImportRowSerializer(serializers.ModelSerializer):
+    """Same fields and required fields as CustomUserSerializer, plus faculty"""
+    class Meta:
+        model = CustomUser
+        fields = ['username', 'email', 'password', 'name', 'gender', 'role', 'contact', 'faculty']
+        extra_kwargs = {
+            # uniqueness is checked for the whole chunk at once
+            'username': {'validators': []},
+            'email': {'validators': []},
+        }
+
+    def validate(self, attrs):
+        required_fields = ['username', 'email', 'name', 'gender', 'role', 'contact', 'password']
+        missing_fields = [field for field in required_fields if not attrs.get(field)]
+        if missing_fields:
+            raise ValidationError(f"Missing required fields: {', '.join(missing_fields)}")
+        attrs['email'] = CustomUser.objects.normalize_email(attrs['email'])
+        return attrs
+
+
+class UnreadableFile(ValueError):
+    """The stream stopped decoding or parsing part way, `report` covers the rows before it"""
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def detect_format(filename, fmt=None):
+    fmt = fmt or ('ndjson' if filename.endswith(('.ndjson', '.jsonl')) else 'csv')
+    if fmt not in FORMATS:
+        raise ValidationError({"message": f"Unsupported format '{fmt}', use csv or ndjson."})
+    return fmt
+
+
+def iter_rows(stream, fmt):
+    """(line number, row dict or None, parse error or None) for each record of a text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # empty cells are missing values, not empty strings
+            yield reader.line_num, {key: value for key, value in row.items() if key and value}, None
+        return
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_num, row, None
+        else:
+            yield line_num, None, "Each line must be a JSON object."
+
+
+def _new_pool(workers):
+    # spawn, forking a server process that runs threads isn't safe
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+    )
+
+
+def request_pool():
+    """
+    Hashing pool of this server process for /users/import, None when
+    USER_IMPORT_REQUEST_WORKERS is 0. Created on the first import and kept,
+    so each of its processes runs django.setup() once and not per request.
+    """
+    global _request_pool
+    if not settings.USER_IMPORT_REQUEST_WORKERS:
+        return None
+    with _request_pool_lock:
+        # a killed worker process breaks the pool for good, start a new one
+        if _request_pool is None or _request_pool._broken:
+            _request_pool = _new_pool(settings.USER_IMPORT_REQUEST_WORKERS)
+        return _request_pool
+
+
+@contextmanager
+def hashing_pool(workers):
+    """A pool of `workers` processes for one import (the command), None for 0"""
+    if not workers:
+        yield None
+        return
+    executor = _new_pool(workers)
+    try:
+        yield executor
+    finally:
+        executor.shutdown()
+
+
+def _hash_passwords(passwords, executor):
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def _build_user(attrs):
+    # what CustomUserManager.create_user does, minus the save
+    user = CustomUser(**attrs)
+    if user.role in ['admin', 'teacher']:
+        user.is_staff = True
+    if user.role == 'admin':
+        user.is_superuser = True
+    return user
+
+
+def import_users(stream, fmt, executor=None):
+    """
+    Import users from a csv/ndjson text stream, valid rows are created even when
+    others fail. Passwords are hashed on `executor` (see request_pool and
+    hashing_pool), in this process without one.
+    Returns {'created', 'failed', 'errors': [{'row', 'errors'}]}. Raises
+    UnreadableFile if the stream can't be decoded or parsed, the chunks read
+    before it stay imported.
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+    seen_usernames, seen_emails = set(), set()
+    rows = iter_rows(stream, fmt)
+    last_row = 0
+    try:
+        while True:
+            chunk = list(islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            _import_chunk(chunk, report, seen_usernames, seen_emails, executor)
+            last_row = chunk[-1][0]
+    except (UnicodeDecodeError, csv.Error) as e:
+        report['errors'].sort(key=lambda error: error['row'])
+        raise UnreadableFile(
+            f"Could not read the file after row {last_row} ({e}), {report['created']} users imported before it.",
+            report,
+        ) from e
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
+
+
+def _import_chunk(chunk, report, seen_usernames, seen_emails, executor):
+    def fail(line_num, errors):
+        report['failed'] += 1
+        report['errors'].append({'row': line_num, 'errors': errors})
+
+    valid = []
+    for line_num, row, parse_error in chunk:
+        if parse_error:
+            fail(line_num, {'non_field_errors': [parse_error]})
+            continue
+        serializer = UserImportRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((line_num, serializer.validated_data))
+        else:
+            fail(line_num, serializer.errors)
+
+    # one IN query for both unique columns of the whole chunk
+    existing = CustomUser.objects.filter(
+        Q(username__in=[attrs['username'] for _, attrs in valid]) | Q(email__in=[attrs['email'] for _, attrs in valid])
+    ).values_list('username', 'email')
+    taken_usernames = {username for username, _ in existing}
+    taken_emails = {email for _, email in existing}
+
+    fresh = []
+    for line_num, attrs in valid:
+        errors = {}
+        if attrs['username'] in taken_usernames or attrs['username'] in seen_usernames:
+            errors['username'] = ["A user with that username already exists."]
+        if attrs['email'] in taken_emails or attrs['email'] in seen_emails:
+            errors['email'] = ["A user with that email already exists."]
+        seen_usernames.add(attrs['username'])
+        seen_emails.add(attrs['email'])
+        if errors:
+            fail(line_num, errors)
+        else:
+            fresh.append((line_num, attrs))
+    if not fresh:
+        return
+
+    hashes = _hash_passwords([attrs['password'] for _, attrs in fresh], executor)
+    users = [_build_user({**attrs, 'password': hashed}) for (_, attrs), hashed in zip(fresh, hashes)]
+    try:
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(users)
+        report['created'] += len(users)
+    except IntegrityError:
+        # someone else created one of these meanwhile, find out which row by row
+        for (line_num, _), user in zip(fresh, users):
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                report['created'] += 1
+            except IntegrityError:
+                fail(line_num, {'non_field_errors': ["A user with that username or email already exists."]})
@@ -0,0 +1,76 @@
+import atexit
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500  # users per UPDATE ... CASE
+
+
+class LastLoginBuffer:
+    """
+    Per-process write-behind buffer for CustomUser.last_login.
+
+    A login only records (pk, time) in memory, a daemon thread writes everything
+    collected with one UPDATE ... CASE every LAST_LOGIN_FLUSH_INTERVAL seconds and
+    the rest goes out at exit. Repeated logins of a user between flushes become
+    one write. With an interval of 0 the login does a narrow UPDATE right away.
+    """
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, user_id, when):
+        interval = settings.LAST_LOGIN_FLUSH_INTERVAL
+        if not interval:
+            CustomUser.objects.filter(pk=user_id).update(last_login=when)
+            return
+        with self._lock:
+            self._merge({user_id: when})
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(interval,), name='last-login', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Write all pending logins, returns how many users were written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[start:start + FLUSH_BATCH_SIZE]
+                # queryset.update skips save() and the signals, updated_at is left alone
+                CustomUser.objects.filter(pk__in=[pk for pk, _ in batch]).update(last_login=Case(
+                    *[When(pk=pk, then=Value(when)) for pk, when in batch],
+                    output_field=DateTimeField(),
+                ))
+        except Exception:
+            logger.exception("Writing last_login of %d user(s) failed, retrying on the next flush", len(items))
+            with self._lock:
+                self._merge(pending)
+            return 0
+        return len(items)
+
+    def _merge(self, logins):
+        for pk, when in logins.items():
+            current = self._pending.get(pk)
+            self._pending[pk] = when if current is None else max(current, when)
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            finally:
+                # this thread lives outside the request cycle, don't hold a connection between flushes
+                connection.close()
+
+
+last_login_buffer = LastLoginBuffer()
+atexit.register(last_login_buffer.flush)
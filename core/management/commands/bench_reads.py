@@ -0,0 +1,150 @@
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+DEFAULT_PATHS = ['/assignments/list?limit=20', '/notices/list?limit=20', '/subjects/list']
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client, enough for JSON responses (content-length or chunked)"""
+
+    def __init__(self, host, port, token):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write((
+            f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'Authorization: Bearer {self.token}\r\nAccept: application/json\r\n\r\n'
+        ).encode())
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode().partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while size := int((await self.reader.readline()).strip(), 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        else:
+            await self.reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection') == 'close':
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_load(host, port, token, paths, concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        client = Client(host, port, token)
+        i = offset
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await client.get(paths[i % len(paths)])
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    errors += 1
+                    await client.close()
+                    continue
+                if status >= 400:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                i += 1
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def wait_until_up(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise CommandError(f"server on {host}:{port} did not start")
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the read endpoints under uvicorn with ASYNC_READ_VIEWS on and off, "
+        "reporting req/s and p50/p95 latency per concurrency level"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="username the requests authenticate as")
+        parser.add_argument('--path', action='append', dest='paths', help=f"default: {', '.join(DEFAULT_PATHS)}")
+        parser.add_argument('--concurrency', default='1,10,50,100', help="comma separated connection counts")
+        parser.add_argument('--duration', type=float, default=10, help="seconds per concurrency level")
+        parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 1)))
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--mode', choices=['async', 'sync', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"no user {options['user']!r}")
+        token = str(RefreshToken.for_user(user).access_token)
+        paths = options['paths'] or DEFAULT_PATHS
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        modes = ['async', 'sync'] if options['mode'] == 'both' else [options['mode']]
+
+        for mode in modes:
+            env = dict(os.environ, ASYNC_READ_VIEWS='1' if mode == 'async' else '0')
+            server = subprocess.Popen([
+                sys.executable, '-m', 'uvicorn', 'myapi1.asgi:application', '--host', '127.0.0.1',
+                '--port', str(options['port']), '--workers', str(options['workers']), '--no-access-log',
+            ], env=env)
+            try:
+                asyncio.run(wait_until_up('127.0.0.1', options['port']))
+                for level in levels:
+                    latencies, errors, elapsed = asyncio.run(
+                        run_load('127.0.0.1', options['port'], token, paths, level, options['duration'])
+                    )
+                    if not latencies:
+                        self.stderr.write(f"{mode} c={level}: no successful requests ({errors} errors)")
+                        continue
+                    self.stdout.write(
+                        f"{mode:5} c={level:<4} {len(latencies) / elapsed:8.1f} req/s  "
+                        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                        f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  errors {errors}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
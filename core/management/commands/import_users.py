@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.imports import FORMATS, UnreadableFile, detect_format, hashing_pool, import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk import users from a CSV (header row) or NDJSON file, rejected rows are reported"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="default: from the file extension, else csv")
+        parser.add_argument('--workers', type=int, help="password hashing processes (USER_IMPORT_WORKERS)")
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['path'], options['format'])
+        workers = settings.USER_IMPORT_WORKERS if options['workers'] is None else options['workers']
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream, hashing_pool(workers) as executor:
+                report = import_users(stream, fmt, executor)
+        except (OSError, UnreadableFile) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} user(s), rejected {report['failed']} row(s)"
+        ))
@@ -82,5 +82,11 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD='email'
     REQUIRED_FIELDS = ['username', 'role']  # Required fields excluding USERNAME_FIELD
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # push fan-out targets users by faculty
+            models.Index(fields=['faculty'], name='user_faculty_idx'),
+        ]
+
     def __str__(self):
         return self.name
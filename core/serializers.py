@@ -53,6 +53,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
            # Add custom claims here
         token['email'] = user.email
         token['role'] = user.role
+        token['faculty'] = user.faculty
 
         token['user_id'] = user.id
         return token
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import CustomUser
+from utils.authentication import user_cache
+from utils.cache import bump_namespace
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    # the auth cache must never hand out a row that changed in this worker
+    user_cache.discard(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_issuer_cache(sender, instance, update_fields=None, **kwargs):
+    # notices embed the issuer name and files the owner's username,
+    # a last_login-only write can't change either
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_namespace('notices', 'files')
@@ -1,3 +1,417 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import imports
+from core.serializers import MyTokenObtainPairSerializer
+from core.lastlogin import LastLoginBuffer
+from utils.authentication import user_cache
+from utils.instrumentation import start_request, stop_request
+from fileandimage.models import FileAndImage
+from notices.models import Notices
+from fileandimage.storage import upload_file
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ClaimsJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@test.com',
+            password='testpass123',
+            role='student',
+            faculty='BCA'
+        )
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in ctx.captured_queries if 'core_customuser' in q['sql']]
+
+    def test_token_with_claims_skips_user_lookup_on_reads(self):
+        token = MyTokenObtainPairSerializer.get_token(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.user_queries('/subjects/list'), [])
+
+    def test_token_without_claims_uses_cached_user(self):
+        token = RefreshToken.for_user(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(len(self.user_queries('/subjects/list')), 1)
+        self.assertEqual(self.user_queries('/subjects/list'), [])
+
+    def test_saving_user_evicts_cache(self):
+        token = RefreshToken.for_user(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.user_queries('/subjects/list')
+        self.student.is_active = False
+        self.student.save()
+        response = self.client.get('/subjects/list')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_get_real_user(self):
+        token = MyTokenObtainPairSerializer.get_token(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/subjects/create', {'name': 'Physics', 'code': 'PHY101', 'credits': 3})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LastLoginBufferTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()  # login throttle buckets
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@test.com', password='testpass123',
+                                     role='student', faculty='BCA')
+            for i in range(3)
+        ]
+
+    @mock.patch('core.lastlogin.threading.Thread')
+    def test_logins_are_flushed_in_one_update(self, thread):
+        buffer = LastLoginBuffer()
+        first, later = timezone.now() - timedelta(minutes=1), timezone.now()
+        buffer.record(self.users[0].pk, later)
+        buffer.record(self.users[0].pk, first)  # out of order, the newest wins
+        buffer.record(self.users[1].pk, first)
+        thread.return_value.start.assert_called_once()
+        updated_at = User.objects.get(pk=self.users[0].pk).updated_at
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.flush(), 0)
+
+        user = User.objects.get(pk=self.users[0].pk)
+        self.assertEqual(user.last_login, later)
+        self.assertEqual(user.updated_at, updated_at)
+        self.assertEqual(User.objects.get(pk=self.users[1].pk).last_login, first)
+        self.assertIsNone(User.objects.get(pk=self.users[2].pk).last_login)
+
+    @mock.patch('core.views.last_login_buffer')
+    def test_login_does_not_write_the_user(self, buffer):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/login', {'email': 'user0@test.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        buffer.record.assert_called_once()
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+
+@override_settings(THROTTLE_RATES={'login_ip': '100/min', 'login_email': '2/min'})
+class LoginThrottleTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()  # the buckets live in the shared cache
+        User.objects.create_user(username='student', email='student@test.com', password='testpass123',
+                                 role='student', faculty='BCA')
+
+    def login(self, email, password='wrong'):
+        return self.client.post('/login', {'email': email, 'password': password})
+
+    def test_email_bucket_rejects_before_hashing(self):
+        for _ in range(2):
+            self.assertEqual(self.login('student@test.com').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with mock.patch('core.views.check_password') as check_password:
+            response = self.login('Student@test.com ', password='testpass123')
+        check_password.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data['success'], False)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # other accounts are not affected
+        self.assertEqual(self.login('teacher@test.com').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_non_object_body_is_a_bad_request(self):
+        for path in ('/login', '/api/token'):
+            response = self.client.post(path, ['student@test.com'], format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, path)
+
+    @override_settings(THROTTLE_RATES={'login_ip': '1/min'})
+    def test_ip_bucket_covers_token_endpoint(self):
+        self.login('student@test.com')
+        response = self.client.post('/api/token', {'email': 'student@test.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(USER_IMPORT_REQUEST_WORKERS=0, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTest(APITestCase):
+    HEADER = 'username,email,password,name,gender,role,contact,faculty\n'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@test.com', password='testpass123',
+                                              role='admin')
+        token = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def upload(self, content, name='students.csv'):
+        content = content if isinstance(content, bytes) else content.encode()
+        file = SimpleUploadedFile(name, content, content_type='text/csv')
+        return self.client.post('/users/import', {'file': file}, format='multipart')
+
+    def test_csv_import_reports_bad_rows(self):
+        rows = [
+            's1,s1@test.com,pass1234,Student One,male,student,9800000001,BCA',
+            's2,s2@test.com,pass1234,Student Two,female,student,,BCA',         # no contact
+            'admin,s3@test.com,pass1234,Taken,male,student,9800000003,BIM',    # username exists
+            's4,s1@test.com,pass1234,Same Email,male,student,9800000004,BIM',  # email earlier in the file
+            's5,s5@test.com,pass1234,Student Five,male,student,9800000005,MBA',  # unknown faculty
+            's6,s6@test.com,pass1234,Student Six,female,student,9800000006,CSIT',
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.upload(self.HEADER + '\n'.join(rows))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data['data']
+        self.assertEqual((report['created'], report['failed']), (2, 4))
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4, 5, 6])
+        self.assertIn('username', report['errors'][1]['errors'])
+        self.assertIn('email', report['errors'][2]['errors'])
+        self.assertIn('faculty', report['errors'][3]['errors'])
+
+        student = User.objects.get(username='s1')
+        self.assertTrue(student.check_password('pass1234'))
+        self.assertEqual((student.faculty, student.is_staff), ('BCA', False))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_file_that_is_not_utf8_is_rejected(self):
+        content = self.HEADER + 's1,s1@test.com,pass1234,José,male,student,9800000001,BCA\n'
+        response = self.upload(content.encode('latin-1'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Could not read the file', response.data['message'])
+        self.assertEqual(response.data['data']['created'], 0)
+        self.assertFalse(User.objects.filter(username='s1').exists())
+
+    def test_command_rejects_malformed_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(self.HEADER + 's1,s1@test.com,pass1234,One,male,student,98001,BCA\n')
+            file.write('s2,s2@test.com,' + 'x' * 200000 + '\n')  # over the csv field size limit
+        self.addCleanup(os.remove, file.name)
+
+        with mock.patch('core.imports.CHUNK_SIZE', 1), self.assertRaisesMessage(CommandError, 'after row 2'):
+            call_command('import_users', file.name, workers=0, stdout=StringIO(), stderr=StringIO())
+        # the chunk read before the bad row stays imported
+        self.assertTrue(User.objects.filter(username='s1').exists())
+
+    def test_admin_only(self):
+        student = User.objects.create_user(username='student', email='student@test.com', password='testpass123',
+                                           role='student')
+        token = RefreshToken.for_user(student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        self.assertEqual(self.upload(self.HEADER).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(USER_IMPORT_REQUEST_WORKERS=1)
+    def test_requests_share_one_pool(self):
+        self.addCleanup(setattr, imports, '_request_pool', None)
+        self.addCleanup(lambda: imports._request_pool and imports._request_pool.shutdown())
+        with mock.patch('core.imports._new_pool', wraps=imports._new_pool) as new_pool:
+            self.assertEqual(self.upload(self.HEADER + 's1,s1@test.com,pass1234,One,male,student,98001,BCA').status_code,
+                             status.HTTP_200_OK)
+            self.assertEqual(self.upload(self.HEADER + 's2,s2@test.com,pass1234,Two,male,student,98002,BCA').status_code,
+                             status.HTTP_200_OK)
+
+        new_pool.assert_called_once_with(1)
+        # hashed in the pool, whose process loads the real settings
+        self.assertTrue(User.objects.get(username='s2').password.startswith('pbkdf2_sha256$'))
+
+    def test_ndjson_command_hashes_in_worker_processes(self):
+        rows = [
+            {'username': 't1', 'email': 't1@test.com', 'password': 'pass1234', 'name': 'Teacher One',
+             'gender': 'male', 'role': 'teacher', 'contact': '9800000001'},
+            {'username': 's1', 'email': 's1@test.com', 'password': 'pass1234', 'name': 'Student One',
+             'gender': 'female', 'role': 'student', 'contact': '9800000002', 'faculty': 'CSIT'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write('\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        self.addCleanup(os.remove, file.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_users', file.name, workers=2, stdout=out, stderr=err)
+        self.assertIn('Imported 2 user(s), rejected 1 row(s)', out.getvalue())
+        self.assertIn('row 3', err.getvalue())
+        self.assertTrue(User.objects.get(username='t1').is_staff)
+        # the worker processes load the real settings, not this test's MD5 override
+        self.assertTrue(User.objects.get(username='s1').password.startswith('pbkdf2_sha256$'))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class DatabasePoolTest(APITestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', email='admin@test.com', password='testpass123',
+                                         role='admin')
+        token = RefreshToken.for_user(admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_stats_without_pool(self):
+        response = self.client.get('/health/db')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['pooled'], False)
+
+    @staticmethod
+    def exhausted(*args, **kwargs):
+        try:
+            raise PoolTimeout("couldn't get a connection after 5.00 sec")
+        except PoolTimeout as e:
+            raise OperationalError(str(e)) from e
+
+    def assertBusy(self, response):
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(response.json()['success'])
+
+    @mock.patch('utils.dbpool.PoolTimeout', PoolTimeout)
+    def test_pool_timeout_is_a_503(self):
+        with mock.patch('core.views.pool_stats', side_effect=self.exhausted):
+            self.assertBusy(self.client.get('/health/db'))
+
+    @mock.patch('utils.dbpool.PoolTimeout', PoolTimeout)
+    def test_pool_timeout_gets_past_the_views_catch_all(self):
+        with mock.patch('assignments.views.AssignmentListView.get_queryset', side_effect=self.exhausted):
+            self.assertBusy(self.client.get('/assignments/list'))
+        with mock.patch('assignments.views.AssignmentCreateView.get_serializer', side_effect=self.exhausted):
+            self.assertBusy(self.client.post('/assignments/create', {'title': 'Lab 1'}, format='json'))
+
+    def test_other_database_errors_are_not_masked(self):
+        with mock.patch('core.views.pool_stats', side_effect=OperationalError("disk I/O error")):
+            with self.assertRaises(OperationalError):
+                self.client.get('/health/db')
+
+
+class InstrumentationTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@test.com', password='testpass123',
+                                                role='teacher')
+        for i in range(5):
+            image = FileAndImage.objects.create(file_url=f'https://cdn.test/{i}.png', public_id=f'poster{i}',
+                                                file_type='notice', meta_type='png', user=self.teacher)
+            Notices.objects.create(title=f'Notice {i}', issued_by=self.teacher, target_audience=['ALL'],
+                                   notice_image=image)
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_sampled_request_is_timed_and_logged(self):
+        with self.assertLogs('utils.instrumentation', 'INFO') as logs:
+            response = self.client.get('/file/list')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total')
+        self.assertIn('view=fileandimage.views.FileAndImageRetrieveView', logs.output[0])
+        self.assertIn(f'bytes={len(response.content)}', logs.output[0])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        self.assertNotIn('Server-Timing', self.client.get('/file/list'))
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1, INSTRUMENTATION_N_PLUS_ONE_THRESHOLD=3)
+    def test_list_endpoints_have_no_n_plus_one(self):
+        for url in ('/file/list', '/notices/list', '/notices/list?limit=5'):
+            with self.assertNoLogs('utils.instrumentation', 'WARNING'):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    @override_settings(INSTRUMENTATION_N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_query_shape_is_flagged(self):
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=1):
+            token = start_request()
+        for notice in Notices.objects.all():
+            notice.issued_by.username
+        metrics = stop_request(token)
+
+        self.assertEqual(len(metrics.suspects), 1)
+        shape, site = metrics.suspects[0]
+        self.assertIn('FROM "core_customuser"', shape)
+        self.assertTrue(site.startswith('core/tests.py:'))
+
+
+class MetricsTest(APITestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_counted_per_route(self):
+        before = self.sample('http_requests_total', route='health', method='GET', status='2xx')
+        self.client.get('/health')
+        self.client.get('/health')
+        self.assertEqual(self.sample('http_requests_total', route='health', method='GET', status='2xx'), before + 2)
+        self.assertGreater(self.sample('http_request_duration_seconds_count', route='health', method='GET'), 0)
+        self.assertEqual(self.sample('http_requests_in_progress', method='GET'), 0)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get('/metrics')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'http_requests_total{method="GET",route="health",status="2xx"}', response.content)
+
+    def test_unknown_paths_share_one_label(self):
+        before = self.sample('http_requests_total', route='unmatched', method='GET', status='4xx')
+        self.client.get('/no/such/page')
+        self.assertEqual(self.sample('http_requests_total', route='unmatched', method='GET', status='4xx'), before + 1)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+
+    @mock.patch('fileandimage.storage.upload', side_effect=RuntimeError('cloudinary down'))
+    def test_outbound_calls(self, upload):
+        labels = {'service': 'cloudinary', 'operation': 'upload'}
+        before = self.sample('outbound_request_errors_total', **labels)
+        with self.assertRaises(RuntimeError):
+            upload_file('poster.png')
+        self.assertEqual(self.sample('outbound_request_errors_total', **labels), before + 1)
+        self.assertGreater(self.sample('outbound_request_duration_seconds_count', **labels), 0)
+
+    def test_workers_are_summed(self):
+        """Two processes writing to one PROMETHEUS_MULTIPROC_DIR are added up"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        script = (
+            "from utils.metrics import REQUESTS, IN_PROGRESS\n"
+            "REQUESTS.labels('health', 'GET', '2xx').inc(3)\n"
+            "IN_PROGRESS.labels('GET').inc()\n"
+        )
+        workers = [
+            subprocess.Popen([sys.executable, '-c', script], cwd=settings.BASE_DIR,
+                             env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory})
+            for _ in range(2)
+        ]
+        for worker in workers:
+            self.assertEqual(worker.wait(), 0)
+
+        def sample(name, labels):
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry, path=directory)
+            return registry.get_sample_value(name, labels)
+
+        requests = {'route': 'health', 'method': 'GET', 'status': '2xx'}
+        self.assertEqual(sample('http_requests_total', requests), 6)
+        self.assertEqual(sample('http_requests_in_progress', {'method': 'GET'}), 2)
+
+        # what gunicorn.conf.py's child_exit does, the gauge forgets the worker, the counter keeps its share
+        for worker in workers:
+            mark_process_dead(worker.pid, directory)
+        self.assertEqual(sample('http_requests_total', requests), 6)
+        self.assertIsNone(sample('http_requests_in_progress', {'method': 'GET'}))
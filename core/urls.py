@@ -3,6 +3,9 @@ from core import views as CoreViews
 
 urlpatterns = [
     path('health', CoreViews.ShowMsg().as_view()),
+    path('health/db', CoreViews.DatabasePoolView.as_view()),
+    path('metrics', CoreViews.metrics, name='metrics'),
     path('createUser', CoreViews.CreateUser.as_view()),
     path('login', CoreViews.LoginView.as_view()),
+    path('users/import', CoreViews.UserImportView.as_view()),
 ]
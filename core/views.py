@@ -1,9 +1,11 @@
+import io
 from django.utils import timezone
 from django.shortcuts import render
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status,permissions
 from rest_framework.exceptions import ValidationError, AuthenticationFailed
+from django.db import OperationalError
 from rest_framework_simplejwt.tokens import AccessToken,RefreshToken
 from core.serializers import  CustomUserSerializer,LoginSerializer
 # , SubjectCreateSerializer, SubjectSerializer
@@ -11,8 +13,22 @@ from .models import CustomUser
 from django.contrib.auth.hashers import check_password,make_password
 # from rest_framework.generics import CreateAPIView
 # Create your views here.
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from assignments.views import register_device_token
+from .lastlogin import last_login_buffer
+from utils.throttling import LOGIN_THROTTLES
+from utils.custompermissions import AdminOnlyPermission
+from utils.customresponse import CustomAPIException
+from utils.asyncviews import AsyncReadMixin
+from rest_framework.parsers import MultiPartParser
+from .imports import FORMATS, UnreadableFile, detect_format, import_users, request_pool
+from utils.dbpool import pool_stats
+from utils.metrics import render_latest
+from prometheus_client import CONTENT_TYPE_LATEST
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from drf_spectacular.utils import extend_schema
 
 @extend_schema(
@@ -35,13 +51,50 @@ from drf_spectacular.utils import extend_schema
     },
     tags=["App Health"],
 )
-class ShowMsg(APIView):
+class ShowMsg(AsyncReadMixin, APIView):
     def get(self, request):
         # return BadRequestException("success",{"name":"John Doe"})
         return Response({
             'success': True,
             'message': 'success'
         }, status=status.HTTP_200_OK)
+
+    async def aget(self, request):
+        return self.get(request)
+
+
+def metrics(request):
+    """
+    Prometheus text format, summed over all gunicorn workers (utils.metrics).
+    A plain Django view: no DRF auth, throttling or JSON envelope for the scraper.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        # open without a token only in development, a deployment has to set one
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
+@extend_schema(
+    summary="Database connection pool stats",
+    description=(
+        "Connections in use and idle, requests waiting for one, timeouts and average acquire "
+        "latency of the pool in the worker process that answered. Admin only."
+    ),
+    responses={200: OpenApiTypes.OBJECT},
+    tags=["App Health"],
+)
+class DatabasePoolView(APIView):
+    permission_classes = [AdminOnlyPermission]
+
+    def get(self, request):
+        return Response({
+            'message': 'Database pool stats retrieved successfully',
+            'data': pool_stats()
+        }, status=status.HTTP_200_OK)
 @extend_schema(
         tags=['Authentication'],
         summary="Register new user",
@@ -71,6 +124,8 @@ class CreateUser(APIView):
 )
 class LoginView(APIView):
     serializer_class = LoginSerializer
+    # checked before the body is parsed and the password hashed
+    throttle_classes = LOGIN_THROTTLES
     def post(self, request) :
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
@@ -81,7 +136,8 @@ class LoginView(APIView):
                 user = CustomUser.objects.get(email=email)
                 if check_password(password, user.password):
                     user.last_login = timezone.now()
-                    user.save()
+                    # written behind by core.lastlogin, the token doesn't wait for it
+                    last_login_buffer.record(user.pk, user.last_login)
                     # Use RefreshToken instead of AccessToken for better handling
                     # refresh = RefreshToken.for_user(user)
                     if device_token:
@@ -94,6 +150,7 @@ class LoginView(APIView):
                     # refresh['role'] = user.role
                     access['email'] = user.email
                     access['role'] = user.role
+                    access['faculty'] = user.faculty
                     return Response({
                         'message': 'Login Success',
                         'data': {
@@ -106,6 +163,8 @@ class LoginView(APIView):
                     return Response({"message": "Invalid password"}, status=status.HTTP_401_UNAUTHORIZED,)
             except CustomUser.DoesNotExist:
                 raise AuthenticationFailed({"message": "Email not found"})
+            except OperationalError:
+                raise
             except Exception as e:
                 return Response({
                     'message': str(e)
@@ -114,3 +173,41 @@ class LoginView(APIView):
             'message': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+
+@extend_schema(
+    summary="Import users in bulk",
+    description="Admin only. Upload a CSV (header row) or NDJSON file of users with the fields of "
+                "/createUser plus faculty. Valid rows are created, the report lists every rejected row "
+                "with its errors. A file that isn't UTF-8 or valid CSV is a 400 with the report of the rows "
+                "before it. Very large files are better imported with `manage.py import_users`.",
+    request={
+        'multipart/form-data': {
+            'type': 'object',
+            'properties': {
+                'file': {'type': 'string', 'format': 'binary'},
+                'format': {'type': 'string', 'enum': list(FORMATS)},
+            },
+        }
+    },
+    responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    tags=['Authentication']
+)
+class UserImportView(APIView):
+    permission_classes = [AdminOnlyPermission]
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"message": "file field is required."})
+        fmt = detect_format(upload.name, request.data.get('format'))
+        # decoded while it's read, rows are handled a chunk at a time
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_users(stream, fmt, request_pool())
+        except UnreadableFile as e:
+            raise CustomAPIException(str(e), e.report, status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': f"{report['created']} users imported, {report['failed']} rows rejected",
+            'data': report
+        }, status=status.HTTP_200_OK)
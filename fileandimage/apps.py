@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FileandimageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fileandimage'
+
+    def ready(self):
+        import fileandimage.signals
@@ -0,0 +1,55 @@
+import hashlib
+from django.db import transaction
+from .models import FileAndImage, UploadStatus
+from .storage import destroy_file
+
+# Identical uploads share one Cloudinary asset. Rows are matched on content_hash
+# and the asset is reference counted through the rows that point at its public_id,
+# so it is only destroyed once the last of them is gone.
+
+
+def hash_file(file):
+    """SHA-256 of an uploaded file, read chunk by chunk"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)  # leave it readable for the upload
+    return digest.hexdigest()
+
+
+def find_asset(content_hash):
+    """
+    A ready row holding the same bytes, or None. Must run inside a transaction,
+    the row stays locked so a concurrent delete can't destroy the asset under us.
+    """
+    if not content_hash:
+        return None
+    return (
+        FileAndImage.objects.select_for_update()
+        .filter(content_hash=content_hash, status=UploadStatus.READY)
+        .exclude(public_id='')
+        .only('file_url', 'public_id')
+        .first()
+    )
+
+
+def lock_asset(public_id):
+    """Lock every row sharing an asset, concurrent deletes and reuses wait for us"""
+    if public_id:
+        list(FileAndImage.objects.select_for_update().filter(public_id=public_id).values_list('pk', flat=True))
+
+
+def release_asset(public_id):
+    """Destroy the asset after commit if no row references it anymore. Call with lock_asset held."""
+    if public_id and not FileAndImage.objects.filter(public_id=public_id).exists():
+        # a failing destroy only leaves an orphan asset behind, the row change still stands.
+        # not a partial: robust on_commit logs the callback's __qualname__, which partials lack
+        transaction.on_commit(lambda: destroy_file(public_id), robust=True)
+
+
+def delete_file(instance):
+    public_id = instance.public_id
+    with transaction.atomic():
+        lock_asset(public_id)
+        instance.delete()
+        release_asset(public_id)
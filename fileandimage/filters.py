@@ -0,0 +1,19 @@
+import django_filters
+from utils.filters import IndexedFilterSet
+from .models import FileAndImage
+
+
+class FileAndImageFilter(IndexedFilterSet):
+    """
+    Query filters for FileAndImageRetrieveView (always scoped to the current user).
+    Every filter/ordering pair here has a matching index in FileAndImage.Meta.
+    """
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('created_at', 'created_at'),
+        )
+    )
+
+    class Meta:
+        model = FileAndImage
+        fields = ['file_type']
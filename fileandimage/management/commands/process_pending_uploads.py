@@ -0,0 +1,22 @@
+import os
+from django.core.management.base import BaseCommand
+from fileandimage.models import FileAndImage, UploadStatus
+from fileandimage.uploads import claim_upload, process_upload, spool_path
+
+
+class Command(BaseCommand):
+    help = "Upload spooled files whose background upload never finished (e.g. after a restart) or failed"
+
+    def handle(self, *args, **options):
+        done = 0
+        stuck = FileAndImage.objects.filter(status__in=[UploadStatus.PENDING, UploadStatus.FAILED])
+        for file_id in stuck.values_list('file_id', flat=True).iterator():
+            if not os.path.exists(spool_path(file_id)):
+                # nothing left to upload; the claim skips rows a worker has finished meanwhile
+                if claim_upload(file_id):
+                    FileAndImage.objects.filter(pk=file_id).update(status=UploadStatus.FAILED, upload_started_at=None)
+                continue
+            # skips the uploads a live worker is still busy with
+            if process_upload(file_id):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} spooled upload(s)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from fileandimage.models import FileAndImage
+from fileandimage.storage import variant_urls
+from utils.cache import bump_namespace
+
+
+class Command(BaseCommand):
+    help = "Recompute FileAndImage.variants from public_id (run after adding the column or changing storage.VARIANTS)"
+
+    def handle(self, *args, **options):
+        stale = []
+        files = FileAndImage.objects.exclude(public_id='').only('file_id', 'public_id', 'meta_type', 'variants')
+        for file in files.iterator(chunk_size=1000):
+            variants = variant_urls(file.public_id, file.meta_type)
+            if file.variants != variants:
+                file.variants = variants
+                stale.append(file)
+        # bulk_update skips save(), so updated_at is left alone
+        FileAndImage.objects.bulk_update(stale, ['variants'], batch_size=1000)
+        if stale:
+            # and the signals don't fire, notices embed these urls
+            bump_namespace('notices', 'files')
+        self.stdout.write(self.style.SUCCESS(f"Updated variants on {len(stale)} file(s)"))
@@ -2,6 +2,7 @@ from django.db import models
 from cloudinary.models import CloudinaryField
 from shortuuidfield import ShortUUIDField
 from core.models import CustomUser
+from .storage import variant_urls
 # from enum import Enum
 # Create your models here.
 
@@ -45,16 +46,46 @@ class FileMetaType(models.TextChoices):
 #     WEBP = 'webp'
 #     PDF = 'pdf'
 
+class UploadStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'   # spooled on our disk, waiting for a background upload
+    READY = 'ready', 'Ready'
+    FAILED = 'failed', 'Failed'
+
 class FileAndImage(models.Model):
     file_id=ShortUUIDField(primary_key=True,max_length=6)
-    file_url=models.CharField(max_length=255,null=False,blank=False) 
-    public_id=models.CharField(max_length=255,null=False,blank=False)
+    # both stay empty until a pending upload reaches Cloudinary
+    file_url=models.CharField(max_length=255,null=False,blank=True) 
+    public_id=models.CharField(max_length=255,null=False,blank=True)
     file_type=models.CharField(null=False,blank=False,max_length=15,choices=FileType.choices)
     meta_type=models.CharField(null=False,blank=False,max_length=15,choices=FileMetaType.choices)
     user=models.ForeignKey(CustomUser,on_delete=models.CASCADE,related_name='files')
+    status=models.CharField(max_length=10,choices=UploadStatus.choices,default=UploadStatus.READY)
+    # when a worker took the pending upload, see uploads.claim_upload
+    upload_started_at=models.DateTimeField(null=True,blank=True,editable=False)
+    # sha256 of the bytes, identical uploads reuse the asset (see fileandimage.assets)
+    content_hash=models.CharField(max_length=64,blank=True,default='',editable=False)
+    # {variant: {dpr: url}} renditions of the asset, see storage.variant_urls
+    variants=models.JSONField(default=dict,blank=True,editable=False)
     created_at=models.DateTimeField(auto_now_add=True)
     updated_at=models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        indexes = [
+            # backs FileAndImageFilter, the list is always scoped to one user
+            models.Index(fields=['user', '-created_at'], name='file_user_created_idx'),
+            models.Index(fields=['user', 'file_type', '-created_at'], name='file_user_type_created_idx'),
+            # dedup lookup and asset reference counting
+            models.Index(fields=['content_hash'], name='file_content_hash_idx'),
+            models.Index(fields=['public_id'], name='file_public_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # variant urls follow the asset
+        self.variants = variant_urls(self.public_id, self.meta_type)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'public_id', 'meta_type'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'variants'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"FileAndImage {self.file_id}"
\ No newline at end of file
@@ -1,8 +1,14 @@
+from contextlib import suppress
 from rest_framework import serializers
 from .models import FileAndImage
 from rest_framework.serializers import ImageField
 from rest_framework.exceptions import ValidationError
-from cloudinary.uploader import upload,destroy
+from django.db import transaction
+from .assets import find_asset, hash_file, lock_asset, release_asset
+from .storage import (
+    DIRECT_UPLOAD_FORMATS, upload_file, destroy_file, direct_upload_prefix, direct_upload_url, verify_direct_upload
+)
+from .uploads import queue_upload
 from core.serializers import MiniUserSerializer
 mime_types = ['image/jpeg', 'image/png', 'image/jpg', 'image/gif', 'image/webp', 'application/pdf']
 class FileAndImageSerializer(serializers.ModelSerializer):
@@ -17,6 +23,7 @@ class FileAndImageSerializer(serializers.ModelSerializer):
             'file',        # input only
             'file_url',    # stored in DB
             'public_id',   # stored in DB
+            'status',
             'user',
             'created_at',
             'updated_at'
@@ -28,7 +35,8 @@ class FileAndImageSerializer(serializers.ModelSerializer):
             'user',
             'meta_type',
             'file_url',
-            'public_id'
+            'public_id',
+            'status'
         ]
 
         extra_kwargs = {
@@ -62,12 +70,24 @@ class FileAndImageSerializer(serializers.ModelSerializer):
         #     if file.content_type != pdf_mime_type:
         #         raise ValidationError({"message": "Assignment files must be a PDF."})
         attrs['meta_type'] = file.content_type.split('/')[-1]  # Extracting the subtype as meta_type
+        attrs['content_hash'] = hash_file(file)
         return attrs
 
     def create(self, validated_data):
+        file = validated_data.pop('file')   # remove temporary upload field
+        defer_upload = validated_data.pop('defer_upload', False)
+        with transaction.atomic():
+            asset = find_asset(validated_data['content_hash'])
+            if asset is not None:
+                # same bytes are already stored, no upload at all
+                return FileAndImage.objects.create(
+                    file_url=asset.file_url, public_id=asset.public_id, **validated_data
+                )
+        if defer_upload:
+            # async mode, see fileandimage.uploads
+            return queue_upload(file, **validated_data)
         try:
-            file = validated_data.pop('file')   # remove temporary upload field
-            upload_res = upload(file, folder="assignment_api")
+            upload_res = upload_file(file)
 
             validated_data['file_url'] = upload_res['secure_url']
             validated_data['public_id'] = upload_res['public_id']
@@ -79,21 +99,87 @@ class FileAndImageSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         try:
             file = validated_data.pop('file', None)
+            if not file:
+                return self.save_update(instance, validated_data)
 
-            if file:
-                # Delete old file from Cloudinary
-                destroy(instance.public_id)
+            with transaction.atomic():
+                asset = find_asset(validated_data['content_hash'])
+                if asset is not None:
+                    # same bytes are already stored, saved while the asset row is still locked
+                    return self.save_update(instance, validated_data, asset.public_id, asset.file_url)
 
-                upload_res = upload(file, folder="assignment_api")
-                instance.meta_type = upload_res['format']
-                instance.public_id = upload_res['public_id']
-                instance.file_url = upload_res['secure_url']
+            # the upload runs outside any transaction, no connection is held while it's in flight
+            upload_res = upload_file(file)
+            try:
+                return self.save_update(instance, validated_data, upload_res['public_id'], upload_res['secure_url'])
+            except Exception:
+                # no row points at the fresh asset, don't leave it behind in Cloudinary
+                with suppress(Exception):  # a failing destroy must not hide why the save failed
+                    destroy_file(upload_res['public_id'])
+                raise
+        except Exception as e:
+            raise ValidationError({"message": "File update failed.", "error": str(e)})
 
+    def save_update(self, instance, validated_data, public_id=None, file_url=None):
+        old_public_id = instance.public_id
+        with transaction.atomic():
+            if public_id is not None:
+                instance.public_id = public_id
+                instance.file_url = file_url
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
 
+            lock_asset(old_public_id)
             instance.save()
-            return instance
-        except Exception as e:
-            raise ValidationError({"message": "File update failed.", "error": str(e)})
-    
+            # the old asset goes away only if no other row still uses it
+            if old_public_id != instance.public_id:
+                release_asset(old_public_id)
+        return instance
+
+
+class DirectUploadSignSerializer(serializers.Serializer):
+    file_type = serializers.ChoiceField(choices=list(DIRECT_UPLOAD_FORMATS))
+
+
+class DirectUploadConfirmSerializer(serializers.Serializer):
+    """What the client got back from Cloudinary after a signed direct upload"""
+    public_id = serializers.CharField(max_length=255)
+    version = serializers.IntegerField()
+    signature = serializers.CharField(max_length=128)
+    format = serializers.CharField(max_length=15)
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if not verify_direct_upload(attrs['public_id'], attrs['version'], attrs['signature']):
+            raise ValidationError({"message": "Invalid upload signature."})
+
+        # the public_id was signed for one user and file_type, see storage.sign_direct_upload
+        file_type = next(
+            (file_type for file_type in DIRECT_UPLOAD_FORMATS
+             if attrs['public_id'].startswith(direct_upload_prefix(user.pk, file_type))),
+            None
+        )
+        if file_type is None:
+            raise ValidationError({"message": "This upload was not issued to you."})
+        file_format = attrs['format'].lower()
+        if file_format not in DIRECT_UPLOAD_FORMATS[file_type]:
+            raise ValidationError({"message": "Invalid file type. "})
+
+        attrs['file_type'] = file_type
+        attrs['meta_type'] = file_format
+        attrs['file_url'] = direct_upload_url(attrs['public_id'], attrs['version'], file_format)
+        return attrs
+
+    def create(self, validated_data):
+        # confirming the same upload twice returns the first row
+        instance, _ = FileAndImage.objects.get_or_create(
+            user=validated_data['user'],
+            public_id=validated_data['public_id'],
+            defaults={
+                'file_type': validated_data['file_type'],
+                'meta_type': validated_data['meta_type'],
+                'file_url': validated_data['file_url'],
+            }
+        )
+        return instance
+
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import FileAndImage
+from utils.cache import bump_namespace
+
+
+@receiver(post_save, sender=FileAndImage)
+@receiver(post_delete, sender=FileAndImage)
+def invalidate_file_cache(sender, instance, **kwargs):
+    # notices embed their image url
+    bump_namespace('notices', 'files')
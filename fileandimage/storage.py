@@ -0,0 +1,96 @@
+import secrets
+import cloudinary
+from cloudinary.uploader import upload, destroy
+from cloudinary.utils import api_sign_request, cloudinary_api_url, cloudinary_url, now, verify_api_response_signature
+from utils.metrics import observe_outbound
+
+# every asset of this API lives under this Cloudinary folder
+UPLOAD_FOLDER = "assignment_api"
+
+# formats a direct upload may have, per file_type (same rules as FileAndImageSerializer)
+IMAGE_FORMATS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+DIRECT_UPLOAD_FORMATS = {
+    'profile': IMAGE_FORMATS,
+    'notice': IMAGE_FORMATS + ('pdf',),
+}
+
+
+def upload_file(file):
+    """Push a file (upload object or local path) to Cloudinary and return the upload result"""
+    with observe_outbound('cloudinary', 'upload'):
+        return upload(file, folder=UPLOAD_FOLDER)
+
+
+def destroy_file(public_id):
+    """Remove an asset from Cloudinary, rows that never finished uploading have none"""
+    if public_id:
+        with observe_outbound('cloudinary', 'destroy'):
+            return destroy(public_id)
+
+
+def direct_upload_configured():
+    config = cloudinary.config()
+    return bool(config.cloud_name and config.api_key and config.api_secret)
+
+
+def direct_upload_prefix(user_id, file_type):
+    """public_id prefix a signed upload is bound to, the confirm step checks it"""
+    return f"{UPLOAD_FOLDER}/{user_id}-{file_type}-"
+
+
+def sign_direct_upload(user_id, file_type):
+    """
+    Signed parameters for uploading one file straight from the client to Cloudinary.
+    Signing is a local HMAC with the API secret, no request to Cloudinary is made.
+    Cloudinary rejects the signature once the timestamp is an hour old.
+    """
+    config = cloudinary.config()
+    params = {
+        'timestamp': now(),
+        'public_id': direct_upload_prefix(user_id, file_type) + secrets.token_urlsafe(8),
+        'allowed_formats': ','.join(DIRECT_UPLOAD_FORMATS[file_type]),
+    }
+    params['signature'] = api_sign_request(params, config.api_secret)
+    params['api_key'] = config.api_key
+    params['upload_url'] = cloudinary_api_url('upload', resource_type='image')
+    return params
+
+
+def verify_direct_upload(public_id, version, signature):
+    """True when public_id/version/signature are what Cloudinary returned for an upload"""
+    return verify_api_response_signature(public_id, version, signature)
+
+
+def direct_upload_url(public_id, version, file_format):
+    url, _ = cloudinary_url(public_id, version=version, format=file_format, resource_type='image', secure=True)
+    return url
+
+
+# Responsive renditions, rendered and cached by Cloudinary's CDN on first request.
+# PDFs are rendered from their first page.
+VARIANTS = {
+    'thumbnail': {'width': 200, 'height': 200, 'crop': 'fill', 'gravity': 'auto'},
+    'medium': {'width': 800, 'crop': 'limit'},
+    'webp': {'width': 800, 'crop': 'limit', 'format': 'webp'},
+}
+PDF_PREVIEW = {'page': 1, 'format': 'jpg'}
+VARIANT_DPRS = (1, 2, 3)
+
+
+def variant_urls(public_id, meta_type):
+    """{variant: {dpr: url}} for an asset, `preview` (full first page) is added for PDFs"""
+    if not public_id or not cloudinary.config().cloud_name:
+        return {}
+    if meta_type == 'pdf':
+        variants = {name: {**PDF_PREVIEW, **options} for name, options in VARIANTS.items()}
+        variants['preview'] = PDF_PREVIEW
+    else:
+        variants = {name: {'format': meta_type, **options} for name, options in VARIANTS.items()}
+    return {
+        name: {
+            str(dpr): cloudinary_url(public_id, resource_type='image', secure=True, quality='auto',
+                                     dpr=f'{dpr}.0', **options)[0]
+            for dpr in VARIANT_DPRS
+        }
+        for name, options in variants.items()
+    }
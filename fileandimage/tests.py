@@ -1,3 +1,303 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import cloudinary
+from cloudinary.utils import api_sign_request
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.parsers import MultiPartParser
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import FileAndImage, UploadStatus
+from .uploads import process_upload, spool_path
 
-# Create your tests here.
+User = get_user_model()
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+@override_settings(UPLOAD_SPOOL_DIR=tempfile.mkdtemp())
+class AsyncUploadTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def upload_async(self):
+        poster = SimpleUploadedFile('poster.png', PNG, content_type='image/png')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/file/upload/async', {'file': poster, 'file_type': 'notice'}, format='multipart')
+        self.assertEqual(len(callbacks), 1)
+        return response
+
+    def test_upload_is_accepted_and_spooled(self):
+        response = self.upload_async()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        file_id = response.data['data']['file_id']
+        self.assertEqual(response.data['data']['status'], UploadStatus.PENDING)
+        with open(spool_path(file_id), 'rb') as spooled:
+            self.assertEqual(spooled.read(), PNG)
+
+    @mock.patch('fileandimage.uploads.upload_file')
+    def test_background_upload_fills_in_url(self, upload_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        file_id = self.upload_async().data['data']['file_id']
+
+        process_upload(file_id)
+
+        response = self.client.get(f'/file/status/{file_id}')
+        self.assertEqual(response.data['data']['status'], UploadStatus.READY)
+        self.assertEqual(response.data['data']['file_url'], 'https://cdn.test/poster.png')
+        self.assertFalse(os.path.exists(spool_path(file_id)))
+
+    @mock.patch('fileandimage.uploads.upload_file', side_effect=RuntimeError('cloudinary down'))
+    def test_failed_upload_keeps_spooled_file(self, upload_file):
+        file_id = self.upload_async().data['data']['file_id']
+        with self.assertLogs('fileandimage.uploads', 'ERROR'):
+            process_upload(file_id)
+        self.assertEqual(FileAndImage.objects.get(pk=file_id).status, UploadStatus.FAILED)
+        self.assertTrue(os.path.exists(spool_path(file_id)))
+
+    @mock.patch('fileandimage.uploads.destroy_file')
+    @mock.patch('fileandimage.uploads.upload_file')
+    def test_error_after_upload_marks_row_failed(self, upload_file, destroy_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        file_id = self.upload_async().data['data']['file_id']
+        with mock.patch.object(FileAndImage, 'save', side_effect=DatabaseError('connection lost')), \
+                self.assertLogs('fileandimage.uploads', 'ERROR'):
+            process_upload(file_id)
+        self.assertEqual(FileAndImage.objects.get(pk=file_id).status, UploadStatus.FAILED)
+        destroy_file.assert_called_once_with('assignment_api/poster')
+        self.assertTrue(os.path.exists(spool_path(file_id)))
+
+    @mock.patch('fileandimage.uploads.destroy_file')
+    @mock.patch('fileandimage.uploads.upload_file')
+    def test_row_deleted_during_upload(self, upload_file, destroy_file):
+        file_id = self.upload_async().data['data']['file_id']
+
+        def upload_and_delete(path):
+            FileAndImage.objects.filter(pk=file_id).delete()
+            return {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+
+        upload_file.side_effect = upload_and_delete
+        process_upload(file_id)
+        destroy_file.assert_called_once_with('assignment_api/poster')
+        self.assertFalse(os.path.exists(spool_path(file_id)))
+
+    @mock.patch('fileandimage.uploads.upload_file')
+    def test_pending_uploads_skip_live_workers(self, upload_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        file_id = self.upload_async().data['data']['file_id']
+        FileAndImage.objects.filter(pk=file_id).update(upload_started_at=timezone.now())
+
+        call_command('process_pending_uploads', stdout=StringIO())
+        upload_file.assert_not_called()
+
+        # the worker died on it, its claim expires
+        FileAndImage.objects.filter(pk=file_id).update(upload_started_at=timezone.now() - timedelta(hours=1))
+        call_command('process_pending_uploads', stdout=StringIO())
+        self.assertEqual(FileAndImage.objects.get(pk=file_id).status, UploadStatus.READY)
+
+
+@mock.patch.multiple(cloudinary.config(), cloud_name='demo', api_key='key', api_secret='secret')
+class DirectUploadTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def cloudinary_reply(self, public_id, version=1712345678):
+        """The fields Cloudinary's upload response carries, signed with the API secret"""
+        signature = api_sign_request({'public_id': public_id, 'version': version}, 'secret')
+        return {'public_id': public_id, 'version': version, 'signature': signature, 'format': 'png'}
+
+    def test_sign_binds_upload_to_user(self):
+        response = self.client.post('/file/upload/sign', {'file_type': 'profile'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        params = response.data['data']
+        self.assertTrue(params['public_id'].startswith(f'assignment_api/{self.teacher.pk}-profile-'))
+        self.assertNotIn('pdf', params['allowed_formats'])
+        signed = {key: params[key] for key in ('timestamp', 'public_id', 'allowed_formats')}
+        self.assertEqual(params['signature'], api_sign_request(signed, 'secret'))
+
+    def test_confirm_creates_file_once(self):
+        public_id = self.client.post('/file/upload/sign', {'file_type': 'notice'}).data['data']['public_id']
+        reply = self.cloudinary_reply(public_id)
+
+        response = self.client.post('/file/upload/confirm', reply)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['file_type'], 'notice')
+        self.assertEqual(response.data['data']['status'], UploadStatus.READY)
+        self.assertIn(f'/v1712345678/{public_id}.png', response.data['data']['file_url'])
+
+        self.client.post('/file/upload/confirm', reply)
+        self.assertEqual(FileAndImage.objects.filter(public_id=public_id).count(), 1)
+
+    def test_confirm_rejects_bad_signature_and_foreign_uploads(self):
+        public_id = f'assignment_api/{self.teacher.pk}-notice-abc'
+        reply = dict(self.cloudinary_reply(public_id), signature='forged')
+        self.assertEqual(self.client.post('/file/upload/confirm', reply).status_code, status.HTTP_400_BAD_REQUEST)
+
+        reply = self.cloudinary_reply('assignment_api/someone-else-notice-abc')
+        self.assertEqual(self.client.post('/file/upload/confirm', reply).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(FileAndImage.objects.exists())
+
+
+class FileFilterTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        other = User.objects.create_user(username='other', email='other@test.com', password='testpass123', role='teacher')
+        for user, file_type, name in [(self.teacher, 'profile', 'me'), (self.teacher, 'notice', 'poster'),
+                                      (self.teacher, 'notice', 'routine'), (other, 'notice', 'theirs')]:
+            FileAndImage.objects.create(
+                user=user, file_type=file_type, meta_type='png',
+                file_url=f'https://cdn.test/{name}.png', public_id=f'assignment_api/{name}',
+            )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def public_ids(self, **params):
+        response = self.client.get('/file/list', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [file['public_id'] for file in response.data['data']]
+
+    def test_file_type_and_ordering_within_own_files(self):
+        self.assertEqual(self.public_ids(file_type='notice'), ['assignment_api/routine', 'assignment_api/poster'])
+        self.assertEqual(self.public_ids(ordering='created_at'),
+                         ['assignment_api/me', 'assignment_api/poster', 'assignment_api/routine'])
+        response = self.client.get('/file/list', {'file_type': 'video'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@mock.patch('fileandimage.assets.destroy_file')
+@mock.patch('fileandimage.serializers.upload_file')
+class DedupTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def upload(self, content=PNG):
+        poster = SimpleUploadedFile('poster.png', content, content_type='image/png')
+        response = self.client.post('/file/upload', {'file': poster, 'file_type': 'notice'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['data']
+
+    def delete(self, file_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/file/delete/{file_id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_identical_upload_reuses_asset(self, upload_file, destroy_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        first = self.upload()
+        second = self.upload()
+
+        upload_file.assert_called_once()
+        self.assertNotEqual(first['file_id'], second['file_id'])
+        self.assertEqual(first['public_id'], second['public_id'])
+
+        upload_file.return_value = {'secure_url': 'https://cdn.test/other.png', 'public_id': 'assignment_api/other'}
+        self.assertEqual(self.upload(PNG + b'\x01')['public_id'], 'assignment_api/other')
+
+    def test_asset_destroyed_with_last_reference(self, upload_file, destroy_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        first = self.upload()
+        second = self.upload()
+
+        self.delete(first['file_id'])
+        destroy_file.assert_not_called()
+        self.delete(second['file_id'])
+        destroy_file.assert_called_once_with('assignment_api/poster')
+
+    def update(self, file_id, content):
+        poster = SimpleUploadedFile('poster.png', content, content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                f'/file/update/{file_id}', {'file': poster, 'file_type': 'notice'}, format='multipart'
+            )
+
+    def test_update_uploads_outside_transaction(self, upload_file, destroy_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        first = self.upload()
+
+        depth = len(connection.atomic_blocks)
+        depth_during_upload = []
+
+        def upload(file):
+            depth_during_upload.append(len(connection.atomic_blocks))
+            return {'secure_url': 'https://cdn.test/other.png', 'public_id': 'assignment_api/other'}
+        upload_file.side_effect = upload
+
+        response = self.update(first['file_id'], PNG + b'\x01')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['public_id'], 'assignment_api/other')
+        self.assertEqual(depth_during_upload, [depth])
+        destroy_file.assert_called_once_with('assignment_api/poster')
+
+    def test_failed_update_destroys_fresh_upload(self, upload_file, destroy_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        first = self.upload()
+
+        upload_file.return_value = {'secure_url': 'https://cdn.test/other.png', 'public_id': 'assignment_api/other'}
+        with mock.patch('fileandimage.models.FileAndImage.save', side_effect=DatabaseError('write failed')):
+            with mock.patch('fileandimage.serializers.destroy_file') as destroy_fresh:
+                response = self.update(first['file_id'], PNG + b'\x01')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        destroy_fresh.assert_called_once_with('assignment_api/other')
+        destroy_file.assert_not_called()
+        self.assertEqual(FileAndImage.objects.get(pk=first['file_id']).public_id, 'assignment_api/poster')
+
+
+@override_settings(THROTTLE_RATES={'upload_user': '1/min'})
+class UploadThrottleTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    @mock.patch('fileandimage.serializers.upload_file')
+    def test_second_upload_is_rejected_before_parsing(self, upload_file):
+        upload_file.return_value = {'secure_url': 'https://cdn.test/poster.png', 'public_id': 'assignment_api/poster'}
+        poster = SimpleUploadedFile('poster.png', PNG, content_type='image/png')
+        response = self.client.post('/file/upload', {'file': poster, 'file_type': 'notice'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        poster = SimpleUploadedFile('poster.png', PNG, content_type='image/png')
+        with mock.patch.object(MultiPartParser, 'parse') as parse:
+            response = self.client.post('/file/upload/async', {'file': poster, 'file_type': 'notice'}, format='multipart')
+        parse.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
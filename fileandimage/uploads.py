@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import FileAndImage, UploadStatus
+from .storage import upload_file, destroy_file
+
+logger = logging.getLogger(__name__)
+
+# Async uploads: the request spools the file to local disk and saves a pending
+# row, a per-process thread pool pushes it to Cloudinary after the commit.
+# Uploading is network-bound, so threads are enough.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_WORKERS, thread_name_prefix='upload')
+        return _executor
+
+
+def spool_path(file_id):
+    return os.path.join(settings.UPLOAD_SPOOL_DIR, file_id)
+
+
+def queue_upload(file, **fields):
+    """Save a pending FileAndImage with `file` spooled to disk and schedule its upload"""
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    with transaction.atomic():
+        instance = FileAndImage.objects.create(status=UploadStatus.PENDING, **fields)
+        with open(spool_path(instance.file_id), 'wb') as spooled:
+            for chunk in file.chunks():
+                spooled.write(chunk)
+        transaction.on_commit(lambda: submit_upload(instance.file_id))
+    return instance
+
+
+def submit_upload(file_id):
+    get_executor().submit(_run_in_worker, file_id)
+
+
+def _run_in_worker(file_id):
+    try:
+        process_upload(file_id)
+    except Exception:
+        # the claim failed, nothing waits on this future; process_pending_uploads retries the row
+        logger.exception("Background upload of %s failed", file_id)
+    finally:
+        # pool threads live outside the request cycle, don't leak their connection
+        connection.close()
+
+
+def claim_upload(file_id):
+    """
+    Take a pending or failed upload for this worker, False while another one
+    started it less than UPLOAD_CLAIM_TIMEOUT ago (a worker that died on it
+    never releases it, so the claim expires).
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.UPLOAD_CLAIM_TIMEOUT)
+    unclaimed = Q(upload_started_at__isnull=True) | Q(upload_started_at__lt=expired)
+    return bool(
+        FileAndImage.objects.filter(unclaimed, pk=file_id, status__in=[UploadStatus.PENDING, UploadStatus.FAILED])
+        .update(status=UploadStatus.PENDING, upload_started_at=now)
+    )
+
+
+def _mark_failed(file_id):
+    try:
+        FileAndImage.objects.filter(pk=file_id, status=UploadStatus.PENDING).update(
+            status=UploadStatus.FAILED, upload_started_at=None
+        )
+    except DatabaseError:
+        # the claim expires, process_pending_uploads picks it up then
+        logger.exception("Could not mark the upload of %s failed", file_id)
+
+
+def process_upload(file_id):
+    """
+    Upload one spooled file and mark its row ready, or failed with the spooled
+    file kept for process_pending_uploads. Returns False if another worker has it.
+    Errors are logged here, nothing waits on the worker's future.
+    """
+    close_old_connections()
+    if not claim_upload(file_id):
+        return False
+    try:
+        _upload(file_id)
+    except Exception:
+        logger.exception("Background upload of %s failed", file_id)
+        _mark_failed(file_id)
+    return True
+
+
+def _upload(file_id):
+    path = spool_path(file_id)
+    result = upload_file(path)
+    try:
+        saved = _save_result(file_id, result)
+    except Exception:
+        # the row is marked failed and the retry uploads again, don't leave this asset behind
+        destroy_file(result['public_id'])
+        raise
+    if not saved:
+        # deleted while we were uploading
+        destroy_file(result['public_id'])
+    os.remove(path)
+
+
+def _save_result(file_id, result):
+    instance = FileAndImage.objects.filter(pk=file_id).first()
+    if instance is None:
+        return False
+    instance.file_url = result['secure_url']
+    instance.public_id = result['public_id']
+    instance.status = UploadStatus.READY
+    try:
+        # save() rather than update() so the cache/ETag signals fire
+        instance.save(update_fields=['file_url', 'public_id', 'status', 'updated_at'])
+    except DatabaseError:
+        # "did not affect any rows": deleted since the lookup
+        if FileAndImage.objects.filter(pk=file_id).exists():
+            raise
+        return False
+    return True
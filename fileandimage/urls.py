@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import FileAndImageDeleteView, FileAndImageUpdateView, FileAndImageView,FileAndImageRetrieveView
+from .views import FileAndImageDeleteView, FileAndImageUpdateView, FileAndImageView,FileAndImageRetrieveView,FileAndImageAsyncUploadView,FileAndImageStatusView,FileAndImageDirectUploadSignView,FileAndImageDirectUploadConfirmView,FileAndImageExportView
 urlpatterns = [
     path('upload',FileAndImageView.as_view(),name='fileandimage-upload'),
+    path('upload/async',FileAndImageAsyncUploadView.as_view(),name='fileandimage-upload-async'),
+    path('upload/sign',FileAndImageDirectUploadSignView.as_view(),name='fileandimage-upload-sign'),
+    path('upload/confirm',FileAndImageDirectUploadConfirmView.as_view(),name='fileandimage-upload-confirm'),
+    path('status/<str:pk>',FileAndImageStatusView.as_view(),name='fileandimage-status'),
     path('list',FileAndImageRetrieveView.as_view(),name='fileandimage-list'),
+    path('export',FileAndImageExportView.as_view(),name='fileandimage-export'),
     path('update/<str:pk>',FileAndImageUpdateView.as_view(),name='fileandimage-update'),
     path('delete/<str:pk>',FileAndImageDeleteView.as_view(),name='fileandimage-delete'),
 ]
\ No newline at end of file
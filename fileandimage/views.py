@@ -1,16 +1,22 @@
 from rest_framework import status
 from django.shortcuts import render
 from rest_framework.response import Response
-from rest_framework.generics import CreateAPIView,UpdateAPIView,DestroyAPIView,ListAPIView
+from rest_framework.generics import CreateAPIView,UpdateAPIView,DestroyAPIView,ListAPIView,RetrieveAPIView
 from .models import FileAndImage
-from .serializers import FileAndImageSerializer
+from .serializers import FileAndImageSerializer, DirectUploadSignSerializer, DirectUploadConfirmSerializer
+from .filters import FileAndImageFilter
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
 from rest_framework.parsers import FormParser,MultiPartParser
-from cloudinary.uploader import destroy
+from .assets import delete_file
+from .storage import direct_upload_configured, sign_direct_upload
 from rest_framework.exceptions import ValidationError
-from utils.customresponse import POST_SuccessResponse, GET_SuccessResponse,PUTPATCH_SuccessResponse
+from django.db import OperationalError
+from utils.customresponse import CustomAPIException, POST_SuccessResponse, GET_SuccessResponse,PUTPATCH_SuccessResponse,ACCEPTED_SuccessResponse
 from utils.pagination_class import CustomPagination
+from utils.conditional import ConditionalGetMixin
+from utils.export import ExportView, EXPORT_PARAMETERS
+from utils.throttling import UPLOAD_THROTTLES
 # Create your views here.
 @extend_schema(
     summary="Upload a file or image",
@@ -23,6 +29,7 @@ class FileAndImageView(CreateAPIView):
     serializer_class = FileAndImageSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
+    throttle_classes = UPLOAD_THROTTLES
 
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
@@ -32,6 +39,84 @@ class FileAndImageView(CreateAPIView):
         serializer.save(user=self.request.user)
 
 
+@extend_schema(
+    summary="Upload a file or image in the background",
+    description="Spool the file on the server and return 202 right away with a pending file_id. "
+                "The upload to storage finishes in the background, poll /file/status/{file_id} for file_url.",
+    request=FileAndImageSerializer,
+    tags=['FileAndImage']
+)
+class FileAndImageAsyncUploadView(CreateAPIView):
+    queryset = FileAndImage.objects.all()
+    serializer_class = FileAndImageSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+    throttle_classes = UPLOAD_THROTTLES
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user, defer_upload=True)
+        return ACCEPTED_SuccessResponse(data=serializer.data, message="File accepted, upload in progress.")
+
+
+@extend_schema(
+    summary="Get signed parameters for a direct upload",
+    description="Step 1 of the direct upload flow. Returns signed form fields, POST them together with "
+                "`file` to upload_url (Cloudinary), then send Cloudinary's reply to /file/upload/confirm. "
+                "The signature expires after an hour.",
+    request=DirectUploadSignSerializer,
+    tags=['FileAndImage']
+)
+class FileAndImageDirectUploadSignView(CreateAPIView):
+    serializer_class = DirectUploadSignSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not direct_upload_configured():
+            raise CustomAPIException("Direct uploads are not available.", status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        params = sign_direct_upload(request.user.pk, serializer.validated_data['file_type'])
+        return POST_SuccessResponse(data=params, message="Upload signed successfully.")
+
+
+@extend_schema(
+    summary="Confirm a direct upload",
+    description="Step 2 of the direct upload flow. Send public_id, version, signature and format "
+                "from Cloudinary's upload response, the signature is checked before the file is saved.",
+    request=DirectUploadConfirmSerializer,
+    responses=FileAndImageSerializer,
+    tags=['FileAndImage']
+)
+class FileAndImageDirectUploadConfirmView(CreateAPIView):
+    serializer_class = DirectUploadConfirmSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance = serializer.save(user=request.user)
+        return POST_SuccessResponse(data=FileAndImageSerializer(instance).data, message="File uploaded successfully.")
+
+
+@extend_schema(
+    summary="Get the upload status of a file",
+    description="Returns status (pending, ready or failed) and file_url once ready, for the authenticated user's files.",
+    tags=['FileAndImage']
+)
+class FileAndImageStatusView(RetrieveAPIView):
+    serializer_class = FileAndImageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return FileAndImage.objects.filter(user_id=self.request.user.pk).select_related('user')
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        return GET_SuccessResponse(data=response.data, message="File status retrieved successfully.")
+
+
         
 @extend_schema(
     summary="Update a file and image with file_id",
@@ -44,6 +129,7 @@ class FileAndImageUpdateView(UpdateAPIView):
     serializer_class=FileAndImageSerializer
     permission_classes=[IsAuthenticated]
     parser_classes=(MultiPartParser,FormParser)
+    throttle_classes=UPLOAD_THROTTLES
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
         return PUTPATCH_SuccessResponse(data=response.data, message="File updated successfully.")
@@ -56,20 +142,24 @@ class FileAndImageUpdateView(UpdateAPIView):
 
 @extend_schema(
     summary="Retrieve a file and image",
-    description="Retrieve a file and image associated with the authenticated user.",
+    description="Retrieve a file and image associated with the authenticated user. "
+                "Filter with file_type and sort with `ordering` (created_at).",
     tags=['FileAndImage'],
 )
-class FileAndImageRetrieveView(ListAPIView):
+class FileAndImageRetrieveView(ConditionalGetMixin, ListAPIView):
     queryset = FileAndImage.objects.all()
     serializer_class = FileAndImageSerializer
     permission_classes = [IsAuthenticated]
+    conditional_namespaces = ('files',)
     pagination_class = CustomPagination
+    filterset_class = FileAndImageFilter
     
     def get_queryset(self):
-        return FileAndImage.objects.filter(user=self.request.user).order_by('-created_at')
+        # user_id so it also works with the token-only user on GET, user is serialized per file
+        return FileAndImage.objects.filter(user_id=self.request.user.pk).select_related('user').order_by('-created_at')
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -82,6 +172,32 @@ class FileAndImageRetrieveView(ListAPIView):
 
 
 
+@extend_schema(
+    summary="Export files and images",
+    description="Stream the authenticated user's files matching the list filters as CSV or NDJSON (`fmt`).",
+    parameters=EXPORT_PARAMETERS,
+    responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str},
+    tags=['FileAndImage'],
+)
+class FileAndImageExportView(ExportView):
+    permission_classes = [IsAuthenticated]
+    filterset_class = FileAndImageFilter
+    export_name = 'files'
+    export_fields = (
+        ('file_id', 'file_id'),
+        ('file_type', 'file_type'),
+        ('meta_type', 'meta_type'),
+        ('status', 'status'),
+        ('file_url', 'file_url'),
+        ('public_id', 'public_id'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    def get_queryset(self):
+        return FileAndImage.objects.filter(user_id=self.request.user.pk).order_by('-created_at', '-file_id')
+
+
 @extend_schema(
     summary="Delete a file and image",
     description="Delete a file and image associated with the authenticated user.",
@@ -95,12 +211,12 @@ class FileAndImageDeleteView(DestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         try:
-            # Delete file from Cloudinary
-            destroyed = destroy(instance.public_id)
-            # Delete instance from database
-            instance.delete()
+            # Delete instance from database, the Cloudinary file goes with its last reference
+            delete_file(instance)
             return Response({
                 "message": "File deleted successfully."
             }, status=status.HTTP_200_OK)
+        except OperationalError:
+            raise
         except Exception as e:
             raise ValidationError({"message": "File deletion failed.", "error": str(e)})
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Picked up by `gunicorn` from the working directory (see startCommand in render.yaml)
+import os
+import shutil
+import tempfile
+
+# utils.metrics: every worker writes its Prometheus samples to this directory and
+# /metrics adds them up. Set before prometheus_client is imported and the workers
+# fork, so all of them inherit it.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'myapi1-metrics'))
+
+
+def on_starting(server):
+    # files left by a previous run would be added to this one's totals
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    # drop the dead worker's in-flight gauge, its counters and histograms stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,247 @@
+import asyncio
+import bisect
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from utils.dbpool import unpooled_connection
+
+logger = logging.getLogger(__name__)
+
+
+def visible_to(event, faculty):
+    """Same rule as the notices `audience=mine` filter and push targeting"""
+    if not faculty or faculty == 'ALL':
+        return True
+    audience = event['audience']
+    return 'ALL' in audience or faculty in audience
+
+
+class Subscriber:
+    """One SSE stream or long-poll, lives on the event loop that created it"""
+
+    def __init__(self, faculty, max_queued):
+        self.faculty = faculty
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+
+    def offer(self, event):
+        # runs on self.loop
+        if self.overflowed or not visible_to(event, self.faculty):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # too slow to keep up: None ends the stream and the client reconnects with Last-Event-ID
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """
+    Per-process fan-out of live events to the subscribers of this worker.
+
+    Events reach every worker through Postgres NOTIFY, received by one listener
+    thread per process. Other databases (SQLite locally) only have one process,
+    there events are dispatched directly. The last `buffer_size` events are kept
+    for long-polls and for SSE reconnects with Last-Event-ID.
+    Idle subscribers are just an asyncio.Queue each, no thread or DB connection.
+
+    Event ids are assigned when the event is published, not when it's queued:
+    on Postgres from a sequence, under an advisory lock held until the NOTIFY
+    commits, so every worker receives events in id order and a cursor never
+    passes an event that is still on its way.
+    """
+
+    def __init__(self, buffer_size):
+        self.subscribers = set()
+        self.buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._listener = None
+        self._listening = threading.Event()
+        self._sequence_ready = False
+        # events up to this were never seen by this process, None until the listener is up
+        self.started_id = None if connection.vendor == 'postgresql' else self._next_local_id()
+
+    def _next_local_id(self):
+        # microseconds, still exact as a JS/Dart number; called with self._lock held
+        self._last_id = max(time.time_ns() // 1000, self._last_id + 1)
+        return self._last_id
+
+    @property
+    def sequence(self):
+        return f'{settings.LIVE_CHANNEL}_id'
+
+    def _ensure_sequence(self, cursor):
+        if not self._sequence_ready:
+            # starts at the current microseconds, above the ids handed out before it existed
+            cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS "{self.sequence}" START WITH {time.time_ns() // 1000}')
+            self._sequence_ready = True
+
+    def publish(self, event):
+        """Number an event and send it to every worker (sync code, call it after the commit)"""
+        if connection.vendor != 'postgresql':
+            with self._lock:
+                event['id'] = str(self._next_local_id())
+                self._buffer(event)
+            self._fan_out(event)
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._ensure_sequence(cursor)
+            # one publisher at a time until commit: NOTIFYs arrive in commit order, so also in id order
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [self.sequence])
+            cursor.execute(f'SELECT nextval(\'"{self.sequence}"\')')
+            event['id'] = str(cursor.fetchone()[0])
+            cursor.execute('SELECT pg_notify(%s, %s)', [settings.LIVE_CHANNEL, json.dumps(event)])
+
+    def dispatch(self, event):
+        """Deliver an event that reached this process, from any thread"""
+        with self._lock:
+            self._buffer(event)
+        self._fan_out(event)
+
+    def _buffer(self, event):
+        # called with self._lock held; ids normally arrive in order, insert by id if one doesn't
+        event_id = int(event['id'])
+        if not self.buffer or event_id > int(self.buffer[-1]['id']):
+            self.buffer.append(event)
+            return
+        position = bisect.bisect([int(buffered['id']) for buffered in self.buffer], event_id)
+        if len(self.buffer) == self.buffer.maxlen:
+            if position == 0:
+                return  # older than the whole buffer, events_after reports the gap
+            self.buffer.popleft()
+            position -= 1
+        self.buffer.insert(position, event)
+
+    def _fan_out(self, event):
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # its loop is gone
+                self.unsubscribe(subscriber)
+
+    async def asubscribe(self, faculty):
+        """subscribe() for async views, the first one in a process waits (in a thread) for the listener"""
+        if connection.vendor == 'postgresql' and not self._listening.is_set():
+            await sync_to_async(self.start_listener, thread_sensitive=False)()
+        return self.subscribe(faculty)
+
+    def subscribe(self, faculty):
+        self.start_listener(wait=False)
+        subscriber = Subscriber(faculty, settings.LIVE_MAX_QUEUED)
+        with self._lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def latest_id(self):
+        with self._lock:
+            return int(self.buffer[-1]['id']) if self.buffer else (self.started_id or 0)
+
+    def events_after(self, last_id, faculty):
+        """
+        Buffered events newer than `last_id` for `faculty`, and whether some may be
+        missing (the buffer or this process doesn't go back that far).
+        """
+        with self._lock:
+            events = list(self.buffer)
+            full = len(self.buffer) == self.buffer.maxlen
+            started_id = self.started_id
+        if started_id is None:
+            # the listener isn't up, anything may be missing
+            return [], True
+        oldest = int(events[0]['id']) if full else started_id
+        gap = last_id < oldest
+        return [event for event in events if int(event['id']) > last_id and visible_to(event, faculty)], gap
+
+    def start_listener(self, wait=True, timeout=5):
+        if connection.vendor != 'postgresql':
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='live-listener', daemon=True)
+                self._listener.start()
+        if wait:
+            self._listening.wait(timeout)
+
+    def _listen(self):
+        while True:
+            # held for the life of the process, so it stays out of the connection pool
+            db = unpooled_connection('default')
+            try:
+                db.ensure_connection()
+                raw = db.connection
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{settings.LIVE_CHANNEL}"')
+                with db.cursor() as cursor:
+                    self._ensure_sequence(cursor)
+                    # every event numbered after this is received from now on
+                    cursor.execute(f'SELECT last_value FROM "{self.sequence}"')
+                    started_id = cursor.fetchone()[0]
+                with self._lock:
+                    self.started_id = started_id
+                self._listening.set()
+                logger.info("Listening for live events on %s", settings.LIVE_CHANNEL)
+                for payload in self._notifications(raw):
+                    self.dispatch(json.loads(payload))
+            except Exception:
+                logger.exception("Live event listener failed, reconnecting")
+                # events sent while reconnecting are lost, cursors from before need a resync
+                with self._lock:
+                    self.started_id = None
+                self._listening.clear()
+                time.sleep(1)
+            finally:
+                db.close()
+
+    def _notifications(self, raw):
+        if hasattr(raw, 'poll'):
+            # psycopg2
+            while True:
+                if select.select([raw], [], [], 60) != ([], [], []):
+                    raw.poll()
+                    while raw.notifies:
+                        yield raw.notifies.pop(0).payload
+        else:
+            # psycopg 3
+            for notify in raw.notifies():
+                yield notify.payload
+
+
+broadcaster = Broadcaster(buffer_size=getattr(settings, 'LIVE_BUFFER_SIZE', 500))
+
+
+def queue_event(kind, action, instance_id, audience, title=''):
+    """Publish a live event once the current transaction commits, it gets its id then"""
+    event = {
+        'type': f'{kind}.{action}',
+        'object_id': instance_id,
+        'audience': list(audience or ['ALL']),
+        'title': title[:200],
+    }
+
+    def publish():
+        # the change is committed already, a failed publish must not turn the response into a 500
+        try:
+            broadcaster.publish(event)
+        except Exception:
+            logger.exception("Could not publish live event %s for %s", event['type'], instance_id)
+
+    transaction.on_commit(publish)
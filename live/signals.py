@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from assignments.models import Assignment
+from notices.models import Notices
+from .events import queue_event
+
+
+@receiver(post_save, sender=Notices)
+def notice_saved(sender, instance, created, **kwargs):
+    queue_event('notice', 'created' if created else 'updated', instance.notice_id, instance.target_audience, instance.title)
+
+
+@receiver(post_delete, sender=Notices)
+def notice_deleted(sender, instance, **kwargs):
+    queue_event('notice', 'deleted', instance.notice_id, instance.target_audience, instance.title)
+
+
+# saved assignments are published by assignments.signals.assignments_saved
+@receiver(post_delete, sender=Assignment)
+def assignment_deleted(sender, instance, **kwargs):
+    queue_event('assignment', 'deleted', instance.assignment_id, [instance.faculty], instance.title)
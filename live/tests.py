@@ -0,0 +1,124 @@
+import asyncio
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from notices.models import Notices
+from .events import broadcaster, visible_to
+
+User = get_user_model()
+
+
+def event(audience, **fields):
+    return {'type': 'notice.created', 'object_id': 'n1', 'audience': audience, 'title': 'Exam', **fields}
+
+
+class LiveEventsTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.student = User.objects.create_user(
+            username='student', email='student@test.com', password='testpass123', role='student', faculty='BCA'
+        )
+        token = RefreshToken.for_user(self.student)
+        self.headers = {'Authorization': f'Bearer {token.access_token}'}
+
+    def test_visibility(self):
+        self.assertTrue(visible_to({'audience': ['ALL']}, 'BCA'))
+        self.assertTrue(visible_to({'audience': ['BIM', 'BCA']}, 'BCA'))
+        self.assertFalse(visible_to({'audience': ['CSIT']}, 'BCA'))
+        self.assertTrue(visible_to({'audience': ['CSIT']}, 'ALL'))
+
+    def test_saves_publish_after_commit(self):
+        since = broadcaster.latest_id()
+        with mock.patch('assignments.push.get_executor'), self.captureOnCommitCallbacks(execute=True):
+            notice = Notices.objects.create(title='For BCA', issued_by=self.teacher, target_audience=['BCA'])
+            Notices.objects.create(title='For CSIT', issued_by=self.teacher, target_audience=['CSIT'])
+
+        response = self.client.get('/live/poll', {'since': since}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([(e['type'], e['object_id']) for e in data['events']], [('notice.created', notice.notice_id)])
+        self.assertFalse(data['resync'])
+
+        response = self.client.get('/live/poll', {'since': data['last_event_id'], 'timeout': 0}, headers=self.headers)
+        self.assertEqual(response.json()['data']['events'], [])
+
+    def test_failed_publish_is_logged(self):
+        with mock.patch('assignments.push.get_executor'):
+            notice = Notices.objects.create(title='Exam', issued_by=self.teacher, target_audience=['BCA'])
+        token = RefreshToken.for_user(self.teacher)
+        publish = mock.patch.object(broadcaster, 'publish', side_effect=OperationalError('connection lost'))
+        with publish, self.assertLogs('live.events', 'ERROR') as logs, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'/notices/delete/{notice.notice_id}', headers={'Authorization': f'Bearer {token.access_token}'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('notice.deleted', logs.output[0])
+
+    async def test_poll_waits_for_the_next_event(self):
+        async def publish_later():
+            await asyncio.sleep(0.2)
+            broadcaster.publish(event(['CSIT']))  # not for this student
+            broadcaster.publish(event(['BCA'], object_id='n2'))
+
+        publisher = asyncio.create_task(publish_later())
+        response = await self.async_client.get('/live/poll', {'timeout': 5}, headers=self.headers)
+        await publisher
+        events = json.loads(response.content)['data']['events']
+        self.assertEqual([e['object_id'] for e in events], ['n2'])
+
+    async def test_stream_replays_after_last_event_id(self):
+        last_id = broadcaster.latest_id()
+        broadcaster.publish(event(['ALL'], object_id='missed'))
+        response = await self.async_client.get(
+            '/live/stream', headers={**self.headers, 'Last-Event-ID': str(last_id)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        replayed = await anext(chunks)
+        self.assertIn(b'event: notice.created', replayed)
+        self.assertIn(b'"missed"', replayed)
+
+        broadcaster.publish(event(['BCA'], object_id='live'))
+        self.assertIn(b'"live"', await anext(chunks))
+
+        # a client disconnect cancels the stream, like the ASGI handler does
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broadcaster.subscribers, set())
+
+    def test_old_cursor_asks_for_resync(self):
+        response = self.client.get('/live/poll', {'since': 1}, headers=self.headers)
+        data = response.json()['data']
+        self.assertTrue(data['resync'])
+        self.assertEqual(int(data['last_event_id']), broadcaster.latest_id())
+
+    def test_ids_are_assigned_when_published(self):
+        first, second = event(['ALL'], object_id='queued first'), event(['ALL'], object_id='queued second')
+        broadcaster.publish(second)
+        broadcaster.publish(first)
+        self.assertGreater(int(first['id']), int(second['id']))
+
+    def test_late_event_is_buffered_in_id_order(self):
+        since = broadcaster.latest_id()
+        early, late = event(['ALL'], object_id='early'), event(['ALL'], object_id='late')
+        broadcaster.publish(early)
+        broadcaster.publish(late)
+        # a worker receiving them out of order still replays them by id
+        broadcaster.buffer.remove(early)
+        broadcaster.dispatch(early)
+        events, gap = broadcaster.events_after(since, 'BCA')
+        self.assertEqual([e['object_id'] for e in events], ['early', 'late'])
+        self.assertFalse(gap)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/live/poll').status_code, 401)
+        self.assertEqual(self.client.get('/live/stream', headers={'Authorization': 'Bearer nope'}).status_code, 401)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import live_stream, live_poll
+
+urlpatterns = [
+    path('stream', live_stream, name='live-stream'),
+    path('poll', live_poll, name='live-poll'),
+]
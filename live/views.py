@@ -0,0 +1,133 @@
+import asyncio
+import json
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from utils.authentication import ClaimsJWTAuthentication
+from .events import broadcaster
+
+# Plain async Django views, DRF views are sync and would hold a thread per open stream.
+
+
+async def get_user(request):
+    """The JWT user of the request (a ClaimsUser when the token has the claims), or None"""
+    try:
+        result = await ClaimsJWTAuthentication().aauthenticate(request)
+    except APIException:
+        return None
+    return result[0] if result else None
+
+
+def unauthorized():
+    return JsonResponse({'message': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+
+def parse_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(subscriber, backlog, gap):
+    last = 0
+    try:
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        if gap:
+            # events may have been missed, fetch /sync/changes
+            yield "event: resync\ndata: {}\n\n"
+        for event in backlog:
+            last = int(event['id'])
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.LIVE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle stream
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                break
+            if int(event['id']) <= last:
+                continue  # already sent from the backlog
+            last = int(event['id'])
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+@require_GET
+async def live_stream(request):
+    """
+    Server-Sent Events of notice.* and assignment.* (created/updated/deleted) for the caller's faculty.
+    Reconnects with Last-Event-ID get the events they missed, or a `resync` event when
+    they are too old, then the client should catch up with /sync/changes.
+    """
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+    faculty = getattr(user, 'faculty', None)
+    last_id = parse_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+
+    # subscribe before reading the backlog so nothing falls in between
+    subscriber = await broadcaster.asubscribe(faculty)
+    backlog, gap = broadcaster.events_after(last_id, faculty) if last_id else ([], False)
+    response = StreamingHttpResponse(event_stream(subscriber, backlog, gap), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def live_poll(request):
+    """
+    Long-poll fallback of live_stream. Returns the events after `since` at once if
+    there are any, otherwise waits up to `timeout` seconds for the next one.
+    Send back data.last_event_id as the next `since`; `resync` means events may have
+    been missed and the client should catch up with /sync/changes.
+    """
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+    faculty = getattr(user, 'faculty', None)
+    since = parse_id(request.GET.get('since'))
+    try:
+        timeout = min(max(float(request.GET.get('timeout', settings.LIVE_POLL_TIMEOUT)), 0), settings.LIVE_POLL_TIMEOUT)
+    except ValueError:
+        timeout = settings.LIVE_POLL_TIMEOUT
+
+    subscriber = await broadcaster.asubscribe(faculty)
+    try:
+        if since is None:
+            # first poll, only what happens from now on
+            since, events, gap = broadcaster.latest_id(), [], False
+        else:
+            events, gap = broadcaster.events_after(since, faculty)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not events and not gap and loop.time() < deadline:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if event is None:
+                break
+            if int(event['id']) > since:
+                events.append(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+    return JsonResponse({
+        'message': 'Events retrieved successfully',
+        'data': {
+            'events': events,
+            # after a resync the client carries on from the newest event, not from its stale cursor
+            'last_event_id': events[-1]['id'] if events else str(broadcaster.latest_id() if gap else since),
+            'resync': gap,
+        },
+    })
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 import environ
 
@@ -58,12 +59,20 @@ INSTALLED_APPS = [
     'subjects',
     'utils',
     'fileandimage',
+    'search',
+    'sync',
+    'live',
+    'django_filters',
 ]
 
 MIDDLEWARE = [
+    'utils.middleware.MetricsMiddleware',
+    'utils.middleware.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'utils.middleware.AsyncWhiteNoiseMiddleware',
+    'utils.middleware.DatabasePoolMiddleware',
+    'utils.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -99,6 +108,58 @@ DATABASES = {
     'default': env.db(),  # Reads the DATABASE_URL environment variable
 }
 
+# Read replicas, comma separated DATABASE_URLs. utils.dbrouter sends safe requests under
+# REPLICA_READ_PREFIXES to them, unless the client wrote something in the last
+# REPLICA_PIN_SECONDS (replication lag), then it reads its own writes from the primary.
+# Tests mirror them onto the default database.
+DATABASE_REPLICAS = []
+for number, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    DATABASES[f'replica{number}'] = {**environ.Env.db_url_config(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['utils.dbrouter.ReplicaRouter']
+REPLICA_READ_PREFIXES = ('/assignments/', '/notices/', '/subjects/')
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+
+# Postgres connections come from a psycopg 3 pool per worker process and database (utils.dbpool),
+# instead of a new connection and TLS handshake on every request.
+# DB_POOL=off falls back to persistent connections, which under ASGI are kept per thread.
+for database in DATABASES.values():
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    database['CONN_HEALTH_CHECKS'] = True
+    if env.bool('DB_POOL', default=True):
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+            # seconds a request waits for a free connection before it gets a 503
+            'timeout': env.float('DB_POOL_TIMEOUT', default=5),
+            'max_idle': env.int('DB_POOL_MAX_IDLE', default=300),
+        }
+    else:
+        database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# utils.cache puts a per-process tier ('local') in front of a file cache on the
+# instance disk ('default'), which all gunicorn workers share without Redis
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'assignment_api_cache')),
+        'TIMEOUT': env.int('CACHE_TIMEOUT', default=600),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'assignment-api-local',
+        'TIMEOUT': env.int('LOCAL_CACHE_TIMEOUT', default=60),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,10 +218,25 @@ AUTH_USER_MODEL = 'core.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'utils.authentication.ClaimsJWTAuthentication',
+    ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'EXCEPTION_HANDLER': 'utils.customresponse.custom_exception_handler',
+    # proxies in front of the app, so throttles see the client IP and not a spoofed X-Forwarded-For
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=None),
+}
+
+# token buckets of utils.throttling, '10/min' = bursts of 10 refilled at 10 per minute
+THROTTLE_RATES = {
+    'login_ip': env('THROTTLE_LOGIN_IP', default='30/min'),
+    'login_email': env('THROTTLE_LOGIN_EMAIL', default='5/min'),
+    'upload_ip': env('THROTTLE_UPLOAD_IP', default='60/min'),
+    'upload_user': env('THROTTLE_UPLOAD_USER', default='20/min'),
 }
+THROTTLE_LOCK_DIR = env('THROTTLE_LOCK_DIR', default=os.path.join(tempfile.gettempdir(), 'assignment_api_throttle'))
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Assignment Management API',
@@ -243,6 +319,75 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# per-worker LRU of CustomUser rows used by utils.authentication.ClaimsJWTAuthentication
+AUTH_USER_CACHE_SIZE = env.int('AUTH_USER_CACHE_SIZE', default=1024)
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=60)  # seconds
+
+# core.lastlogin writes last_login in batches this often (seconds), 0 writes on every login
+LAST_LOGIN_FLUSH_INTERVAL = env.int('LAST_LOGIN_FLUSH_INTERVAL', default=5)
+
+# processes hashing passwords in `manage.py import_users`, 0 hashes in the command's process
+USER_IMPORT_WORKERS = env.int('USER_IMPORT_WORKERS', default=os.cpu_count() or 1)
+# the same for POST /users/import, one pool per server process kept between imports, 0 hashes in the request
+USER_IMPORT_REQUEST_WORKERS = env.int('USER_IMPORT_REQUEST_WORKERS', default=2)
+
+# Postgres text search configuration (stemming, stop words) of search.SearchDocument
+SEARCH_CONFIG = env('SEARCH_CONFIG', default='english')
+
+# sync.changes holds back rows saved in the last few seconds until their transaction has surely committed
+SYNC_SETTLE_SECONDS = env.int('SYNC_SETTLE_SECONDS', default=5)
+# tombstones are pruned after this, cursors older than that get a 410
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+
+# live.events: Postgres NOTIFY channel shared by all workers and the per-worker replay buffer
+LIVE_CHANNEL = 'live_events'
+LIVE_BUFFER_SIZE = env.int('LIVE_BUFFER_SIZE', default=500)
+LIVE_MAX_QUEUED = 100  # events waiting for a slow client before its stream is dropped
+LIVE_HEARTBEAT = env.int('LIVE_HEARTBEAT', default=15)  # seconds between SSE keep-alive comments
+LIVE_POLL_TIMEOUT = env.int('LIVE_POLL_TIMEOUT', default=25)  # seconds, keep it under proxy timeouts
+LIVE_RETRY_MS = 5000  # EventSource reconnect delay
+
+# utils.instrumentation: share of requests that get a Server-Timing header and a log line
+# with query count, DB/serializer time and size, and how often one query shape may
+# repeat in a request before it's logged as a suspected N+1
+INSTRUMENTATION_SAMPLE_RATE = env.float('INSTRUMENTATION_SAMPLE_RATE', default=0.05)
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = env.int('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', default=5)
+
+# /metrics (utils.metrics) asks for `Authorization: Bearer <METRICS_TOKEN>`, without one it's only served with DEBUG on
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# app loggers go to stderr as key=value lines, which the hosting log search can filter on
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'keyvalue': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s pid=%(process)d %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'keyvalue',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        logger: {'level': env('LOG_LEVEL', default='INFO')}
+        for logger in ('utils', 'core', 'assignments', 'fileandimage', 'live')
+    },
+}
+
+# GET of the hot read views (utils.asyncviews.AsyncReadMixin) runs on the event loop,
+# off = every request goes through the sync views like before (see manage.py bench_reads)
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=True)
+
 
 from firebase_admin import initialize_app, credentials
 from google.auth import load_credentials_from_file
@@ -271,9 +416,21 @@ FCM_DJANGO_SETTINGS = {
     "DELETE_INACTIVE_DEVICES": False,
 }
 
+# push fan-out for new assignments / notices (assignments.push), sent from a background thread
+PUSH_NOTIFICATIONS_ENABLED = env.bool('PUSH_NOTIFICATIONS_ENABLED', default=True)
+PUSH_BATCH_SIZE = 500  # FCM multicast limit
+PUSH_MAX_RETRIES = env.int('PUSH_MAX_RETRIES', default=3)
+PUSH_RETRY_BACKOFF = env.float('PUSH_RETRY_BACKOFF', default=2.0)  # seconds, doubled on each retry
+
 
 APPEND_SLASH = False
 
+# background uploads (fileandimage.uploads): files wait here until a worker thread pushes them to Cloudinary
+UPLOAD_SPOOL_DIR = env('UPLOAD_SPOOL_DIR', default=os.path.join(tempfile.gettempdir(), 'assignment_api_uploads'))
+UPLOAD_WORKERS = env.int('UPLOAD_WORKERS', default=4)  # threads per gunicorn worker
+# seconds before process_pending_uploads takes over an upload a worker started and never finished
+UPLOAD_CLAIM_TIMEOUT = env.int('UPLOAD_CLAIM_TIMEOUT', default=600)
+
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api	
@@ -18,6 +18,7 @@ from django.contrib import admin
 from rest_framework_simplejwt.views import TokenObtainPairView,TokenRefreshView
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from utils.throttling import LOGIN_THROTTLES
 
 
 urlpatterns = [
@@ -27,7 +28,10 @@ urlpatterns = [
     path('notices/',include('notices.urls')),
     path('subjects/',include('subjects.urls')),
     path('file/',include('fileandimage.urls')),
-    path('api/token', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('search',include('search.urls')),
+    path('sync/',include('sync.urls')),
+    path('live/',include('live.urls')),
+    path('api/token', TokenObtainPairView.as_view(throttle_classes=LOGIN_THROTTLES), name='token_obtain_pair'),
     path('api/token/refresh', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/schema', SpectacularAPIView.as_view(), name='schema'),
     path('swagger', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -4,5 +4,5 @@ from django.apps import AppConfig
 class NoticesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notices'
-    # def ready(self):
-    #     import notices.signals
\ No newline at end of file
+    def ready(self):
+        import notices.signals
\ No newline at end of file
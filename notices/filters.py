@@ -0,0 +1,45 @@
+import datetime
+import django_filters
+from django.utils import timezone
+from utils.filters import IndexedFilterSet
+from .models import Notices, TARGET_AUDIENCE_CHOICES, masks_visible_to
+
+
+class NoticeFilter(IndexedFilterSet):
+    """
+    Query filters for NoticeListView.
+    Notices.Meta has an index for each ordering led by category, priority,
+    category + priority and audience. date and created are ranges on created_at,
+    they sort by it. Keep the indexes in sync when adding filters or orderings.
+    """
+    range_orderings = {'date': '-created_at', 'created': '-created_at'}
+
+    audience = django_filters.ChoiceFilter(
+        method='filter_audience',
+        choices=[('mine', 'Mine')] + [(audience, audience) for audience in TARGET_AUDIENCE_CHOICES],
+    )
+    date = django_filters.DateFilter(method='filter_date')
+    created = django_filters.IsoDateTimeFromToRangeFilter(field_name='created_at')  # ?created_after=&created_before=
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        )
+    )
+
+    class Meta:
+        model = Notices
+        fields = ['category', 'priority']
+
+    def filter_audience(self, queryset, name, value):
+        # ?audience=mine uses the caller's faculty, users without one (or 'ALL') see everything
+        if value == 'mine':
+            value = getattr(self.request.user, 'faculty', None)
+            if not value or value == 'ALL':
+                return queryset
+        return queryset.filter(audience_mask__in=masks_visible_to(value))
+
+    def filter_date(self, queryset, name, value):
+        # a range on created_at instead of created_at__date so the index is usable
+        start = timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
+        return queryset.filter(created_at__gte=start, created_at__lt=start + datetime.timedelta(days=1))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from notices.models import Notices, audience_to_mask
+
+
+class Command(BaseCommand):
+    help = "Recompute Notices.audience_mask from target_audience (run after adding the column)"
+
+    def handle(self, *args, **options):
+        stale = []
+        for notice in Notices.objects.only('notice_id', 'target_audience', 'audience_mask').iterator(chunk_size=1000):
+            mask = audience_to_mask(notice.target_audience)
+            if notice.audience_mask != mask:
+                notice.audience_mask = mask
+                stale.append(notice)
+        # bulk_update skips save(), so updated_at is left alone
+        Notices.objects.bulk_update(stale, ['audience_mask'], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Updated audience_mask on {len(stale)} notice(s)"))
@@ -4,6 +4,28 @@ from shortuuidfield import ShortUUIDField
 from fileandimage.models import FileAndImage
 
 TARGET_AUDIENCE_CHOICES=['ALL','BCA','BIM','CSIT']
+# one bit per audience value, stored in Notices.audience_mask
+AUDIENCE_BITS = {audience: 1 << i for i, audience in enumerate(TARGET_AUDIENCE_CHOICES)}
+
+
+def audience_to_mask(target_audience):
+    """Pack a target_audience list into its bitmask"""
+    mask = 0
+    for audience in target_audience or []:
+        mask |= AUDIENCE_BITS.get(audience, 0)
+    return mask
+
+
+def masks_visible_to(faculty):
+    """
+    Every audience_mask value a member of `faculty` can see, i.e. masks with
+    the ALL bit or the faculty bit set. There are only 2**4 masks, so this is
+    a short IN list that the audience_mask index can answer directly
+    (a bitwise AND in the WHERE clause could not use an index).
+    """
+    wanted = AUDIENCE_BITS['ALL'] | AUDIENCE_BITS.get(faculty, 0)
+    return [mask for mask in range(1 << len(AUDIENCE_BITS)) if mask & wanted]
+
 # Create your models here.
 class Notices(models.Model):
     PRIORITY_CHOICES = [
@@ -28,8 +50,35 @@ class Notices(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='general')
     target_audience = models.JSONField(default=list, blank=True) 
+    # bitmask copy of target_audience so "visible to CSIT" can use an index
+    audience_mask = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # backs NoticeFilter: each filter followed by the orderings it allows
+            models.Index(fields=['-updated_at'], name='notice_updated_idx'),
+            models.Index(fields=['-created_at'], name='notice_created_idx'),
+            models.Index(fields=['category', '-updated_at'], name='notice_category_updated_idx'),
+            models.Index(fields=['priority', '-updated_at'], name='notice_priority_updated_idx'),
+            models.Index(fields=['category', 'priority', '-updated_at'], name='notice_cat_prio_updated_idx'),
+            models.Index(fields=['audience_mask', '-updated_at'], name='notice_audience_updated_idx'),
+            models.Index(fields=['category', '-created_at'], name='notice_category_created_idx'),
+            models.Index(fields=['priority', '-created_at'], name='notice_priority_created_idx'),
+            models.Index(fields=['category', 'priority', '-created_at'], name='notice_cat_prio_created_idx'),
+            models.Index(fields=['audience_mask', '-created_at'], name='notice_audience_created_idx'),
+            # the keyset /sync/changes walks
+            models.Index(fields=['updated_at', 'notice_id'], name='notice_sync_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # keep the mask in sync with target_audience on every write
+        self.audience_mask = audience_to_mask(self.target_audience)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'target_audience' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'audience_mask'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -1,3 +1,4 @@
+import math
 from rest_framework import serializers
 from .models import Notices, TARGET_AUDIENCE_CHOICES
 from fileandimage.models import FileAndImage
@@ -7,10 +8,32 @@ from rest_framework.exceptions import ValidationError, NotFound
 
 
 class FileAndImageMiniSerializer(serializers.ModelSerializer):
+    """
+    file_url is the original, or the rendition asked for with ?variant=thumbnail|medium|webp|preview
+    at ?dpr=1|2|3 (default 1). Only query params are used, the response caches key on the URL.
+    Unknown variants fall back to the original.
+    """
     class Meta:
         model = FileAndImage
         fields = ["file_id", "file_url"]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        variant = request.query_params.get('variant') if request is not None else None
+        urls = instance.variants.get(variant) if variant else None
+        if urls:
+            data['file_url'] = urls.get(self.get_dpr(request), urls['1'])
+        return data
+
+    def get_dpr(self, request):
+        dpr = request.query_params.get('dpr')
+        try:
+            # round up to the closest rendition we have, 1..3
+            return str(min(max(math.ceil(float(dpr)), 1), 3))
+        except (TypeError, ValueError, OverflowError):
+            return '1'
+
 class IssuedByMiniSerializer(serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
 
@@ -1,36 +1,30 @@
-# from django.dispatch import receiver
-# from django.db.models.signals import post_save
-# from .models import Notices
-# from assignments.models import CustomDevice
-# from core.models import CustomUser  # adjust if needed
-# from fcm_django.admin import Notification,Message
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Notices
+from utils.cache import bump_namespace
+from assignments.push import queue_push
 
-# @receiver(post_save, sender=Notices)
-# def notify_notice_saved(sender, instance, created, **kwargs):
-#     if created:
-#         if instance.target_audience == ["ALL"]:
-#             devices = CustomDevice.objects.all()
-#         else:
-#             # First, get user IDs whose faculty matches the target audience
-#             user_ids = CustomUser.objects.filter(faculty__in=instance.target_audience).values_list('id', flat=True)
 
-#             # Then, get devices for those users
-#             devices = CustomDevice.objects.filter(user_id__in=user_ids)
+@receiver(post_save, sender=Notices)
+@receiver(post_delete, sender=Notices)
+def invalidate_notice_cache(sender, instance, **kwargs):
+    bump_namespace('notices')
 
-#         # for device in devices:
-#         #     # send_notification(device, instance.title, instance.content)
-#         #     pass
-#         devices.send_message(
-#             Message(
-#             notification=Notification(
-#                 title="📢 New Notice",
-#                 image=instance.notice_image.file_url if instance.notice_image else None,
-#                 body=instance.title
-#             ),
-#             data={
-#                 "notice_id": str(instance.notice_id),
-#                 "target_audience": str(instance.target_audience),
-#                 "route": "/getNotice"
-#             }
-#             )
-#         )
+
+
+@receiver(post_save, sender=Notices)
+def notify_notice_created(sender, instance, created, **kwargs):
+    if created:
+        image = instance.notice_image
+        queue_push(
+            'notice', instance.notice_id, instance.target_audience,
+            title="📢 New Notice",
+            body=instance.title,
+            # the medium rendition, FCM drops images over 1MB and can't show PDFs
+            image=(image.variants.get('medium', {}).get('1') or image.file_url) if image else None,
+            data={
+                "notice_id": instance.notice_id,
+                "target_audience": instance.target_audience,
+                "route": "/getNotice",
+            },
+        )
@@ -1,3 +1,194 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import cloudinary
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from fileandimage.models import FileAndImage
+from .models import Notices, audience_to_mask, masks_visible_to
 
-# Create your tests here.
+User = get_user_model()
+
+
+class NoticeAudienceTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@test.com',
+            password='testpass123',
+            role='student',
+            faculty='CSIT'
+        )
+        for title, audience in [('For all', ['ALL']), ('For CSIT', ['CSIT']),
+                                ('For BCA and BIM', ['BCA', 'BIM']), ('For CSIT and BCA', ['CSIT', 'BCA'])]:
+            Notices.objects.create(title=title, issued_by=self.teacher, target_audience=audience)
+
+    def authenticate(self, user):
+        token = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_mask_follows_target_audience(self):
+        notice = Notices.objects.get(title='For BCA and BIM')
+        self.assertEqual(notice.audience_mask, audience_to_mask(['BCA', 'BIM']))
+        notice.target_audience = ['ALL']
+        notice.save()
+        notice.refresh_from_db()
+        self.assertIn(notice.audience_mask, masks_visible_to('BIM'))
+
+    def test_mine_filters_by_faculty(self):
+        self.authenticate(self.student)
+        response = self.client.get('/notices/list?audience=mine')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = {notice['title'] for notice in response.data['data']}
+        self.assertEqual(titles, {'For all', 'For CSIT', 'For CSIT and BCA'})
+
+    def test_mine_without_faculty_sees_everything(self):
+        self.authenticate(self.teacher)  # faculty defaults to 'ALL'
+        response = self.client.get('/notices/list?audience=mine')
+        self.assertEqual(response.data['pagination']['total'], 4)
+
+    def test_export_follows_audience(self):
+        self.authenticate(self.student)
+        response = self.client.get('/notices/export?audience=mine&fmt=ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response).decode().splitlines()]
+        self.assertEqual({row['title'] for row in rows}, {'For all', 'For CSIT', 'For CSIT and BCA'})
+        self.assertEqual(rows[0]['issued_by'], 'teacher')
+
+    def test_sync_command_backfills_mask(self):
+        Notices.objects.update(audience_mask=0)
+        call_command('sync_notice_audience', stdout=StringIO())
+        self.assertFalse(Notices.objects.filter(audience_mask=0).exists())
+
+
+class NoticeFilterTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.day = timezone.now().replace(hour=12) - timedelta(days=10)
+        for i, (title, category, priority) in enumerate([
+            ('Exam routine', 'exam', 'high'), ('Exam hall', 'exam', 'low'),
+            ('Dashain holiday', 'holiday', 'high'), ('Seminar', 'seminar', 'medium'),
+        ]):
+            notice = Notices.objects.create(title=title, category=category, priority=priority, issued_by=self.teacher)
+            Notices.objects.filter(pk=notice.pk).update(created_at=self.day + timedelta(days=i))
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def titles(self, **params):
+        response = self.client.get('/notices/list', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [notice['title'] for notice in response.data['data']]
+
+    def test_category_priority_and_ordering(self):
+        self.assertEqual(self.titles(category='exam', priority='high'), ['Exam routine'])
+        self.assertEqual(self.titles(category='exam', ordering='created_at'), ['Exam routine', 'Exam hall'])
+        self.assertEqual(self.titles(priority='high', ordering='-created_at'), ['Dashain holiday', 'Exam routine'])
+
+    def test_date_ranges_sort_by_created_at(self):
+        self.assertEqual(self.titles(date=(self.day + timedelta(days=1)).date().isoformat()), ['Exam hall'])
+        after = (self.day + timedelta(days=1, hours=-1)).isoformat()
+        self.assertEqual(self.titles(created_after=after), ['Seminar', 'Dashain holiday', 'Exam hall'])
+        self.assertEqual(self.titles(created_after=after, ordering='created_at')[0], 'Exam hall')
+
+        response = self.client.get('/notices/list', {'created_after': after, 'ordering': 'updated_at'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NoticeConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        self.notice = Notices.objects.create(title='Exam routine', issued_by=self.teacher, target_audience=['ALL'])
+        Notices.objects.create(title='Holiday', issued_by=self.teacher, target_audience=['ALL'])
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_unchanged_list_returns_304(self):
+        response = self.client.get('/notices/list')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('stale-while-revalidate', response['Cache-Control'])
+
+        response = self.client.get('/notices/list', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_delete_changes_list_etag(self):
+        etag = self.client.get('/notices/list')['ETag']
+        self.notice.delete()
+        response = self.client.get('/notices/list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pagination']['total'], 1)
+
+    def test_detail_etag_changes_on_update(self):
+        url = f'/notices/{self.notice.notice_id}'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.notice.title = 'Exam routine (revised)'
+        self.notice.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['title'], 'Exam routine (revised)')
+
+
+class NoticeImageVariantTest(APITestCase):
+    def setUp(self):
+        # variant urls are built when the file is saved
+        self.enterContext(mock.patch.multiple(cloudinary.config(), cloud_name='demo'))
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher'
+        )
+        self.poster = FileAndImage.objects.create(
+            file_url='https://cdn.test/poster.png', public_id='assignment_api/poster',
+            file_type='notice', meta_type='png', user=self.teacher
+        )
+        self.notice = Notices.objects.create(
+            title='Sports week', issued_by=self.teacher, target_audience=['ALL'], notice_image=self.poster
+        )
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def image_url(self, query=''):
+        response = self.client.get(f'/notices/{self.notice.notice_id}{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']['notice_image']['file_url']
+
+    def test_original_by_default(self):
+        self.assertEqual(self.image_url(), 'https://cdn.test/poster.png')
+        self.assertEqual(self.image_url('?variant=huge'), 'https://cdn.test/poster.png')
+
+    def test_variant_and_dpr(self):
+        self.assertIn('w_200', self.image_url('?variant=thumbnail'))
+        url = self.image_url('?variant=webp&dpr=1.5')
+        self.assertIn('dpr_2.0', url)
+        self.assertTrue(url.endswith('.webp'))
+
+    def test_pdf_gets_first_page_preview(self):
+        self.assertNotIn('preview', self.poster.variants)
+        pdf = FileAndImage.objects.create(
+            file_url='https://cdn.test/routine.pdf', public_id='assignment_api/routine',
+            file_type='notice', meta_type='pdf', user=self.teacher
+        )
+        self.assertIn('pg_1', pdf.variants['preview']['1'])
+        self.assertTrue(pdf.variants['thumbnail']['1'].endswith('.jpg'))
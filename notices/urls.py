@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     NoticeCreateView,
     NoticeListView,
+    NoticeExportView,
     NoticeDetailView,
     NoticeUpdateView,
     NoticeDeleteView
@@ -10,6 +11,7 @@ from .views import (
 urlpatterns = [
     path('list', NoticeListView.as_view(), name='notice-list'),
     path('create', NoticeCreateView.as_view(), name='notice-create'),
+    path('export', NoticeExportView.as_view(), name='notice-export'),
     path('<str:pk>', NoticeDetailView.as_view(), name='notice-detail'),
     path('update/<str:pk>', NoticeUpdateView.as_view(), name='notice-update'),
     path('delete/<str:pk>', NoticeDeleteView.as_view(), name='notice-delete'),
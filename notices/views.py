@@ -3,11 +3,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveAPIView, UpdateAPIView, DestroyAPIView
 from rest_framework.exceptions import PermissionDenied, ValidationError, NotFound,ParseError
+from django.db import OperationalError
 from .models import Notices
 from .serializers import NoticeReadSerializer,NoticeCreateSerializer,NoticeUpdateSerializer
+from .filters import NoticeFilter
+from django.http import Http404
 from drf_spectacular.utils import extend_schema
 from utils.custompermissions import AdminOrTeacherPermission
 from utils.pagination_class import CustomPagination
+from utils.cache import cached_response_data, acached_response_data
+from utils.conditional import ConditionalGetMixin
+from utils.asyncviews import AsyncReadMixin
+from utils.export import ExportView, EXPORT_PARAMETERS
 from fileandimage.models import FileAndImage
 from fileandimage.views import FileAndImageDeleteView
 @extend_schema(
@@ -47,27 +54,36 @@ class NoticeCreateView(CreateAPIView):
             return Response({
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 @extend_schema(
     summary="Get all notices",
-    description="Retrieve all notices with issuer details. Accessible to all authenticated users.",
+    description="Retrieve all notices with issuer details. Accessible to all authenticated users. "
+                "Filter with category, priority, date (YYYY-MM-DD), created_after/created_before and sort with "
+                "`ordering` (created_at, updated_at); date and created ranges sort by created_at. `audience=mine` returns only notices meant for the "
+                "caller's faculty (or `audience=BCA` etc. for a given faculty). "
+                "`variant` (thumbnail, medium, webp, preview) and `dpr` (1-3) pick a smaller notice_image rendition.",
     tags=['Notices']
 )
-class NoticeListView(ListAPIView):
+class NoticeListView(ConditionalGetMixin, AsyncReadMixin, ListAPIView):
     """List all notices with user details"""
     permission_classes = [IsAuthenticated]
+    conditional_namespaces = ('notices',)
     serializer_class = NoticeReadSerializer
     pagination_class = CustomPagination
+    filterset_class = NoticeFilter
     
     def get_queryset(self):
-        return Notices.objects.select_related('issued_by').all().order_by('-updated_at')
+        # notice_image too, the async path can't lazy-load it (and it saves a query per notice)
+        return Notices.objects.select_related('issued_by', 'notice_image').all().order_by('-updated_at')
     
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
             if page is not None:
                 serializer = self.get_serializer(page, many=True)
@@ -80,32 +96,111 @@ class NoticeListView(ListAPIView):
                 'data': serializer.data,
                 'message': 'Notices retrieved successfully'
             }, status=status.HTTP_200_OK)
+        except (ValidationError, NotFound):
+            raise
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def alist(self, request, *args, **kwargs):
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.apaginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.paginator.get_paginated_response(serializer.data, 'Notices retrieved successfully')
+
+            serializer = self.get_serializer([notice async for notice in queryset.aiterator()], many=True)
+            return Response({
+                'data': serializer.data,
+                'message': 'Notices retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except (ValidationError, NotFound):
+            raise
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
+@extend_schema(
+    summary="Export notices",
+    description="Stream every notice matching the list filters (including `audience`) as CSV or NDJSON (`fmt`). "
+                "Not paginated, meant for reports and audits.",
+    parameters=EXPORT_PARAMETERS,
+    responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str},
+    tags=['Notices']
+)
+class NoticeExportView(ExportView):
+    permission_classes = [IsAuthenticated]
+    filterset_class = NoticeFilter
+    export_name = 'notices'
+    export_fields = (
+        ('notice_id', 'notice_id'),
+        ('title', 'title'),
+        ('priority', 'priority'),
+        ('category', 'category'),
+        ('target_audience', 'target_audience'),
+        ('issued_by_id', 'issued_by_id'),
+        ('issued_by', 'issued_by__username'),
+        ('notice_image_url', 'notice_image__file_url'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    def get_queryset(self):
+        return Notices.objects.order_by('-updated_at', '-notice_id')
+
+
 @extend_schema(
     summary="Get notice by ID",
-    description="Retrieve a specific notice by its ID",
+    description="Retrieve a specific notice by its ID. "
+                "`variant` (thumbnail, medium, webp, preview) and `dpr` (1-3) pick a smaller notice_image rendition.",
     tags=['Notices']
 )
-class NoticeDetailView(RetrieveAPIView):
+class NoticeDetailView(ConditionalGetMixin, AsyncReadMixin, RetrieveAPIView):
     """Retrieve a specific notice by ID"""
     permission_classes = [IsAuthenticated]
-    queryset = Notices.objects.select_related('issued_by').all()
+    conditional_namespaces = ('notices',)
+    queryset = Notices.objects.select_related('issued_by', 'notice_image').all()
     serializer_class = NoticeReadSerializer
     
     def retrieve(self, request, *args, **kwargs):
         try:
-            instance = self.get_object()
-            serializer = self.get_serializer(instance)
+            data = cached_response_data(
+                request, ('notices',), lambda: self.get_serializer(self.get_object()).data
+            )
             return Response({
-                'data': serializer.data,
+                'data': data,
                 'message': 'Notice retrieved successfully'
             }, status=status.HTTP_200_OK)
-        except Notices.DoesNotExist:
+        except (Notices.DoesNotExist, Http404):
+            raise NotFound({"message": "Notice not found"})
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        async def build():
+            return self.get_serializer(await self.aget_object()).data
+
+        try:
+            data = await acached_response_data(request, ('notices',), build)
+            return Response({
+                'data': data,
+                'message': 'Notice retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except (Notices.DoesNotExist, Http404):
             raise NotFound({"message": "Notice not found"})
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': str(e)
@@ -150,6 +245,8 @@ class NoticeUpdateView(UpdateAPIView):
             return Response({
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': str(e)
@@ -185,6 +282,8 @@ class NoticeDeleteView(DestroyAPIView):
             }, status=status.HTTP_200_OK)
         except Notices.DoesNotExist:
             raise NotFound({"message": "Notice not found"})
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': str(e)
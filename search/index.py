@@ -0,0 +1,107 @@
+import re
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast
+from assignments.models import Assignment
+from notices.models import Notices
+from subjects.models import Subject
+from .models import SearchDocument, SearchTerm
+
+# kind -> (model, title, body) of each indexed model
+SOURCES = {
+    'assignment': (Assignment, lambda obj: obj.title, lambda obj: obj.description),
+    'notice': (Notices, lambda obj: obj.title, lambda obj: ''),
+    'subject': (Subject, lambda obj: obj.name, lambda obj: f"{obj.code} {obj.description or ''}"),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+# fallback index weights, roughly ts_rank's A and B
+TITLE_WEIGHT = 4
+BODY_WEIGHT = 1
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in is it of on or the to with'.split()
+)
+
+
+def config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def full_text():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Lowercased words for the fallback index, without stop words"""
+    return [
+        word[:64] for word in re.findall(r'\w+', (text or '').lower())
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def index_objects(objects):
+    """Upsert the search documents of model instances that all have the same model"""
+    objects = list(objects)
+    if not objects:
+        return
+    kind = KIND_BY_MODEL[type(objects[0])]
+    _, title, body = SOURCES[kind]
+    documents = [
+        SearchDocument(kind=kind, object_id=obj.pk, title=title(obj)[:250], body=body(obj))
+        for obj in objects
+    ]
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            documents, update_conflicts=True,
+            unique_fields=['kind', 'object_id'], update_fields=['title', 'body', 'updated_at'],
+        )
+        indexed = SearchDocument.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects])
+        if full_text():
+            indexed.update(vector=(
+                SearchVector('title', weight='A', config=config())
+                + SearchVector('body', weight='B', config=config())
+            ))
+        else:
+            _index_terms(indexed)
+
+
+def _index_terms(documents):
+    documents = list(documents.only('pk', 'title', 'body'))
+    SearchTerm.objects.filter(document__in=documents).delete()
+    terms = []
+    for document in documents:
+        weights = dict.fromkeys(tokenize(document.body), BODY_WEIGHT)
+        weights.update(dict.fromkeys(tokenize(document.title), TITLE_WEIGHT))
+        terms.extend(SearchTerm(term=term, document=document, weight=weight) for term, weight in weights.items())
+    SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def unindex_objects(model, object_ids):
+    SearchDocument.objects.filter(kind=KIND_BY_MODEL[model], object_id__in=list(object_ids)).delete()
+
+
+def search(query, kind=None):
+    """
+    SearchDocuments matching `query`, annotated with `rank` (higher is better).
+    Every word has to match. Returns None when the query has nothing to search for.
+    """
+    documents = SearchDocument.objects.all()
+    if kind:
+        documents = documents.filter(kind=kind)
+
+    if full_text():
+        search_query = SearchQuery(query, search_type='websearch', config=config())
+        # ts_rank returns real, as double precision the cursor's rank compares equal to it
+        return documents.filter(vector=search_query).annotate(
+            rank=Cast(SearchRank(F('vector'), search_query), FloatField()),
+        )
+
+    terms = set(tokenize(query))
+    if not terms:
+        return None
+    # filter() before annotate() so the sums only see the matching terms
+    return documents.filter(terms__term__in=terms).annotate(
+        rank=Sum('terms__weight'), hits=Count('terms'),
+    ).filter(hits=len(terms))
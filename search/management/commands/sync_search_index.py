@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from search.index import SOURCES, index_objects
+from search.models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents of every assignment, notice and subject"
+
+    def handle(self, *args, **options):
+        for kind, (model, _, _) in SOURCES.items():
+            count = 0
+            batch = []
+            for obj in model.objects.order_by('pk').iterator(chunk_size=1000):
+                batch.append(obj)
+                if len(batch) == 1000:
+                    index_objects(batch)
+                    count += len(batch)
+                    batch = []
+            index_objects(batch)
+            count += len(batch)
+
+            # documents of rows deleted while the signals weren't connected
+            _, deleted = SearchDocument.objects.filter(kind=kind).exclude(
+                object_id__in=model.objects.values('pk')
+            ).delete()
+            removed = deleted.get(SearchDocument._meta.label, 0)
+            self.stdout.write(self.style.SUCCESS(f"Indexed {count} {kind}(s), removed {removed} stale document(s)"))
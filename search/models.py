@@ -0,0 +1,53 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class VectorIndex(GinIndex):
+    """
+    GIN on Postgres, a plain index elsewhere: SQLite has no GIN and never fills
+    `vector` (see SearchTerm). Declared on every database, so the generated
+    migrations don't depend on the one makemigrations ran against.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class SearchDocument(models.Model):
+    """
+    One searchable row per assignment, notice and subject, kept up to date by search.signals
+    (assignments by assignments.signals.assignments_saved).
+    On Postgres `vector` holds the weighted tsvector (title A, body B) behind a GIN index.
+    """
+    KIND_CHOICES = [('assignment', 'Assignment'), ('notice', 'Notice'), ('subject', 'Subject')]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=50)
+    title = models.CharField(max_length=250)
+    body = models.TextField(blank=True)
+    vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_object_uniq'),
+        ]
+        indexes = [VectorIndex(fields=['vector'], name='search_document_vector_idx')]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index used instead of `vector` on databases without full-text search (SQLite locally)"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='terms')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'], name='search_term_document_uniq'),
+        ]
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from .models import SearchDocument
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchDocument
+        fields = ['kind', 'object_id', 'title', 'rank']
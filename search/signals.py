@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from assignments.models import Assignment
+from notices.models import Notices
+from subjects.models import Subject
+from .index import index_objects, unindex_objects
+
+
+# assignments are indexed by assignments.signals.assignments_saved
+@receiver(post_save, sender=Notices)
+@receiver(post_save, sender=Subject)
+def index_document(sender, instance, **kwargs):
+    index_objects([instance])
+
+
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Notices)
+@receiver(post_delete, sender=Subject)
+def unindex_document(sender, instance, **kwargs):
+    unindex_objects(sender, [instance.pk])
@@ -0,0 +1,117 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from assignments.models import Assignment
+from notices.models import Notices
+from subjects.models import Subject
+from .models import SearchDocument
+
+User = get_user_model()
+
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.subject = Subject.objects.create(name='Computer Network', code='CN101', credits=3, created_by=self.teacher)
+        self.lab = Assignment.objects.create(
+            title='Network lab', description='Configure a router', subject=self.subject,
+            teacher=self.teacher, faculty='BCA', semester='First Semester'
+        )
+        self.essay = Assignment.objects.create(
+            title='Essay', description='Write about the network layer of the internet', subject=self.subject,
+            teacher=self.teacher, faculty='BCA', semester='First Semester'
+        )
+        self.notice = Notices.objects.create(title='Network lab closed on Friday', issued_by=self.teacher)
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def search(self, query):
+        response = self.client.get('/search', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['kind'], item['object_id']) for item in response.data['data']]
+
+    def test_title_matches_rank_first(self):
+        results = self.search('network')
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[-1], ('assignment', self.essay.assignment_id))
+
+    def test_every_word_has_to_match(self):
+        self.assertEqual(set(self.search('the network lab')), {
+            ('notice', self.notice.notice_id), ('assignment', self.lab.assignment_id)
+        })
+        self.assertEqual(self.search('router'), [('assignment', self.lab.assignment_id)])
+        self.assertEqual(self.search('router friday'), [])
+
+    def test_kind_filter(self):
+        response = self.client.get('/search', {'q': 'network', 'kind': 'subject'})
+        self.assertEqual([item['object_id'] for item in response.data['data']], [self.subject.subject_id])
+
+    def test_index_follows_writes(self):
+        self.lab.description = 'Measure latency'
+        self.lab.save()
+        self.assertEqual(self.search('router'), [])
+        self.assertEqual(self.search('latency'), [('assignment', self.lab.assignment_id)])
+
+        self.notice.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='notice').exists())
+
+    def test_bulk_create_is_indexed(self):
+        response = self.client.post('/assignments/bulk/create', {'assignments': [
+            {'title': 'Subnetting worksheet', 'description': 'IPv4', 'semester': 'First Semester',
+             'faculty': 'BCA', 'subject_id': self.subject.subject_id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.search('subnetting')), 1)
+
+    def test_cursor_walks_every_result_once(self):
+        seen = []
+        params = {'q': 'network', 'limit': 1}
+        while True:
+            response = self.client.get('/search', params)
+            seen.extend(item['object_id'] for item in response.data['data'])
+            cursor = response.data['pagination']['next_cursor']
+            if not cursor:
+                break
+            params['cursor'] = cursor
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
+
+    def test_tied_ranks_across_pages(self):
+        tied = {Notices.objects.create(title=f'Holiday {i}', issued_by=self.teacher).notice_id for i in range(5)}
+        seen = []
+        params = {'q': 'holiday', 'limit': 2}
+        while True:
+            response = self.client.get('/search', params)
+            self.assertEqual(len({item['rank'] for item in response.data['data']}), 1)
+            seen.extend(item['object_id'] for item in response.data['data'])
+            cursor = response.data['pagination']['next_cursor']
+            if not cursor:
+                break
+            params['cursor'] = cursor
+        self.assertEqual(sorted(seen), sorted(tied))
+
+    def test_vector_index_exists_on_every_database(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, SearchDocument._meta.db_table)
+        self.assertEqual(constraints['search_document_vector_idx']['columns'], ['vector'])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/search').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/search', {'q': 'lab', 'kind': 'user'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/search', {'q': 'lab', 'cursor': 'x'}).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.search('the'), [])
+
+    def test_sync_command_rebuilds_index(self):
+        SearchDocument.objects.all().delete()
+        SearchDocument.objects.create(kind='notice', object_id='gone', title='Old')
+        call_command('sync_search_index', stdout=StringIO())
+        self.assertEqual(SearchDocument.objects.count(), 4)
+        self.assertEqual(self.search('router'), [('assignment', self.lab.assignment_id)])
@@ -0,0 +1,51 @@
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from utils.pagination_class import RankPagination
+from .index import search
+from .models import SearchDocument
+from .serializers import SearchResultSerializer
+
+
+@extend_schema(
+    summary="Search assignments, notices and subjects",
+    description="Ranked full-text search over assignment titles and descriptions, notice titles and subject names. "
+                "Every word of `q` has to match (quoted phrases, `or` and `-word` also work on Postgres). "
+                "Narrow it with `kind`; page with `limit` and `cursor` from pagination.next_cursor.",
+    parameters=[
+        OpenApiParameter('q', OpenApiTypes.STR, required=True),
+        OpenApiParameter('kind', OpenApiTypes.STR, enum=[kind for kind, _ in SearchDocument.KIND_CHOICES]),
+    ],
+    tags=['Search']
+)
+class SearchView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = SearchResultSerializer
+    pagination_class = RankPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return SearchDocument.objects.none()
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({"message": "q is required."})
+        kind = self.request.query_params.get('kind')
+        if kind and kind not in dict(SearchDocument.KIND_CHOICES):
+            raise ValidationError({"message": "kind must be assignment, notice or subject."})
+        return search(query[:200], kind)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if queryset is None:
+            # only stop words / punctuation, nothing can match
+            return Response({
+                'message': 'Search results retrieved successfully',
+                'pagination': {'next_cursor': None, 'limit': self.paginator.get_limit(request)},
+                'data': [],
+            }, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data, 'Search results retrieved successfully')
@@ -5,3 +5,6 @@ class SubjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'subjects'
     verbose_name = 'Subjects'
+
+    def ready(self):
+        import subjects.signals
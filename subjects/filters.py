@@ -0,0 +1,26 @@
+import django_filters
+from utils.filters import IndexedFilterSet
+from .models import Subject
+
+
+class SubjectFilter(IndexedFilterSet):
+    """
+    Query filters for SubjectListView.
+    name and code are unique so they are indexed already, credits is followed by
+    each of them in Subject.Meta. credits_min/credits_max sort by credits.
+    """
+    range_orderings = {'credits_min': 'credits', 'credits_max': 'credits'}
+
+    credits_min = django_filters.NumberFilter(field_name='credits', lookup_expr='gte')
+    credits_max = django_filters.NumberFilter(field_name='credits', lookup_expr='lte')
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('name', 'name'),
+            ('code', 'code'),
+            ('credits', 'credits'),
+        )
+    )
+
+    class Meta:
+        model = Subject
+        fields = ['credits']
@@ -18,6 +18,13 @@ class Subject(models.Model):
         ordering = ['name']
         verbose_name = 'Subject'
         verbose_name_plural = 'Subjects'
+        indexes = [
+            # backs SubjectFilter, name and code are unique so already indexed
+            models.Index(fields=['credits', 'name'], name='subject_credits_name_idx'),
+            models.Index(fields=['credits', 'code'], name='subject_credits_code_idx'),
+            # the keyset /sync/changes walks
+            models.Index(fields=['updated_at', 'subject_id'], name='subject_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.code} - {self.name}"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Subject
+from utils.cache import bump_namespace
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_cache(sender, instance, **kwargs):
+    # assignments embed the subject name
+    bump_namespace('subjects', 'assignments')
@@ -1,5 +1,11 @@
+import time
+from unittest import mock
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -94,3 +100,88 @@ class SubjectAPITest(APITestCase):
         
         response = self.client.post('/subjects/create/', data)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class SubjectCacheTest(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='testpass123',
+            role='admin'
+        )
+        self.subject = Subject.objects.create(
+            name='Mathematics',
+            code='MATH101',
+            credits=3,
+            created_by=self.admin_user
+        )
+        refresh = RefreshToken.for_user(self.admin_user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def subject_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [q for q in ctx.captured_queries if 'subjects_subject' in q['sql']]
+
+    def test_repeated_reads_are_served_from_cache(self):
+        url = f'/subjects/{self.subject.subject_id}'
+        self.subject_queries(url)
+        response, queries = self.subject_queries(url)
+        # only the updated_at lookup for the ETag, the payload comes from the cache
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"subjects_subject"."name"', queries[0]['sql'])
+        self.assertEqual(response.data['data']['name'], 'Mathematics')
+
+    def test_save_invalidates_cached_list_and_detail(self):
+        self.subject_queries('/subjects/list')
+        self.subject_queries(f'/subjects/{self.subject.subject_id}')
+
+        self.subject.name = 'Applied Mathematics'
+        self.subject.save()
+
+        response, _ = self.subject_queries('/subjects/list')
+        self.assertEqual(response.data['data'][0]['name'], 'Applied Mathematics')
+        response, _ = self.subject_queries(f'/subjects/{self.subject.subject_id}')
+        self.assertEqual(response.data['data']['name'], 'Applied Mathematics')
+
+    def test_cached_payload_expires(self):
+        url = f'/subjects/{self.subject.subject_id}'
+        self.subject_queries(url)
+        later = time.time() + settings.CACHES['default']['TIMEOUT'] + 1
+        with mock.patch('time.time', return_value=later):
+            response, queries = self.subject_queries(url)
+        # ETag lookup and a fresh payload query, both tiers have expired it
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.data['data']['name'], 'Mathematics')
+
+    def test_unknown_subject_is_404(self):
+        response = self.client.get('/subjects/nope')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SubjectFilterTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        admin = User.objects.create_user(username='admin', email='admin@test.com', password='testpass123', role='admin')
+        for name, code, credits in [('Networking', 'CN101', 3), ('Algebra', 'MA101', 4), ('Drawing', 'DR101', 2)]:
+            Subject.objects.create(name=name, code=code, credits=credits, created_by=admin)
+        refresh = RefreshToken.for_user(admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def names(self, **params):
+        response = self.client.get('/subjects/list', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [subject['name'] for subject in response.data['data']]
+
+    def test_credits_and_ordering(self):
+        self.assertEqual(self.names(), ['Algebra', 'Drawing', 'Networking'])
+        self.assertEqual(self.names(credits=3), ['Networking'])
+        self.assertEqual(self.names(ordering='code'), ['Networking', 'Drawing', 'Algebra'])
+
+    def test_credit_range_sorts_by_credits(self):
+        self.assertEqual(self.names(credits_min=3), ['Networking', 'Algebra'])
+        self.assertEqual(self.names(credits_max=3, ordering='-credits'), ['Networking', 'Drawing'])
+        response = self.client.get('/subjects/list', {'credits_min': 3, 'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,33 +3,68 @@ from rest_framework.decorators import permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError, NotFound,bad_request,ParseError
-from django.db import transaction
+from django.db import OperationalError, transaction
+from django.http import Http404
 from .models import Subject
 from .serializers import SubjectSerializer, SubjectCreateUpdateSerializer
+from .filters import SubjectFilter
 from utils.custompermissions import AdminOnlyPermission
+from utils.cache import cached_response_data, acached_response_data
+from utils.conditional import ConditionalGetMixin
+from utils.asyncviews import AsyncReadMixin
 from drf_spectacular.utils import extend_schema, OpenApiExample
 
 @extend_schema(
     summary="Get all subjects",
-    description="Retrieve all subjects. Accessible to all authenticated users.",
+    description="Retrieve all subjects. Accessible to all authenticated users. "
+                "Filter with credits, credits_min/credits_max and sort with `ordering` (name, code, credits); "
+                "credits_min/credits_max sort by credits.",
     tags=['Subjects']
 )
-class SubjectListView(generics.ListAPIView):
+class SubjectListView(ConditionalGetMixin, AsyncReadMixin, generics.ListAPIView):
     """
     List all subjects - accessible to all authenticated users
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticated]
+    conditional_namespaces = ('subjects',)
+    filterset_class = SubjectFilter
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
+            data = cached_response_data(
+                request, ('subjects',),
+                lambda: self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data
+            )
             return Response({
-                'data': serializer.data,
+                'data': data,
                 'message': 'Subjects retrieved successfully'
             }, status=status.HTTP_200_OK)
+        except ValidationError:
+            raise
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': 'Failed to retrieve subjects'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def alist(self, request, *args, **kwargs):
+        async def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            return self.get_serializer([subject async for subject in queryset.aiterator()], many=True).data
+
+        try:
+            data = await acached_response_data(request, ('subjects',), build)
+            return Response({
+                'data': data,
+                'message': 'Subjects retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except ValidationError:
+            raise
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to retrieve subjects'
@@ -40,24 +75,47 @@ class SubjectListView(generics.ListAPIView):
     description="Retrieve a specific subject by its ID",
     tags=['Subjects']
 )
-class SubjectDetailView(generics.RetrieveAPIView):
+class SubjectDetailView(ConditionalGetMixin, AsyncReadMixin, generics.RetrieveAPIView):
     """
     Retrieve a specific subject - accessible to all authenticated users
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticated]
+    conditional_namespaces = ('subjects',)
 
     def retrieve(self, request, *args, **kwargs):
         try:
-            instance = self.get_object()
-            serializer = self.get_serializer(instance)
+            data = cached_response_data(
+                request, ('subjects',), lambda: self.get_serializer(self.get_object()).data
+            )
             return Response({
-                'data': serializer.data,
+                'data': data,
                 'message': 'Subject retrieved successfully'
             }, status=status.HTTP_200_OK)
-        except Subject.DoesNotExist:
+        except (Subject.DoesNotExist, Http404):
+            raise NotFound("Subject not found")
+        except OperationalError:
+            raise
+        except Exception as e:
+            return Response({
+                'message': 'Failed to retrieve subject'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        async def build():
+            return self.get_serializer(await self.aget_object()).data
+
+        try:
+            data = await acached_response_data(request, ('subjects',), build)
+            return Response({
+                'data': data,
+                'message': 'Subject retrieved successfully'
+            }, status=status.HTTP_200_OK)
+        except (Subject.DoesNotExist, Http404):
             raise NotFound("Subject not found")
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to retrieve subject'
@@ -109,6 +167,8 @@ class SubjectCreateView(generics.CreateAPIView):
                         'message': 'Validation error',
                         'errors': serializer.errors
                     }, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to create subject'
@@ -165,6 +225,8 @@ class SubjectUpdateView(generics.UpdateAPIView):
             return Response({
                 'message': str(e),
             }, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError:
+            raise
         except Exception as e:
             return Response({
                 'message': 'Failed to update subject',
@@ -195,6 +257,8 @@ class SubjectDeleteView(generics.DestroyAPIView):
                 }, status=status.HTTP_200_OK)
         except Subject.DoesNotExist:
             raise NotFound("Subject not found")
+        except OperationalError:
+            raise
         except Exception as e:
             print(e)
             return Response({
@@ -0,0 +1,98 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from assignments.models import Assignment
+from assignments.serializers import AssignmentSerializer
+from notices.models import Notices
+from notices.serializers import NoticeReadSerializer
+from subjects.models import Subject
+from subjects.serializers import SubjectSerializer
+from .models import Tombstone
+
+# kind -> (queryset, serializer, key in the response)
+SOURCES = {
+    'assignment': (lambda: Assignment.objects.select_related('subject'), AssignmentSerializer, 'assignments'),
+    'notice': (lambda: Notices.objects.select_related('issued_by', 'notice_image'), NoticeReadSerializer, 'notices'),
+    'subject': (lambda: Subject.objects.all(), SubjectSerializer, 'subjects'),
+}
+KIND_BY_MODEL = {Assignment: 'assignment', Notices: 'notice', Subject: 'subject'}
+
+
+class CursorExpired(Exception):
+    """The cursor is older than the tombstones we keep, the client has to sync from scratch"""
+
+
+def encode_cursor(positions, issued):
+    payload = {
+        'issued': issued.isoformat(),
+        'positions': {kind: [ts.isoformat(), pk] for kind, (ts, pk) in positions.items()},
+    }
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """positions and issue time from a cursor, raises ValueError if it isn't one of ours"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode()))
+        positions = {
+            kind: (datetime.fromisoformat(ts), pk) for kind, (ts, pk) in payload['positions'].items()
+        }
+        issued = datetime.fromisoformat(payload['issued'])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise ValueError("Invalid cursor")
+    for ts, pk in positions.values():
+        if timezone.is_naive(ts) or not isinstance(pk, (str, int)):
+            raise ValueError("Invalid cursor")
+    if timezone.is_naive(issued):
+        raise ValueError("Invalid cursor")
+    return positions, issued
+
+
+def _page(queryset, field, position, upper, limit):
+    """Rows after `position` in (field, pk) order up to `upper`, and whether more are left"""
+    queryset = queryset.filter(**{f'{field}__lte': upper}).order_by(field, 'pk')
+    if position:
+        ts, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__gt': ts}) | Q(**{field: ts, 'pk__gt': pk}))
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def collect_changes(cursor, limit, context=None):
+    """
+    Everything created, updated or deleted since `cursor` (None for a full sync),
+    at most `limit` rows of each kind, plus the cursor to send next time.
+
+    Rows newer than SYNC_SETTLE_SECONDS are left for the next call: updated_at is
+    set when a row is saved, not when its transaction commits, so a slow
+    transaction could otherwise commit a row behind a cursor we already handed out.
+    """
+    now = timezone.now()
+    upper = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    if cursor:
+        positions, issued = decode_cursor(cursor)
+        if issued < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired()
+    else:
+        # a fresh client has nothing to delete
+        positions = {'tombstone': (upper, 0)}
+
+    data, has_more = {}, False
+    for kind, (queryset, serializer, key) in SOURCES.items():
+        rows, more = _page(queryset(), 'updated_at', positions.get(kind), upper, limit)
+        data[key] = serializer(rows, many=True, context=context or {}).data
+        has_more |= more
+        if rows:
+            positions[kind] = (rows[-1].updated_at, rows[-1].pk)
+
+    tombstones, more = _page(Tombstone.objects.all(), 'deleted_at', positions.get('tombstone'), upper, limit)
+    data['deleted'] = [{'kind': t.kind, 'object_id': t.object_id} for t in tombstones]
+    has_more |= more
+    if tombstones:
+        positions['tombstone'] = (tombstones[-1].deleted_at, tombstones[-1].pk)
+
+    return data, encode_cursor(positions, now), has_more
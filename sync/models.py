@@ -0,0 +1,20 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """A deleted assignment, notice or subject, kept so /sync/changes can tell clients to drop it"""
+    KIND_CHOICES = [('assignment', 'Assignment'), ('notice', 'Notice'), ('subject', 'Subject')]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # the keyset /sync/changes walks
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted {self.deleted_at}"
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from assignments.models import Assignment
+from core.models import CustomUser
+from fileandimage.models import FileAndImage
+from notices.models import Notices
+from subjects.models import Subject
+from .changes import KIND_BY_MODEL
+from .models import Tombstone
+
+
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Notices)
+@receiver(post_delete, sender=Subject)
+def record_tombstone(sender, instance, **kwargs):
+    # also runs for every row a cascade removes, e.g. the assignments of a deleted subject
+    Tombstone.objects.create(kind=KIND_BY_MODEL[sender], object_id=instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def touch_subject_assignments(sender, instance, created, **kwargs):
+    # assignments embed the subject name, move them into the next delta too
+    if not created:
+        Assignment.objects.filter(subject=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=FileAndImage)
+def touch_image_notices(sender, instance, created, **kwargs):
+    # notices embed their image url, which changes on a replace or when an async upload finishes
+    if not created:
+        Notices.objects.filter(notice_image=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=FileAndImage)
+def touch_image_notices_on_delete(sender, instance, **kwargs):
+    # pre_delete, by post_delete SET_NULL has already cleared notice_image (without touching updated_at)
+    Notices.objects.filter(notice_image=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_issuer_name(sender, instance, update_fields=None, **kwargs):
+    # notices show the issuer's name, or the username when it is empty
+    if instance._state.adding or (update_fields is not None and not {'name', 'username'} & set(update_fields)):
+        return
+    instance._issuer_name = sender.objects.filter(pk=instance.pk).values_list('name', 'username').first()
+
+
+@receiver(post_save, sender=CustomUser)
+def touch_issued_notices(sender, instance, **kwargs):
+    issuer_name = instance.__dict__.pop('_issuer_name', None)
+    if issuer_name is not None and issuer_name != (instance.name, instance.username):
+        Notices.objects.filter(issued_by=instance).update(updated_at=timezone.now())
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from assignments.models import Assignment
+from fileandimage.models import FileAndImage
+from notices.models import Notices
+from subjects.models import Subject
+from .changes import encode_cursor
+from .models import Tombstone
+
+User = get_user_model()
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncChangesTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.subject = Subject.objects.create(name='Computer Network', code='CN101', credits=3, created_by=self.teacher)
+        self.assignments = [
+            Assignment.objects.create(
+                title=f'Assignment {i}', description='Lab work', subject=self.subject,
+                teacher=self.teacher, faculty='BCA', semester='First Semester'
+            )
+            for i in range(3)
+        ]
+        self.notice = Notices.objects.create(title='Exam routine', issued_by=self.teacher)
+        token = RefreshToken.for_user(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/sync/changes', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data'], response.data['pagination']
+
+    def test_full_sync_then_nothing_new(self):
+        data, pagination = self.sync()
+        self.assertEqual(len(data['assignments']), 3)
+        self.assertEqual(len(data['notices']), 1)
+        self.assertEqual(len(data['subjects']), 1)
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(pagination['has_more'])
+
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual(data, {'assignments': [], 'notices': [], 'subjects': [], 'deleted': []})
+
+    def test_updates_and_deletes_since_cursor(self):
+        _, pagination = self.sync()
+        first, second = self.assignments[:2]
+        first.title = 'Renamed'
+        first.save()
+        response = self.client.delete(f'/assignments/delete/{second.assignment_id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual([a['title'] for a in data['assignments']], ['Renamed'])
+        self.assertEqual(data['deleted'], [{'kind': 'assignment', 'object_id': second.assignment_id}])
+
+    def test_cascades_leave_tombstones(self):
+        _, pagination = self.sync()
+        subject_id = self.subject.subject_id
+        self.subject.delete()
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual(
+            sorted((d['kind'], d['object_id']) for d in data['deleted']),
+            sorted([('subject', subject_id)] +
+                   [('assignment', a.assignment_id) for a in self.assignments])
+        )
+
+    def test_subject_rename_resends_its_assignments(self):
+        _, pagination = self.sync()
+        self.subject.name = 'Networking'
+        self.subject.save()
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual({a['subject']['name'] for a in data['assignments']}, {'Networking'})
+        self.assertEqual(len(data['assignments']), 3)
+
+    def test_image_change_resends_its_notices(self):
+        image = FileAndImage.objects.create(
+            file_url='https://cdn.test/poster.png', public_id='assignment_api/poster',
+            file_type='notice', meta_type='png', user=self.teacher
+        )
+        self.notice.notice_image = image
+        self.notice.save()
+        _, pagination = self.sync()
+
+        image.file_url = 'https://cdn.test/replaced.png'
+        image.save()
+        data, pagination = self.sync(pagination['next_cursor'])
+        self.assertEqual([n['notice_image']['file_url'] for n in data['notices']], ['https://cdn.test/replaced.png'])
+
+        image.delete()
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual([n['notice_image'] for n in data['notices']], [None])
+
+    def test_issuer_rename_resends_their_notices(self):
+        _, pagination = self.sync()
+        self.teacher.last_login = timezone.now()
+        self.teacher.save(update_fields=['last_login'])
+        self.teacher.save()
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual(data['notices'], [])
+
+        self.teacher.name = 'Ram Sharma'
+        self.teacher.save()
+        data, _ = self.sync(pagination['next_cursor'])
+        self.assertEqual([n['issued_by']['name'] for n in data['notices']], ['Ram Sharma'])
+
+    def test_small_pages_cover_everything_once(self):
+        # rows saved in the same instant are split by pk
+        Assignment.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        seen, cursor = [], None
+        while True:
+            data, pagination = self.sync(cursor, limit=1)
+            seen.extend(a['assignment_id'] for a in data['assignments'])
+            cursor = pagination['next_cursor']
+            if not pagination['has_more']:
+                break
+        self.assertEqual(sorted(seen), sorted(a.assignment_id for a in self.assignments))
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_recent_rows_wait_for_the_settle_window(self):
+        data, _ = self.sync()
+        self.assertEqual(data['assignments'], [])
+
+    def test_bad_and_expired_cursors(self):
+        response = self.client.get('/sync/changes', {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        old = encode_cursor({}, timezone.now() - timedelta(days=365))
+        response = self.client.get('/sync/changes', {'since': old})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_command(self):
+        Tombstone.objects.create(kind='notice', object_id='old', deleted_at=timezone.now() - timedelta(days=365))
+        Tombstone.objects.create(kind='notice', object_id='new')
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), ['new'])
@@ -0,0 +1,53 @@
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from .changes import CursorExpired, collect_changes
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+
+@extend_schema(
+    summary="Changes since the last sync",
+    description="Assignments, notices and subjects created or updated since `since`, and the ids of deleted ones "
+                "in `deleted`. Leave `since` out for a full sync, then send pagination.next_cursor from every "
+                "response as the next `since`; call again right away while `has_more` is true. "
+                "Upsert the rows before applying `deleted`. A 410 means the cursor is too old: drop the local "
+                "data and sync again without `since`.",
+    parameters=[
+        OpenApiParameter('since', OpenApiTypes.STR),
+        OpenApiParameter('limit', OpenApiTypes.INT, description=f'Rows per kind (max {MAX_LIMIT})'),
+    ],
+    responses={200: OpenApiTypes.OBJECT},
+    tags=['Sync']
+)
+class SyncChangesView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        try:
+            data, cursor, has_more = collect_changes(
+                request.query_params.get('since'), limit, self.get_serializer_context()
+            )
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        except CursorExpired:
+            return Response({
+                'message': 'Cursor expired, sync again without since'
+            }, status=status.HTTP_410_GONE)
+        return Response({
+            'message': 'Changes retrieved successfully',
+            'pagination': {
+                'next_cursor': cursor,
+                'has_more': has_more,
+                'limit': limit,
+            },
+            'data': data,
+        }, status=status.HTTP_200_OK)
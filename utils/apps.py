@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from utils.instrumentation import install_execute_wrapper, install_serializer_timing
+        from utils.metrics import install_query_counter
+        connection_created.connect(install_execute_wrapper)
+        connection_created.connect(install_query_counter)
+        install_serializer_timing()
@@ -0,0 +1,138 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# claims that MyTokenObtainPairSerializer / LoginView put in every access token,
+# a token without all of them falls back to a real CustomUser
+USER_CLAIMS = ('email', 'role', 'faculty')
+
+
+class UserCache:
+    """
+    Small per-process LRU of CustomUser rows keyed by pk.
+    Entries expire after `ttl` seconds so changes made in another worker
+    (which only invalidates its own cache) are picked up quickly.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._users.get(pk)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._users[pk]
+                return None
+            self._users.move_to_end(pk)
+        # requests get their own copy so one request can't change another's request.user
+        return copy.copy(user)
+
+    def set(self, pk, user):
+        with self._lock:
+            self._users[pk] = (user, time.monotonic() + self.ttl)
+            self._users.move_to_end(pk)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def discard(self, pk):
+        with self._lock:
+            self._users.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class ClaimsUser(TokenUser):
+    """Lightweight request.user built only from the access token claims"""
+
+    @cached_property
+    def email(self):
+        return self.token.get('email')
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def faculty(self):
+        return self.token.get('faculty')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips the CustomUser SELECT where it can.
+
+    Safe (read-only) requests with a token carrying USER_CLAIMS get a ClaimsUser,
+    the permission classes only need `role`. Everything else gets a real
+    CustomUser, served from `user_cache` when possible. Views that need a real
+    row even for GET can set `stateless_auth = False`.
+
+    Note that a ClaimsUser is trusted for as long as its token is valid, role or
+    is_active changes only reach read endpoints once a new token is issued.
+    """
+
+    def authenticate(self, request):
+        validated_token = self.get_request_token(request)
+        if validated_token is None:
+            return None
+        if self.can_use_claims(request, validated_token):
+            return ClaimsUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, only tokens without the claims need a (threaded) query"""
+        validated_token = self.get_request_token(request)
+        if validated_token is None:
+            return None
+        if self.can_use_claims(request, validated_token):
+            return ClaimsUser(validated_token), validated_token
+        return await sync_to_async(self.get_user)(validated_token), validated_token
+
+    def get_request_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        return self.get_validated_token(raw_token)
+
+    def can_use_claims(self, request, validated_token):
+        if request.method not in SAFE_METHODS:
+            return False
+        view = getattr(request, 'parser_context', {}).get('view')
+        if not getattr(view, 'stateless_auth', True):
+            return False
+        return api_settings.USER_ID_CLAIM in validated_token and all(
+            claim in validated_token for claim in USER_CLAIMS
+        )
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user.pk, user)
+        return user
@@ -0,0 +1,121 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from utils.dbrouter import reading_from_replica
+
+# Two cache tiers, see CACHES in settings:
+#   'local'   - per-process LocMemCache, no I/O at all
+#   'default' - FileBasedCache on the instance disk, shared by every gunicorn worker
+# Payload keys embed the current version of each namespace they depend on.
+# Model signals bump those versions in the shared tier, so every worker
+# stops using the old keys on its next read and nothing stale is ever served.
+
+
+def _shared():
+    return caches['default']
+
+
+def _local():
+    return caches['local']
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _version_key(namespace):
+    return f'ns-version:{namespace}'
+
+
+def namespace_version(namespace):
+    """
+    Current version of a namespace. Versions are millisecond timestamps of the
+    last change, so a version key lost to culling restarts above every old one.
+    """
+    cache = _shared()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), _now_ms(), timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_namespace(*namespaces):
+    """Invalidate everything cached under these namespaces, in every worker"""
+    cache = _shared()
+    for namespace in namespaces:
+        current = cache.get(_version_key(namespace)) or 0
+        cache.set(_version_key(namespace), max(current + 1, _now_ms()), timeout=None)
+
+
+def _payload_key(namespaces, key):
+    versions = [namespace_version(namespace) for namespace in namespaces]
+    return f"payload:{key}:{'.'.join(str(version) for version in versions)}", versions
+
+
+def _cacheable(versions):
+    # a replica may not have replayed a change from the last REPLICA_PIN_SECONDS yet,
+    # what it returns then is served but not cached under the new versions
+    if not versions or not reading_from_replica():
+        return True
+    return _now_ms() - max(versions) > settings.REPLICA_PIN_SECONDS * 1000
+
+
+def _lookup(full_key, timeout):
+    value = _local().get(full_key)
+    if value is None:
+        value = _shared().get(full_key)
+        if value is not None:
+            _local().set(full_key, value, timeout)
+    return value
+
+
+def _store(full_key, value, timeout):
+    _shared().set(full_key, value, timeout)
+    _local().set(full_key, value, timeout)
+
+
+def get_or_build(namespaces, key, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for `key`, building and storing it in both tiers
+    on a miss. Exceptions from `builder` (e.g. not found) are not cached.
+    Without a `timeout` each tier keeps it for its own TIMEOUT setting.
+    """
+    full_key, versions = _payload_key(namespaces, key)
+    value = _lookup(full_key, timeout)
+    if value is None:
+        value = builder()
+        if _cacheable(versions):
+            _store(full_key, value, timeout)
+    return value
+
+
+async def aget_or_build(namespaces, key, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    get_or_build with an async `builder`, for async views.
+    The cache reads stay inline: process memory and a small file on the local
+    disk are cheaper than a hop to a thread and back.
+    """
+    full_key, versions = _payload_key(namespaces, key)
+    value = _lookup(full_key, timeout)
+    if value is None:
+        value = await builder()
+        if _cacheable(versions):
+            _store(full_key, value, timeout)
+    return value
+
+
+def _request_key(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def cached_response_data(request, namespaces, builder, timeout=DEFAULT_TIMEOUT):
+    """get_or_build keyed on the request path and query string"""
+    return get_or_build(namespaces, _request_key(request), builder, timeout)
+
+
+async def acached_response_data(request, namespaces, builder, timeout=DEFAULT_TIMEOUT):
+    """cached_response_data with an async `builder`"""
+    return await aget_or_build(namespaces, _request_key(request), builder, timeout)
@@ -0,0 +1,93 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from utils.cache import namespace_version
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag / Last-Modified validators for list and detail GETs.
+
+    The validators come from one cheap query (MAX(updated_at) + COUNT for lists,
+    the row's updated_at for details) plus the utils.cache namespace versions,
+    which also move on deletes and on changes to embedded models. A matching
+    If-None-Match / If-Modified-Since gets a 304 before anything is serialized.
+    Put it before the generic view class, e.g. (ConditionalGetMixin, ListAPIView).
+    """
+    conditional_namespaces = ()
+    cache_control = {'private': True, 'max_age': 0, 'stale_while_revalidate': 60}
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, **kwargs)
+        if etag is None:
+            # unknown object, let the normal view answer with its 404
+            return super().get(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.add_validators(response, etag, last_modified)
+
+    async def aget(self, request, *args, **kwargs):
+        """get() for utils.asyncviews.AsyncReadMixin"""
+        etag, last_modified = await self.aget_validators(request, **kwargs)
+        if etag is None:
+            return await super().aget(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().aget(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.add_validators(response, etag, last_modified)
+
+    def add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, **self.cache_control)
+        return response
+
+    def get_validators(self, request, **kwargs):
+        lookup = self.get_lookup(kwargs)
+        if lookup is not None:
+            rows = list(self.detail_validator_query(lookup))
+            if not rows:
+                return None, None
+            return self.make_validators(request, rows[0], 1)
+        stats = self.list_validator_query().aggregate(last=Max('updated_at'), count=Count('pk'))
+        return self.make_validators(request, stats['last'], stats['count'])
+
+    async def aget_validators(self, request, **kwargs):
+        lookup = self.get_lookup(kwargs)
+        if lookup is not None:
+            rows = [row async for row in self.detail_validator_query(lookup)]
+            if not rows:
+                return None, None
+            return self.make_validators(request, rows[0], 1)
+        stats = await self.list_validator_query().aaggregate(last=Max('updated_at'), count=Count('pk'))
+        return self.make_validators(request, stats['last'], stats['count'])
+
+    def get_lookup(self, kwargs):
+        return kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+
+    def detail_validator_query(self, lookup):
+        return self.get_queryset().filter(pk=lookup).order_by().values_list('updated_at', flat=True)[:1]
+
+    def list_validator_query(self):
+        # order_by() drops the ORDER BY, it only slows the aggregate down
+        return self.filter_queryset(self.get_queryset()).order_by()
+
+    def make_validators(self, request, last, count):
+        versions = [namespace_version(namespace) for namespace in self.conditional_namespaces]
+        # the response can differ per user (audience=mine, own files) and per query string
+        fingerprint = '|'.join(str(part) for part in (
+            request.get_full_path(), request.user.pk, count, last.isoformat() if last else '', *versions
+        ))
+        etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+
+        # versions are millisecond timestamps of the last change, so deletes move it too
+        timestamps = [last.timestamp() if last else 0] + [version / 1000 for version in versions]
+        return etag, int(max(timestamps))
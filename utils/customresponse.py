@@ -1,7 +1,9 @@
+import math
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import exception_handler
 from rest_framework.exceptions import APIException
+from utils.dbpool import POOL_RETRY_AFTER, is_pool_timeout
 
 # <------------------------ Custom Exception Classes ------------------------>
 
@@ -110,11 +112,26 @@ class GatewayTimeoutException(CustomAPIException):
     def __init__(self, message, data=None):
         super().__init__(message, data, self.status_code)
 
+class TooManyRequestsException(CustomAPIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = 'Too many requests'
+    default_code = 'throttled'
+
+    def __init__(self, message, data=None, wait=None):
+        # DRF's exception handler turns `wait` into the Retry-After header
+        self.wait = math.ceil(wait) if wait else None
+        super().__init__(message, data, self.status_code)
+
 # <------------------------ Custom Exception Handler ------------------------>
 
 def custom_exception_handler(exc, context):
     """Custom exception handler to format responses consistently"""
     
+    # views re-raise OperationalError past their catch-all, a full connection pool is a 503
+    if is_pool_timeout(exc):
+        exc = ServiceUnavailableException("The server is busy, try again shortly")
+        exc.wait = POOL_RETRY_AFTER
+
     # Call REST framework's default exception handler first,
     # to get the standard error response.
     response = exception_handler(exc, context)
@@ -238,6 +255,20 @@ def DELETE_SuccessResponse(message,data=None):
     """
     return Response({"success": True, "message": message} if data is None else {"success": True, "message": message, "data": data}, status=status.HTTP_204_NO_CONTENT)
 
+def ACCEPTED_SuccessResponse(message, data=None):
+    """
+    Returns a successful response with HTTP 202 Accepted status.
+    Used when the request was queued and will finish in the background.
+    
+    Args:
+        message (str): Success message to be included in the response
+        data (optional): Data payload describing the queued work. Defaults to None.
+    
+    Returns:
+        Response: DRF Response object with success flag, message, data, and 202 status code
+    """
+    return Response({"success": True, "message": message, "data": data} if data is not None else {"success": True, "message": message}, status=status.HTTP_202_ACCEPTED)
+
 
 
 # <------------------------ API ERROR Responses ------------------------>
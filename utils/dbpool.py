@@ -0,0 +1,63 @@
+import copy
+import os
+from django.db import connections
+
+# Django's psycopg 3 pool, see DATABASES in settings.
+# Each gunicorn worker has its own pool, so the numbers below are per process.
+try:
+    from psycopg_pool import PoolTimeout
+except ImportError:  # SQLite or psycopg2, there is no pool to wait for
+    PoolTimeout = None
+
+# seconds a client is told to wait after a pool timeout (503 Retry-After)
+POOL_RETRY_AFTER = 1
+
+
+def is_pool_timeout(exc):
+    """True if `exc` (Django wraps driver errors in its own) comes from waiting on a full pool"""
+    while exc is not None and PoolTimeout is not None:
+        if isinstance(exc, PoolTimeout):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def pool_stats(alias='default'):
+    """Snapshot of this worker's pool: connections in use/idle, waiting requests, acquire latency"""
+    db = connections[alias]
+    pool = getattr(db, 'pool', None)  # only the postgresql backend has one, and only when configured
+    if pool is None:
+        return {'pooled': False, 'vendor': db.vendor, 'pid': os.getpid()}
+
+    # counters are cumulative since the pool opened, psycopg_pool leaves out the ones still at 0
+    stats = pool.get_stats()
+    requests = stats.get('requests_num', 0)
+    connections_opened = stats.get('connections_num', 0)
+    return {
+        'pooled': True,
+        'vendor': db.vendor,
+        'pid': os.getpid(),
+        'min_size': stats['pool_min'],
+        'max_size': stats['pool_max'],
+        'size': stats['pool_size'],
+        'in_use': stats['pool_size'] - stats['pool_available'],
+        'idle': stats['pool_available'],
+        'waiting': stats['requests_waiting'],
+        'requests': requests,
+        'requests_queued': stats.get('requests_queued', 0),
+        'timeouts': stats.get('requests_errors', 0),
+        'acquire_ms_avg': round(stats.get('requests_wait_ms', 0) / requests, 2) if requests else 0,
+        'connections_opened': connections_opened,
+        'connect_ms_avg': round(stats.get('connections_ms', 0) / connections_opened, 2) if connections_opened else 0,
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def unpooled_connection(alias='default'):
+    """
+    A new connection wrapper that connects directly instead of borrowing from
+    the pool, for connections held for the life of the process (LISTEN).
+    """
+    settings_dict = copy.deepcopy(connections.settings[alias])
+    settings_dict.get('OPTIONS', {}).pop('pool', None)
+    return connections[alias].__class__(settings_dict, alias)
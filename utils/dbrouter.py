@@ -0,0 +1,42 @@
+import contextvars
+import random
+from django.conf import settings
+
+# Set by utils.middleware.ReplicaRoutingMiddleware for the requests that may read
+# from a replica. A contextvar follows the request into sync_to_async threads
+# and stays separate between requests served concurrently on the event loop.
+_read_replica = contextvars.ContextVar('read_replica', default=None)
+
+
+def use_replica():
+    """Route this context's reads to a randomly picked replica, returns the token to reset it with"""
+    replicas = settings.DATABASE_REPLICAS
+    return _read_replica.set(random.choice(replicas) if replicas else None)
+
+
+def reset_replica(token):
+    _read_replica.reset(token)
+
+
+def reading_from_replica():
+    return _read_replica.get() is not None
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica picked for the current request, everything else
+    (writes, reads outside such a request, management commands) to 'default'
+    (None lets Django fall back to it, or to the database of a related instance).
+    A request sticks to one replica, so its queries see one consistent snapshot.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
@@ -0,0 +1,52 @@
+import django_filters
+
+# Base FilterSet for the list endpoints. Equality filters are backed by indexes
+# that lead with the filtered columns and end in each ordering column. A range
+# can only walk the index of its own column, so a request with a range filter
+# has to be sorted by that column; sorting it by anything else would read every
+# row in the range and sort them.
+
+
+class IndexedFilterSet(django_filters.FilterSet):
+    """
+    Subclasses set `range_orderings`, {range filter name: ordering it implies},
+    e.g. {'deadline': 'deadline'}. A range filter without ?ordering sorts by it,
+    with an ?ordering on another column the request is rejected. `feed_ordering`
+    is the field the view's keyset feed (?limit/?cursor) always sorts by.
+    """
+    range_orderings = {}
+    feed_ordering = None
+
+    def is_valid(self):
+        if not super().is_valid():
+            return False
+        ranges = self.active_ranges()
+        if not ranges:
+            return True
+        column = self.requested_ordering_column()
+        for name in ranges:
+            expected = self.range_orderings[name].lstrip('-')
+            if column is not None and column != expected:
+                self.form.add_error(name, f"Only available when sorted by {expected} (ordering={expected}).")
+        return not self.form.errors
+
+    def active_ranges(self):
+        data = self.form.cleaned_data
+        return [name for name in self.range_orderings if data.get(name) not in (None, '', [])]
+
+    def requested_ordering_column(self):
+        """Column the results end up sorted by, None if the view's default is free to change"""
+        params = self.request.query_params if self.request is not None else {}
+        if self.feed_ordering and ('cursor' in params or 'limit' in params):
+            return self.feed_ordering
+        ordering = self.form.cleaned_data.get('ordering')
+        if ordering:
+            return ordering[0].lstrip('-')
+        return None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        ranges = self.active_ranges()
+        if ranges and self.requested_ordering_column() is None:
+            queryset = queryset.order_by(self.range_orderings[ranges[0]], '-pk')
+        return queryset
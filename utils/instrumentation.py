@@ -0,0 +1,135 @@
+import contextvars
+import logging
+import random
+import re
+import sys
+import time
+from collections import Counter
+from django.conf import settings
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+# RequestMetrics of the sampled request being served, None otherwise. Like the
+# replica choice in utils.dbrouter it follows the request into sync_to_async threads.
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+# IN lists of different lengths are the same query shape
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_time', 'serializer_time', 'shapes', 'suspects')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.shapes = Counter()
+        self.suspects = []
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        shape = _IN_LIST.sub('IN (...)', sql)
+        self.shapes[shape] += 1
+        # only the query that crosses the threshold pays for the stack walk
+        if self.shapes[shape] == settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD:
+            self.suspects.append((shape, call_site()))
+
+
+def call_site():
+    """file:line of the innermost project frame that led to the current query"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and 'site-packages' not in filename and filename != __file__:
+            return f'{filename[len(base_dir) + 1:]}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def start_request():
+    """Start collecting if this request is sampled, returns the token for stop_request"""
+    if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+        return None
+    return _current.set(RequestMetrics())
+
+
+def stop_request(token):
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def report(metrics, request, response):
+    """Server-Timing header and one log line for the request, plus a warning per suspected N+1"""
+    total = time.perf_counter() - metrics.started
+    view = view_name(request)
+    size = '-' if response.streaming else len(response.content)
+
+    response['Server-Timing'] = ', '.join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.serializer_time * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+    logger.info(
+        'request method=%s path=%s view=%s status=%s queries=%d db_ms=%.1f serialize_ms=%.1f total_ms=%.1f bytes=%s',
+        request.method, request.path, view, response.status_code, metrics.queries,
+        metrics.db_time * 1000, metrics.serializer_time * 1000, total * 1000, size,
+    )
+    for shape, site in metrics.suspects:
+        logger.warning(
+            'n+1 suspected view=%s site=%s repeats=%d sql=%s',
+            view, site, metrics.shapes[shape], shape[:300],
+        )
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '-'
+    view_class = getattr(match.func, 'view_class', None)
+    if view_class is not None:
+        return f'{view_class.__module__}.{view_class.__name__}'
+    return f'{match.func.__module__}.{match.func.__name__}'
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """connection_created receiver, the wrapper stays on the connection for its lifetime"""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def install_serializer_timing():
+    """
+    Time serializer.data of sampled requests. Nested serializers go through
+    to_representation, not .data, so only the outer call is counted; lazy
+    querysets it evaluates count towards both db and serialize.
+    """
+    data = BaseSerializer.data
+
+    def timed_data(self):
+        metrics = _current.get()
+        if metrics is None:
+            return data.fget(self)
+        started = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+
+    BaseSerializer.data = property(timed_data)
@@ -0,0 +1,112 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Prometheus metrics served by /metrics. Under gunicorn every worker writes its
+# samples to mmapped files in PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py)
+# and the scrape, whichever worker answers it, adds up the files of all workers.
+# Without that variable (runserver, tests) the values live in this process.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    'http_requests_total', 'Requests answered', ['route', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to the response headers', ['route', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests being served', ['method'], multiprocess_mode='livesum',
+)
+QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request', ['route'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+OUTBOUND_LATENCY = Histogram(
+    'outbound_request_duration_seconds', 'Calls to Cloudinary and FCM', ['service', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+OUTBOUND_ERRORS = Counter(
+    'outbound_request_errors_total', 'Calls to Cloudinary and FCM that raised', ['service', 'operation'],
+)
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# labelled children are looked up once, .labels() costs about as much as the increment
+_children = {}
+
+# queries of the request being served, a one item list so sync_to_async threads add to the same count
+_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+def route_of(request):
+    """URL name, else the URL pattern, so the label has one value per endpoint and not per object"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route or 'unmatched'
+
+
+def _child(metric, *labels):
+    child = _children.get((metric, labels))
+    if child is None:
+        child = _children[metric, labels] = metric.labels(*labels)
+    return child
+
+
+def start_request(request):
+    # anything a client makes up would be a new time series
+    method = request.method if request.method in METHODS else 'other'
+    _child(IN_PROGRESS, method).inc()
+    return time.perf_counter(), method, _queries.set([0])
+
+
+def finish_request(started, request, status_code):
+    """Called once the response exists, for streaming responses before the body is sent"""
+    started_at, method, token = started
+    queries = _queries.get()[0]
+    _queries.reset(token)
+    route = route_of(request)
+    _child(IN_PROGRESS, method).dec()
+    _child(REQUESTS, route, method, f'{status_code // 100}xx').inc()
+    _child(LATENCY, route, method).observe(time.perf_counter() - started_at)
+    _child(QUERIES, route).observe(queries)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver, like utils.instrumentation.install_execute_wrapper"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+@contextmanager
+def observe_outbound(service, operation):
+    """Time a call to an outside service, e.g. with observe_outbound('cloudinary', 'upload'):"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        OUTBOUND_LATENCY.labels(service, operation).observe(time.perf_counter() - started)
+
+
+def render_latest():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
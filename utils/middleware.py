@@ -0,0 +1,205 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from whitenoise.middleware import WhiteNoiseMiddleware
+from utils.customresponse import ServiceUnavailableException
+from utils.dbpool import POOL_RETRY_AFTER, is_pool_timeout
+from utils.dbrouter import reset_replica, use_replica
+from utils.instrumentation import report, start_request, stop_request
+from utils import metrics
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also sit in an async middleware chain.
+    The stock one is sync only, so under ASGI Django would run every middleware
+    and view after it in a thread, async views included. The static file lookup
+    is a dict get (a stat with autorefresh in DEBUG), serving works as before.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class DatabasePoolMiddleware(MiddlewareMixin):
+    """
+    Answers 503 with Retry-After instead of a 500 when a request gave up
+    waiting for a connection from the pool (DB_POOL_TIMEOUT), so clients and
+    the load balancer back off while the workers are saturated. DRF views get
+    the same answer from custom_exception_handler.
+    """
+    def process_exception(self, request, exception):
+        if not is_pool_timeout(exception):
+            return None
+        response = ServiceUnavailableException("The server is busy, try again shortly")
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = 'application/json'
+        response.renderer_context = {}
+        response.render()
+        response['Retry-After'] = str(POOL_RETRY_AFTER)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests under REPLICA_READ_PREFIXES read from a replica (utils.dbrouter).
+
+    A successful write pins the client to the primary for REPLICA_PIN_SECONDS, so a
+    teacher who creates an assignment sees it in the next list even if the replicas
+    lag behind. The pin travels as a cookie for browsers and as the X-Primary-Pin
+    response header, which other clients send back as a request header.
+    """
+    sync_capable = True
+    async_capable = True
+    pin_cookie = 'primary_pin'
+    pin_header = 'X-Primary-Pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.route(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                reset_replica(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = self.route(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                reset_replica(token)
+        return self.pin(request, response)
+
+    def route(self, request):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return None
+        if not request.path_info.startswith(settings.REPLICA_READ_PREFIXES):
+            return None
+        if self.pinned_until(request) > time.time():
+            return None
+        return use_replica()
+
+    def pinned_until(self, request):
+        value = request.COOKIES.get(self.pin_cookie) or request.headers.get(self.pin_header)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0
+
+    def pin(self, request, response):
+        if not settings.DATABASE_REPLICAS or request.method in SAFE_METHODS or response.status_code >= 400:
+            return response
+        until = str(int(time.time()) + settings.REPLICA_PIN_SECONDS)
+        response.set_cookie(
+            self.pin_cookie, until, max_age=settings.REPLICA_PIN_SECONDS,
+            secure=request.is_secure(), httponly=True, samesite='Lax',
+        )
+        response[self.pin_header] = until
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    For a sample of requests (INSTRUMENTATION_SAMPLE_RATE) records the query count,
+    DB and serializer time and response size (utils.instrumentation), sends them as a
+    Server-Timing header and logs them, warning about query shapes repeated often
+    enough to be an N+1. Unsampled requests only pay for one random() call.
+    Keep it first in MIDDLEWARE so the total covers every other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_request()
+        if token is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics = stop_request(token)
+        report(metrics, request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = start_request()
+        if token is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics = stop_request(token)
+        report(metrics, request, response)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Request count, latency, in-flight and query count per route for /metrics (utils.metrics).
+    First in MIDDLEWARE, so the latency includes the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = metrics.start_request(request)
+        status_code = 500
+        try:
+            response = self.get_response(request)
+            status_code = response.status_code
+        finally:
+            metrics.finish_request(started, request, status_code)
+        return response
+
+    async def __acall__(self, request):
+        started = metrics.start_request(request)
+        status_code = 500
+        try:
+            response = await self.get_response(request)
+            status_code = response.status_code
+        finally:
+            metrics.finish_request(started, request, status_code)
+        return response
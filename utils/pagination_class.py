@@ -1,4 +1,10 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
 
 class CustomPagination(PageNumberPagination):
@@ -9,6 +15,23 @@ class CustomPagination(PageNumberPagination):
     # def __init__(self,message):
     #     self.message=message
     #     super().__init__() 
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the COUNT and the page fetched through the async ORM"""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # a cached_property, set it so page() doesn't count again
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
     def get_paginated_response(self, data,message):
         return Response({
             "message": message,
@@ -22,3 +45,137 @@ class CustomPagination(PageNumberPagination):
             },
             "data": data
         })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination, newest first.
+    Each page is fetched with a WHERE on the last row of the previous page
+    instead of an OFFSET, so page 500 costs the same as page 1.
+    The view can set `keyset_ordering`; the last field must be unique.
+    Only used when the client sends `cursor` or `limit`, otherwise the view
+    gets None back and returns the plain list like before.
+    """
+    page_size = 10
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    ordering = ('created_at', 'pk')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request, view)
+        return None if page is None else self.finish_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request, view)
+        return None if page is None else self.finish_page([row async for row in page])
+
+    def get_page_queryset(self, queryset, request, view):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.fields = [self._get_field(queryset.model, name) for name in self.ordering]
+        return self.page_slice(queryset, request)
+
+    def page_slice(self, queryset, request):
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(*['-' + name for name in self.ordering])
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+        # one extra row to know if there is a next page without a COUNT(*)
+        return queryset[:self.limit + 1]
+
+    def finish_page(self, rows):
+        has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        return rows
+
+    def get_paginated_response(self, data, message):
+        return Response({
+            "message": message,
+            "pagination": {
+                "next_cursor": self.next_cursor,
+                "limit": self.limit,
+            },
+            "data": data
+        })
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(limit, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound("Invalid cursor")
+
+    def _after(self, values):
+        # (a, b, c) < (va, vb, vc) spelled out so every backend can use the index:
+        # a < va OR (a = va AND b < vb) OR (a = va AND b = vb AND c < vc)
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            equal = {prev: values[j] for j, prev in enumerate(self.ordering[:i])}
+            condition |= Q(**equal, **{name + '__lt': values[i]})
+        return condition
+
+    def _get_field(self, model, name):
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from pagination.next_cursor of the previous page',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class RankPagination(KeysetPagination):
+    """
+    KeysetPagination over (rank, pk) for ranked results, best first.
+    The queryset has to be annotated with `rank`. Always paginates.
+    """
+    ordering = ('rank', 'pk')
+    max_page_size = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.pk_field = queryset.model._meta.pk
+        return self.finish_page(list(self.page_slice(queryset, request)))
+
+    def encode_cursor(self, obj):
+        values = [obj.rank, self.pk_field.value_to_string(obj)]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            rank, pk = json.loads(urlsafe_b64decode(padded.encode()))
+            return [float(rank), self.pk_field.to_python(pk)]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound("Invalid cursor")
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+from utils.customresponse import TooManyRequestsException
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines, buckets are then only atomic per process
+    fcntl = None
+
+# Token buckets kept in the shared FileBasedCache, so all gunicorn workers of an
+# instance draw from the same bucket without Redis. Read-modify-write of a bucket
+# happens under an flock on one of LOCK_SHARDS lock files.
+# Rates use DRF's format in THROTTLE_RATES: '10/min' is a bucket of 10 tokens
+# refilled at 10 per minute, i.e. bursts of 10 then one request every 6 seconds.
+
+LOCK_SHARDS = 64
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_thread_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'10/min' -> (capacity, tokens per second)"""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+@contextmanager
+def _bucket_lock(key):
+    if fcntl is None:
+        with _thread_lock:
+            yield
+        return
+    os.makedirs(settings.THROTTLE_LOCK_DIR, exist_ok=True)
+    shard = int(hashlib.md5(key.encode()).hexdigest(), 16) % LOCK_SHARDS
+    with open(os.path.join(settings.THROTTLE_LOCK_DIR, f'{shard}.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def take_token(key, capacity, refill_rate):
+    """Take one token from the bucket, returns 0 or the seconds until a token is available"""
+    cache = caches['default']
+    with _bucket_lock(key):
+        now = time.time()
+        tokens, stamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+        if tokens < 1:
+            return (1 - tokens) / refill_rate
+        # an untouched bucket is full again after capacity / refill_rate, let it expire then
+        cache.set(key, (tokens - 1, now), timeout=int(capacity / refill_rate) + 1)
+        return 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class, subclasses set `scope` (a key of THROTTLE_RATES) and `get_bucket_ident`.
+    A throttled request gets a 429 in the customresponse envelope with Retry-After.
+    Throttles run in APIView.initial, after authentication but before the handler,
+    so before a password is hashed. The IP and user scopes never touch the body,
+    EmailThrottle has to parse it to read the email.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        rate = settings.THROTTLE_RATES.get(self.scope)
+        ident = self.get_bucket_ident(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, refill_rate = parse_rate(rate)
+        wait = take_token(f'throttle:{self.scope}:{ident}', capacity, refill_rate)
+        if wait:
+            # raised rather than returning False so the response uses our envelope
+            raise TooManyRequestsException("Too many requests, please try again later.", wait=wait)
+        return True
+
+    def get_bucket_ident(self, request, view):
+        raise NotImplementedError
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_bucket_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """Per account, so one address can't be brute forced from many IPs"""
+    def get_bucket_ident(self, request, view):
+        # any JSON value parses, a list or string body is left to the view to reject
+        if not isinstance(request.data, dict):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+
+class UserThrottle(TokenBucketThrottle):
+    def get_bucket_ident(self, request, view):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class UploadIPThrottle(IPThrottle):
+    scope = 'upload_ip'
+
+
+class UploadUserThrottle(UserThrottle):
+    scope = 'upload_user'
+
+
+LOGIN_THROTTLES = [LoginIPThrottle, LoginEmailThrottle]
+UPLOAD_THROTTLES = [UploadIPThrottle, UploadUserThrottle]